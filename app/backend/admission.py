@@ -0,0 +1,119 @@
+"""
+Per-worker admission control and load shedding.
+
+Each endpoint class gets its own AdmissionBudget: at most `max_in_flight`
+requests run at once, up to `max_queue` more wait (FIFO) for at most
+`max_wait_s`, and everything beyond that is rejected immediately. Rejections
+carry a Retry-After estimate from the recent service time, so the app can
+answer 429 quickly instead of letting every request slow down together.
+
+Cheap endpoints (/weather) and expensive ones (/routes) have separate
+budgets, so a spike of route requests cannot starve weather lookups.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+
+SERVICE_TIME_SAMPLES = 200
+
+
+class Rejected(Exception):
+    """Request not admitted; retry_after is a suggested wait in whole seconds."""
+
+    def __init__(self, budget: str, reason: str, retry_after: int):
+        super().__init__(f"{budget}: {reason}")
+        self.budget = budget
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionBudget:
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, max_wait_s: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_times: Deque[float] = deque(maxlen=SERVICE_TIME_SAMPLES)
+        self.stats = {"admitted": 0, "waited": 0, "rejected_full": 0, "rejected_deadline": 0}
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog has likely drained (at least 1)."""
+        avg = sum(self._service_times) / len(self._service_times) if self._service_times else 1.0
+        backlog = len(self._waiters) + self._in_flight
+        return max(1, math.ceil(avg * backlog / self.max_in_flight))
+
+    async def acquire(self):
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self.stats["admitted"] += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.stats["rejected_full"] += 1
+            raise Rejected(self.name, "queue full", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.stats["waited"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait_s)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted at the deadline; keep the slot
+                self.stats["admitted"] += 1
+                return
+            future.cancel()
+            self._remove(future)
+            self.stats["rejected_deadline"] += 1
+            raise Rejected(self.name, f"not admitted within {self.max_wait_s:.1f}s", self.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+                self._remove(future)
+            raise
+        self.stats["admitted"] += 1
+
+    def release(self, service_time: float = None):
+        if service_time is not None:
+            self._service_times.append(service_time)
+        self._in_flight -= 1
+        while self._waiters and self._in_flight < self.max_in_flight:
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _remove(self, future: asyncio.Future):
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    @asynccontextmanager
+    async def admit(self):
+        """Hold an admission slot for the duration of the block (raises Rejected)."""
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def metrics(self) -> Dict:
+        return {
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "max_wait_s": self.max_wait_s,
+            "retry_after_s": self.retry_after(),
+            **self.stats,
+        }
@@ -1,37 +1,94 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-import os,requests
-import googlemaps
+import os
 from dotenv import load_dotenv
-import polyline
 import json
-from genson import SchemaBuilder
-import redis.asyncio as redis
 import math
 import httpx
 import random
+import itertools
 from collections import defaultdict
-from typing import List, Tuple, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Tuple, Dict, Optional, Sequence
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy import text
 import getpass
 import asyncio
+import time
+import numpy as np
+import grid
+import sampling
+import road_index
+import matching
+import weather
+import cache
+import risk
+import scheduler
+import db
+import admission
+import deadline
+import disk_cache
+import zoom_bands
+from route import Route
 
 
 load_dotenv()
 
-app = FastAPI()
-gmaps = googlemaps.Client(key=os.getenv("GOOGLE_MAPS_API_KEY"))
 
-usingRedis = False   
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm everything up before the first request (see startup()) and release it on shutdown."""
+    await startup()
+    yield
+    await shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+# Google Maps client, created in startup() (or on first use); googlemaps pulls in requests,
+# so it is imported lazily. Base URLs are overridable so the load-test harness (benchmarks/)
+# can point the app at local stand-ins instead of the live Google and Open-Meteo APIs.
+_gmaps = None
+# The client blocks, so Directions calls run on their own bounded thread pool (a slow Google
+# cannot tie up the default executor used by the disk cache, matching and scoring), and each
+# call, retries included, gives up after DIRECTIONS_TIMEOUT_S so those threads are freed
+DIRECTIONS_TIMEOUT_S = float(os.getenv("DIRECTIONS_TIMEOUT_S", "10"))
+DIRECTIONS_WORKERS = int(os.getenv("DIRECTIONS_WORKERS", "8"))
+directions_executor = ThreadPoolExecutor(max_workers=DIRECTIONS_WORKERS, thread_name_prefix="directions")
+
+def get_gmaps():
+    global _gmaps
+    if _gmaps is None:
+        import googlemaps
+        _gmaps = googlemaps.Client(
+            key=os.getenv("GOOGLE_MAPS_API_KEY"),
+            base_url=os.getenv("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com"),
+            timeout=DIRECTIONS_TIMEOUT_S,
+            retry_timeout=DIRECTIONS_TIMEOUT_S,
+        )
+    return _gmaps
+
+# Shared Redis cache nodes (comma-separated URLs, e.g. "redis://cache1:6379,redis://cache2:6379");
+# keys are sharded by spatial parent cell with consistent hashing (see redis_shards.py)
+REDIS_URLS = [url.strip() for url in os.getenv("REDIS_URLS", "").split(",") if url.strip()]
+usingRedis = bool(REDIS_URLS)
 if(usingRedis):
-    redis_client = redis.from_url("redis://localhost:6379",decode_responses=True)
+    import redis_shards
+    redis_client = redis_shards.ShardedRedis(REDIS_URLS)
 else:
     redis_client = None
 
-meteo_url = "https://api.open-meteo.com/v1/forecast"
+meteo_url = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
 overpass_url = "https://overpass-api.de/api/interpreter"
 
+# One pooled, batching Open-Meteo client for the app's lifetime (see weather.py)
+weather_provider = weather.WeatherProvider(meteo_url)
+
+# Stale-while-revalidate weather cache per 1km cell, with background refresh of hot cells (see cache.py)
+weather_store = cache.SWRCache("weather", weather_provider.fetch_cells, fresh_s=cache.WEATHER_FRESH_S,
+                               stale_s=cache.WEATHER_STALE_S, redis_client=redis_client)
+
 # -------------------------------
 # Database connection setup
 # -------------------------------
@@ -52,20 +109,83 @@ else:
     if not DB_PASS:
         raise ValueError("Missing SUPABASE_DB_PASS in .env when using Supabase")
 
+# Schema search path for every database connection (empty: the server default). The load-test
+# harness points the app at its seeded scratch schema this way (see benchmarks/seed.py)
+DB_SEARCH_PATH = os.getenv("DB_SEARCH_PATH", "")
+DB_SERVER_SETTINGS = {"search_path": DB_SEARCH_PATH} if DB_SEARCH_PATH else {}
+
+# Read replicas for the hot read-only queries (comma-separated postgresql:// DSNs, see db.py);
+# the engine below and all writes stay on the primary
+DB_REPLICA_DSNS = [dsn.strip() for dsn in os.getenv("DB_REPLICA_DSNS", "").split(",") if dsn.strip()]
+
 # Global database engine and session factory
 db_engine = None
 async_session_maker = None
 
+# Connections each worker may hold on the primary: DB_POOL_SIZE + DB_MAX_OVERFLOW, shared by the
+# SQLAlchemy engine and the asyncpg pool. With the asyncpg pool up, the engine (fallback and
+# startup queries only) keeps DB_ENGINE_POOL_SIZE of them and asyncpg the rest; without it the
+# engine gets the whole budget. The DB scheduler never runs more queries than the pool serving
+# them has connections. DB_POOL_MIN connections are opened (and statements prepared) at startup
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "4"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_CONNECTION_BUDGET = DB_POOL_SIZE + DB_MAX_OVERFLOW
+DB_ENGINE_POOL_SIZE = int(os.getenv("DB_ENGINE_POOL_SIZE", "2"))
+
+# Process-wide DB work scheduler: map clicks (INTERACTIVE) go ahead of route lookups (BULK),
+# and each class has a bounded queue that rejects work quickly when saturated (see scheduler.py)
+db_scheduler = scheduler.DBScheduler(
+    capacity=DB_CONNECTION_BUDGET,
+    reserved_interactive=int(os.getenv("DB_INTERACTIVE_RESERVED", "4")),
+    max_queued={
+        scheduler.INTERACTIVE: int(os.getenv("DB_MAX_QUEUED_INTERACTIVE", "200")),
+        scheduler.BULK: int(os.getenv("DB_MAX_QUEUED_BULK", "2000")),
+    },
+)
+
+# In-memory road index for map matching (see road_index.py / matching.py).
+# ROAD_INDEX_SOURCE is "db" (load the roads table), a path to an edges GeoParquet, or a
+# directory written by build_serving_data.py (memory-mapped, shared by all workers);
+# when unset, nearest roads come from per-sample PostGIS queries instead.
+ROAD_INDEX_SOURCE = os.getenv("ROAD_INDEX_SOURCE", "")
+ROAD_INDEX_BBOX = os.getenv("ROAD_INDEX_BBOX", "")  # optional "south,west,north,east"
+# Most roads returned for one map extent (/roads/bbox)
+ROADS_BBOX_LIMIT = int(os.getenv("ROADS_BBOX_LIMIT", "5000"))
+road_index_data = None
+
+# Persistent cache tier for long-lived values (road cells, directions), shared by the workers on
+# this machine through one SQLite file (see disk_cache.py); None when DISK_CACHE_PATH is empty
+persistent_cache: Optional[disk_cache.DiskCache] = None
+# Road cells warm-loaded from the disk tier into the in-process tier at startup
+ROAD_CELL_WARM = int(os.getenv("ROAD_CELL_WARM", "100000"))
+DIRECTIONS_CACHE_TTL_S = float(os.getenv("DIRECTIONS_CACHE_TTL_S", "86400"))
+# Recent directions kept in process too, so a retry after a 504 finds the late result even
+# without the disk tier; calls in flight are shared by requests for the same trip
+DIRECTIONS_MEMORY_MAX = int(os.getenv("DIRECTIONS_MEMORY_MAX", "1000"))
+directions_memory: Dict[str, Tuple[List[Dict], float]] = {}  # cache_key -> (directions, expires_at)
+directions_in_flight: Dict[str, asyncio.Future] = {}
+
+def get_db_user() -> str:
+    """Database user; local connections without a password use the system user for peer authentication."""
+    db_user = DB_USER
+    if USE_LOCAL and not DB_PASS:
+        system_user = getpass.getuser()
+        if DB_USER == "postgres" and system_user != "postgres":
+            db_user = system_user
+    return db_user
+
+def engine_pool_size() -> Tuple[int, int]:
+    """(pool_size, max_overflow) of the engine: a small share of the budget when asyncpg serves the hot queries."""
+    if db.available():
+        return min(DB_ENGINE_POOL_SIZE, DB_CONNECTION_BUDGET), 0
+    return DB_POOL_SIZE, DB_MAX_OVERFLOW
+
 def get_db_engine():
-    """Get or create database async engine."""
+    """Get or create database async engine (sized by engine_pool_size())."""
     global db_engine, async_session_maker
     if db_engine is None:
-        # For local connections without password, use system user for peer authentication
-        db_user = DB_USER
-        if USE_LOCAL and not DB_PASS:
-            system_user = getpass.getuser()
-            if DB_USER == "postgres" and system_user != "postgres":
-                db_user = system_user
+        db_user = get_db_user()
         
         # Build connection string
         # Note: asyncpg doesn't support Unix sockets directly, so we need TCP/IP
@@ -85,32 +205,105 @@ def get_db_engine():
             db_url = f"postgresql+asyncpg://{db_user}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
         
         # Create engine with connection arguments
-        connect_args = {}
+        connect_args = {"server_settings": DB_SERVER_SETTINGS} if DB_SERVER_SETTINGS else {}
         if USE_LOCAL and not DB_PASS:
             # For local connections, try to use Unix socket if possible
             # This is a workaround - asyncpg doesn't support Unix sockets well
             # So we'll try TCP/IP and hope trust auth is configured
             pass
         
+        pool_size, max_overflow = engine_pool_size()
         db_engine = create_async_engine(
             db_url,
-            pool_size=10,  # Increased for parallel queries (read-only, safe to have more connections)
-            max_overflow=20,  # Increased for handling bursts of parallel queries
+            pool_size=pool_size,
+            max_overflow=max_overflow,
             echo=False,
             connect_args=connect_args
         )
         async_session_maker = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
     return db_engine
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database engine on startup."""
+# -------------------------------
+# Startup, shutdown and health
+# -------------------------------
+# Weather cache snapshot: loaded at startup and written at shutdown, so restarted workers start warm
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH", "")
+# Components that must be up for /health/ready to answer 200 (e.g. "database,road_index")
+READY_REQUIRE = [name.strip() for name in os.getenv("READY_REQUIRE", "").split(",") if name.strip()]
+
+# Startup state reported by /health/ready
+readiness: Dict = {"ready": False, "components": {}}
+
+async def startup():
+    """
+    Bring the worker to full speed before it takes traffic: open DB_POOL_MIN connections on the
+    engine and the asyncpg pool (which prepares the hot statements per connection), load the
+    road index and risk model, create the Google Maps client and load the weather snapshot.
+    """
+    start = time.perf_counter()
+    components = readiness["components"]
+    components["database"] = await init_database()
+    components["asyncpg"] = db.available()
+
+    await asyncio.gather(load_road_index(), asyncio.to_thread(risk.get_model))
+    components["road_index"] = road_index_data is not None if ROAD_INDEX_SOURCE else None
+    # False (degraded) without a trained model: sweeps answer 503 rather than rank on invented numbers
+    components["risk_model"] = risk.model_name() or False
+
+    try:
+        get_gmaps()
+        components["google_maps"] = True
+    except Exception as e:
+        components["google_maps"] = False
+        print(f"Warning: Could not create Google Maps client: {e}")
+
+    components["road_cells_warm"] = await warm_road_cells()
+
+    if CACHE_SNAPSHOT_PATH and os.path.exists(CACHE_SNAPSHOT_PATH):
+        try:
+            components["weather_snapshot"] = weather_store.load_snapshot(CACHE_SNAPSHOT_PATH)
+            print(f"Weather cache warmed with {components['weather_snapshot']} entries from {CACHE_SNAPSHOT_PATH}")
+        except Exception as e:
+            print(f"Warning: Could not load weather cache snapshot {CACHE_SNAPSHOT_PATH}: {e}")
+    weather_store.start_refresh_loop()
+
+    readiness["ready"] = True
+    print(f"Startup complete in {time.perf_counter() - start:.2f}s")
+
+
+async def warm_road_cells() -> int:
+    """Open the disk cache tier and load its longest-lived road cells into the in-process tier."""
+    global persistent_cache
+    persistent_cache = await asyncio.to_thread(disk_cache.open_cache)
+    if persistent_cache is None or ROAD_CELL_WARM <= 0:
+        return 0
+    start = time.perf_counter()
+    cells = await asyncio.to_thread(persistent_cache.warm, "road_grid", ROAD_CELL_WARM)
+    # Warm-loaded cells are re-checked against the disk tier after an hour
+    remember_road_cells({int(grid_key): road for grid_key, road in cells.items()}, time.time() + ROAD_CELL_MISS_TTL_S)
+    print(f"Road cells warmed with {len(cells)} entries from {persistent_cache.path} "
+          f"in {time.perf_counter() - start:.2f}s")
+    return len(cells)
+
+
+async def init_database() -> bool:
+    """Open and warm the engine pool and the asyncpg pools. Returns False if the database is unreachable."""
     try:
+        # asyncpg fast path for the hot spatial queries first: the engine is sized by whether it is up
+        # The scheduler's capacity follows the pools that can serve reads: the healthy replicas'
+        # (each brings its own pool), else the primary's; updated as replicas go down and come back
+        asyncpg_size = max(1, DB_CONNECTION_BUDGET - DB_ENGINE_POOL_SIZE)
+        db.capacity_listener = lambda capacity: setattr(db_scheduler, "capacity", capacity)
+        await db.init_pool(DB_HOST, DB_PORT, DB_NAME, get_db_user(), DB_PASS,
+                           min_size=min(DB_POOL_MIN, asyncpg_size),
+                           max_size=asyncpg_size, replica_dsns=DB_REPLICA_DSNS,
+                           server_settings=DB_SERVER_SETTINGS)
         engine = get_db_engine()
-        # Test connection
-        async with engine.begin() as conn:
-            await conn.execute(text("SELECT 1"))
-        print("Database connection pool initialized")
+        warm = min(DB_POOL_MIN, engine_pool_size()[0])
+        await warm_engine(engine, warm)
+        print(f"Database connection pool initialized ({warm} connections open)")
+        await detect_zoom_bands(engine)
+        return True
     except Exception as e:
         error_msg = str(e)
         print(f"Warning: Could not initialize database pool: {error_msg}")
@@ -122,14 +315,146 @@ async def startup_event():
             print("      Edit /etc/postgresql/*/main/pg_hba.conf and add:")
             print("      host    all    all    127.0.0.1/32    trust")
             print("      Then restart PostgreSQL: sudo systemctl restart postgresql")
+        return False
+
+
+async def warm_engine(engine, n: int):
+    """Open n pooled connections at once, so early requests do not wait on connection setup."""
+    conns = await asyncio.gather(*(engine.connect() for _ in range(n)))
+    try:
+        for conn in conns:
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in conns:
+            await conn.close()
+
+
+async def detect_zoom_bands(engine):
+    """Enable the zoom-band views (built by build_zoom_tables.py) that exist in the database."""
+    async with engine.begin() as conn:
+        result = await conn.execute(text("SELECT name FROM unnest(CAST(:names AS text[])) AS name "
+                                         "WHERE to_regclass(current_schema() || '.' || name) IS NOT NULL"),
+                                    {"names": [band.name for band in zoom_bands.BANDS]})
+        built = [row[0] for row in result]
+    zoom_bands.set_built(built)
+    print(f"Zoom-band road views: {', '.join(built) if built else 'none (display queries read the full table)'}")
+
+
+async def load_road_index():
+    """Build the in-memory road index from ROAD_INDEX_SOURCE, if configured."""
+    global road_index_data
+    if not ROAD_INDEX_SOURCE:
+        return
+    try:
+        if road_index.RoadIndex.is_saved(ROAD_INDEX_SOURCE):
+            road_index_data = await asyncio.to_thread(road_index.RoadIndex.load, ROAD_INDEX_SOURCE)
+        elif ROAD_INDEX_SOURCE == "db":
+            bbox = tuple(float(v) for v in ROAD_INDEX_BBOX.split(",")) if ROAD_INDEX_BBOX else None
+            settings = {"host": DB_HOST, "port": DB_PORT, "dbname": DB_NAME, "user": get_db_user(), "password": DB_PASS,
+                        "options": f"-csearch_path={DB_SEARCH_PATH}" if DB_SEARCH_PATH else None}
+            road_index_data = await asyncio.to_thread(road_index.load_from_db, settings, bbox)
+        else:
+            road_index_data = await asyncio.to_thread(road_index.load_from_parquet, ROAD_INDEX_SOURCE)
+        print(f"Road index loaded: {road_index_data.road_count} roads, {road_index_data.segment_count} segments")
+    except Exception as e:
+        road_index_data = None
+        print(f"Warning: Could not load road index from {ROAD_INDEX_SOURCE}: {e}")
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Close database engine on shutdown."""
+async def shutdown():
+    """Save the weather snapshot, then close the database pools and the weather client."""
     global db_engine
+    readiness["ready"] = False
+    await weather_store.stop()
+    if CACHE_SNAPSHOT_PATH:
+        try:
+            saved = weather_store.save_snapshot(CACHE_SNAPSHOT_PATH)
+            print(f"Weather cache snapshot saved ({saved} entries)")
+        except Exception as e:
+            print(f"Warning: Could not save weather cache snapshot {CACHE_SNAPSHOT_PATH}: {e}")
     if db_engine:
         await db_engine.dispose()
         print("Database connection pool closed")
+    await db.close_pool()
+    await weather_provider.close()
+    directions_executor.shutdown(wait=False, cancel_futures=True)
+    if redis_client is not None:
+        await redis_client.close()
+    if persistent_cache is not None:
+        persistent_cache.close()
+
+
+@app.get("/health/live")
+async def liveness():
+    """The worker is running (its event loop answers)."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Ready for traffic: startup finished, not shutting down, and every READY_REQUIRE component is up.
+    Components that are down but not required are listed as degraded.
+    """
+    components = readiness["components"]
+    missing = [name for name in READY_REQUIRE if not components.get(name)]
+    degraded = [name for name, value in components.items() if value is False and name not in missing]
+    ready = readiness["ready"] and not missing
+    content = {"ready": ready, "missing": missing, "degraded": degraded, "components": components}
+    if components.get("risk_model") is False:
+        content["risk_model_error"] = risk.model_error()
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+
+# -------------------------------
+# Admission control (per worker)
+# -------------------------------
+def admission_budget(name: str, default: str) -> admission.AdmissionBudget:
+    """Budget from ADMISSION_<NAME>="max_in_flight,max_queue,max_wait_s"."""
+    in_flight, queue, wait_s = os.getenv(f"ADMISSION_{name.upper()}", default).split(",")
+    return admission.AdmissionBudget(name, int(in_flight), int(queue), float(wait_s))
+
+admission_budgets = {
+    "routes": admission_budget("routes", "8,16,2.0"),
+    "lookups": admission_budget("lookups", "32,64,1.0"),
+    "cheap": admission_budget("cheap", "128,256,0.5"),
+}
+# Endpoint -> budget; endpoints not listed (/, /metrics/*) are always admitted
+ADMISSION_PATHS = {
+    "/routes": "routes",
+    "/routes/sweep": "routes",
+    "/routes/segment": "lookups",
+    "/roads/info": "lookups",
+    "/roads/bbox": "lookups",
+    "/weather": "cheap",
+}
+
+# End-to-end time budget per endpoint class, counted from arrival (admission queueing included).
+# Optional stages (weather, roads, extra samples) are cut short to meet it (see deadline.py)
+def deadline_budget(name: str, default_ms: str) -> float:
+    return float(os.getenv(f"DEADLINE_{name.upper()}_MS", default_ms)) / 1000
+
+request_deadlines = {
+    "routes": deadline_budget("routes", "2500"),
+    "lookups": deadline_budget("lookups", "1500"),
+    "cheap": deadline_budget("cheap", "1000"),
+}
+
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    """Bound in-flight work per endpoint class; answer 429 with Retry-After when saturated."""
+    budget_name = ADMISSION_PATHS.get(request.url.path)
+    if budget_name is None:
+        return await call_next(request)
+    try:
+        with deadline.scope(request_deadlines[budget_name]):
+            async with admission_budgets[budget_name].admit():
+                return await call_next(request)
+    except admission.Rejected as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"Server busy ({e.reason}), please retry", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
 
 origins=["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -142,6 +467,7 @@ app.add_middleware(
 )
 
 def save_schema(data,filename="directions_schema.json"):
+    from genson import SchemaBuilder
     builder = SchemaBuilder()
     builder.add_object(data)
     schema = builder.to_schema()  
@@ -164,93 +490,96 @@ async def fetch_google_routes(origin: str, destination: str, mode: str) -> List[
     if mode not in valid_modes:
         mode = "driving"
     
+    # Directions geometry is long-lived; served from memory or the disk tier when this trip was
+    # asked for recently
+    cache_key = f"{mode}|{origin.strip().lower()}|{destination.strip().lower()}"
+    entry = directions_memory.get(cache_key)
+    if entry is not None and entry[1] > time.time():
+        return entry[0]
+    if persistent_cache is not None:
+        cached = await asyncio.to_thread(persistent_cache.get, "directions", cache_key)
+        if cached:
+            return cached
+
+    # Required stage: bounded by the request deadline. A call that outlives it keeps running on
+    # the directions pool and its result is still cached, so a retry hits
+    budget = deadline.remaining()
     try:
-        directions = gmaps.directions(origin, destination, mode=mode, alternatives=True)
+        directions = await asyncio.wait_for(
+            asyncio.shield(directions_call(cache_key, origin, destination, mode)),
+            timeout=None if budget == float("inf") else budget)
         return directions if directions else []
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Directions request exceeded the request deadline")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch directions: {str(e)}")
 
 
-async def fetch_weather_for_coords(coords: List[Tuple[float, float]], sample_interval: int = 8) -> Dict[str, Dict]:
+def directions_call(cache_key: str, origin: str, destination: str, mode: str) -> asyncio.Future:
+    """The Directions call for this trip on the directions pool, shared with any request already waiting on it."""
+    future = directions_in_flight.get(cache_key)
+    if future is None:
+        future = asyncio.get_running_loop().run_in_executor(
+            directions_executor, fetch_and_cache_directions, cache_key, origin, destination, mode)
+        directions_in_flight[cache_key] = future
+        future.add_done_callback(lambda _: directions_in_flight.pop(cache_key, None))
+    return future
+
+
+def fetch_and_cache_directions(cache_key: str, origin: str, destination: str, mode: str) -> List[Dict]:
+    """Blocking Directions call (runs on the directions pool); caches the result whether or not anyone still waits."""
+    directions = get_gmaps().directions(origin, destination, mode=mode, alternatives=True)
+    if directions:
+        directions_memory.pop(cache_key, None)
+        directions_memory[cache_key] = (directions, time.time() + DIRECTIONS_CACHE_TTL_S)
+        excess = len(directions_memory) - DIRECTIONS_MEMORY_MAX
+        if excess > 0:
+            for key in list(itertools.islice(directions_memory, excess + DIRECTIONS_MEMORY_MAX // 10)):
+                directions_memory.pop(key, None)
+        if persistent_cache is not None:
+            try:
+                persistent_cache.set_many("directions", {cache_key: directions}, DIRECTIONS_CACHE_TTL_S)
+            except Exception as e:
+                print(f"Warning: Could not cache directions: {e}")
+    return directions
+
+
+async def fetch_weather_for_route(route: Route, spacing_scale: float = 1.0,
+                                  wait_s: Optional[float] = None) -> Dict[int, Dict]:
     """
-    Fetch weather data for sampled coordinates asynchronously.
-    Returns dict mapping grid_key -> weather_data.
+    Fetch weather data for the route's sampled coordinates asynchronously.
+    Returns dict mapping weather cell id -> weather_data.
+    With wait_s, cells not fetched in time are left out (their fetch still warms the cache).
     """
-    if not coords:
+    if not len(route):
         return {}
     
-    # Sample coordinates
-    sampled_indices = set()
-    sampled_indices.add(0)
-    sampled_indices.add(len(coords) - 1)
-    for i in range(0, len(coords), sample_interval):
-        sampled_indices.add(i)
-    
-    # Group sampled coordinates by 1km weather grid cells
-    weather_grid_map = defaultdict(list)
-    for idx in sorted(sampled_indices):
-        lat, lon = coords[idx]
-        weather_key = get_grid_key(lat, lon, grid_km=1.0)
-        weather_grid_map[weather_key].append((lat, lon))
-    
-    weather_cache = {}
-    weather_tasks = []
-    
-    # Check cache and prepare fetch tasks
-    for weather_key, coord_list in weather_grid_map.items():
-        if(usingRedis):
-            cached_weather = await redis_client.get(f"weather:{weather_key}")
-        else:
-            cached_weather = False
-        if cached_weather:
-            weather_cache[weather_key] = json.loads(cached_weather)
-        else:
-            grid_lat, grid_lon = map(float, weather_key.split(','))
-            weather_tasks.append((weather_key, grid_lat, grid_lon))
-    
-    # Fetch uncached weather in parallel
-    if weather_tasks:
-        async def fetch_weather_task(weather_key, grid_lat, grid_lon):
-            weather_data = await fetch_weather(grid_lat, grid_lon, use_grid=False)
-            if(usingRedis):
-                await redis_client.set(f"weather:{weather_key}", json.dumps(weather_data), ex=3600)
-            return weather_key, weather_data
-        
-        weather_results = await asyncio.gather(
-            *[fetch_weather_task(key, lat, lon) for key, lat, lon in weather_tasks],
-            return_exceptions=True
-        )
-        
-        for result in weather_results:
-            if isinstance(result, Exception):
-                continue
-            weather_key, weather_data = result
-            weather_cache[weather_key] = weather_data
+    # Unique 1km weather grid cells of the sampled coordinates (cached on the route)
+    weather_keys = np.unique(route.sample_cells(grid.WEATHER_CELL_KM, spacing_scale)).tolist()
     
-    return weather_cache
+    # Cached cells come back immediately (stale ones are refreshed in the background);
+    # misses are fetched in batched multi-location calls at the cell centers
+    return await weather_store.get_many(weather_keys, wait_s=wait_s)
 
 
-async def fetch_roads_for_coords(coords: List[Tuple[float, float]], sample_interval: int = 8) -> List[Optional[Dict]]:
+async def fetch_roads_for_route(route: Route, spacing_scale: float = 1.0) -> List[Optional[Dict]]:
     """
-    Fetch road data for sampled coordinates asynchronously.
+    Fetch road data for the route's sampled coordinates asynchronously.
     Returns list of road info dicts (one per sampled coordinate).
     """
-    if not coords:
+    if not len(route):
         return []
     
-    # Sample coordinates
-    sampled_indices = set()
-    sampled_indices.add(0)
-    sampled_indices.add(len(coords) - 1)
-    for i in range(0, len(coords), sample_interval):
-        sampled_indices.add(i)
+    sampled_indices = route.sample_indices(spacing_scale)
+    sampled_coords = route.points[sampled_indices]
+    print(f"[fetch_roads_for_route] Fetching roads for {len(sampled_coords)} sampled coordinates")
     
-    sampled_coords = [coords[idx] for idx in sorted(sampled_indices)]
-    print(f"[fetch_roads_for_coords] Fetching roads for {len(sampled_coords)} sampled coordinates")
-    
-    # Fetch roads for all sampled coordinates in parallel
-    # Increase search radius to 0.5km to ensure we find roads
-    nearest_roads = await fetch_nearest_roads_for_coords(sampled_coords, search_radius_km=0.5)
+    # Map-match the whole route when the road index is loaded; otherwise fetch
+    # roads for all sampled coordinates in parallel (0.5km radius to ensure we find roads)
+    if road_index_data is not None:
+        nearest_roads = await match_nearest_roads(route, sampled_indices)
+    else:
+        nearest_roads = await fetch_nearest_roads_for_coords(sampled_coords, search_radius_km=0.5)
     
     # Format road info
     road_info_list = []
@@ -284,7 +613,7 @@ async def fetch_roads_for_coords(coords: List[Tuple[float, float]], sample_inter
         else:
             # No road found for this coordinate
             lat, lon = sampled_coords[idx] if idx < len(sampled_coords) else (0, 0)
-            print(f"[fetch_roads_for_coords] No road found for coordinate ({lat:.5f}, {lon:.5f})")
+            print(f"[fetch_roads_for_route] No road found for coordinate ({lat:.5f}, {lon:.5f})")
             road_info_list.append({
                 "surface": "unknown",
                 "road_type": "unknown",
@@ -292,27 +621,51 @@ async def fetch_roads_for_coords(coords: List[Tuple[float, float]], sample_inter
                 "name": "Unknown Road"
             })
     
-    print(f"[fetch_roads_for_coords] Found roads for {found_count}/{len(sampled_coords)} coordinates")
+    print(f"[fetch_roads_for_route] Found roads for {found_count}/{len(sampled_coords)} coordinates")
     return road_info_list
 
 
-async def get_sampled_conditions(encoded_polyline: str, sample_interval: int = 8) -> List[Dict]:
+def arrival_times(route: Route, sampled_indices: np.ndarray, duration_s: Optional[float] = None,
+                  departure_time: Optional[float] = None) -> np.ndarray:
+    """
+    Estimated arrival time (unix seconds) at each sampled coordinate.
+    Spreads the route's total duration over its cumulative distance; without a
+    duration every point gets the departure time (default: now).
+    """
+    departure = time.time() if departure_time is None else departure_time
+    if not duration_s or len(route) < 2:
+        return np.full(len(sampled_indices), departure)
+    cum_dist = route.cum_dist
+    if cum_dist[-1] <= 0:
+        return np.full(len(sampled_indices), departure)
+    return departure + duration_s * cum_dist[sampled_indices] / cum_dist[-1]
+
+
+async def get_sampled_conditions(route: Route, spacing_scale: float = 1.0, duration_s: Optional[float] = None,
+                                 departure_time: Optional[float] = None) -> List[Dict]:
     """
     Get weather and road conditions for sampled coordinates only.
+    Weather is taken from each cell's hourly forecast at the point's estimated
+    arrival time (duration_s is the route's total driving time).
+    Weather and roads are optional stages: when the request deadline runs out
+    they are returned incomplete and recorded as partial (see deadline.py).
     Returns minimal condition data for sampled points.
     """
-    coords = polyline.decode(encoded_polyline)
-    if not coords:
+    if not len(route):
         return []
     
-    # Sample coordinates
-    sampled_indices = sorted(set([0, len(coords) - 1] + list(range(0, len(coords), sample_interval))))
-    sampled_coords = [(coords[idx][0], coords[idx][1]) for idx in sampled_indices]
+    # Sample coordinates (coarser when little of the request budget is left)
+    if deadline.running_low():
+        spacing_scale *= 2
+        deadline.mark_partial("samples")
+    sampled_indices = route.sample_indices(spacing_scale)
+    sampled_coords = route.points[sampled_indices].tolist()
+    weather_keys = route.sample_cells(grid.WEATHER_CELL_KM, spacing_scale).tolist()
     
-    # Fetch weather and roads in parallel
+    # Fetch weather and roads in parallel, within what is left of the request deadline
     weather_cache, nearest_roads = await asyncio.gather(
-        fetch_weather_for_coords(coords, sample_interval),
-        fetch_roads_for_coords(coords, sample_interval),
+        fetch_weather_for_route(route, spacing_scale, wait_s=deadline.optional_budget()),
+        deadline.bounded(fetch_roads_for_route(route, spacing_scale), "roads", []),
         return_exceptions=True
     )
     
@@ -323,12 +676,17 @@ async def get_sampled_conditions(encoded_polyline: str, sample_interval: int = 8
     if isinstance(nearest_roads, Exception):
         print(f"Error fetching roads: {nearest_roads}")
         nearest_roads = []
+    if any(key not in weather_cache for key in weather_keys):
+        deadline.mark_partial("weather")
+    
+    # Resolve each point's weather at its arrival time (array lookup in the cached series)
+    point_weather = weather.resolve_at_times(
+        weather_cache, weather_keys, arrival_times(route, sampled_indices, duration_s, departure_time))
     
     # Build minimal condition objects for sampled points only
     conditions = []
     for idx, (lat, lon) in enumerate(sampled_coords):
-        weather_key = get_grid_key(lat, lon, grid_km=1.0)
-        weather = weather_cache.get(weather_key, {})
+        weather_at_eta = point_weather[idx]
         road = nearest_roads[idx] if idx < len(nearest_roads) else {
             "surface": "unknown", "road_type": "unknown", "condition": "unknown", "name": "Unknown Road"
         }
@@ -337,7 +695,7 @@ async def get_sampled_conditions(encoded_polyline: str, sample_interval: int = 8
         conditions.append({
             "lat": round(lat, 5),  # Reduce precision to save space
             "lon": round(lon, 5),
-            "weathercode": weather.get("current_weather", {}).get("weathercode"),
+            "weathercode": weather_at_eta.get("current_weather", {}).get("weathercode"),
             "road_type": road.get("road_type"),
         })
     
@@ -345,31 +703,33 @@ async def get_sampled_conditions(encoded_polyline: str, sample_interval: int = 8
 
 
 @app.get("/routes")
-async def get_routes(origin, destination, mode):
+async def get_routes(origin, destination, mode, depart_at: Optional[float] = None):
     """
     Get routes from Google Maps API with optional sampled conditions.
-    Route fetching happens first, then conditions are fetched asynchronously.
+    Route fetching happens first, then conditions for all routes are fetched concurrently.
+    depart_at (unix seconds, default now) sets the clock for ETA-based weather.
+    Each route lists the condition stages cut short by the request deadline in "partial".
     """
-    # Step 1: Fetch routes from Google Maps (synchronous API call)
+    # Step 1: Fetch routes from Google Maps (required; bounded by the request deadline)
     directions = await fetch_google_routes(origin, destination, mode)
     
     if not directions:
         return []
     
     max_routes = min(3, len(directions))
-    routes = []
     
-    # Step 2: Process each route
-    for route_idx, route in enumerate(directions[:max_routes]):
+    # Step 2: Process each route; conditions share what is left of the deadline
+    async def process_route(route_idx: int, route: Dict) -> Optional[Dict]:
         try:
             encoded_polyline = route['overview_polyline']['points']
-            decoded_coords = polyline.decode(encoded_polyline)
+            # Decoded once; every stage below works on the same arrays
+            route_geometry = Route.from_polyline(encoded_polyline)
             
-            if not decoded_coords:
-                continue
+            if not len(route_geometry):
+                return None
             
             if not route.get('legs'):
-                continue
+                return None
             
             leg = route['legs'][0]
             
@@ -379,98 +739,68 @@ async def get_routes(origin, destination, mode):
                 "duration": leg['duration']['text'],
                 "polyline": encoded_polyline,
                 "summary": route.get('summary', 'Direct Route'),
-                "values": [random.random() for _ in decoded_coords],  # Risk values for gradient
+                "values": [random.random() for _ in range(len(route_geometry))],  # Risk values for gradient
             }
             
-            # Step 3: Fetch conditions asynchronously (only sampled points)
-            try:
-                conditions = await get_sampled_conditions(encoded_polyline, sample_interval=8)
-                route_data["conditions"] = conditions
-            except Exception as e:
-                print(f"Warning: Failed to get conditions for route {route_idx + 1}: {e}")
-                route_data["conditions"] = []
-            
-            routes.append(route_data)
+            # Step 3: Fetch conditions (only sampled points), tracking partial stages per route
+            with deadline.scope() as route_deadline:
+                try:
+                    duration_s = sum(l.get('duration', {}).get('value', 0) for l in route['legs'])
+                    conditions = await get_sampled_conditions(route_geometry, duration_s=duration_s,
+                                                              departure_time=depart_at)
+                    route_data["conditions"] = conditions
+                except Exception as e:
+                    print(f"Warning: Failed to get conditions for route {route_idx + 1}: {e}")
+                    route_data["conditions"] = []
+                    route_deadline.mark_partial("conditions")
+            route_data["partial"] = sorted(route_deadline.partial)
+            return route_data
                 
         except Exception as e:
             print(f"Error processing route {route_idx + 1}: {e}")
-            continue
+            return None
+    
+    processed = await asyncio.gather(*[process_route(idx, route) for idx, route in enumerate(directions[:max_routes])])
+    routes = [route_data for route_data in processed if route_data is not None]
     
     if not routes:
         raise HTTPException(status_code=500, detail="Failed to process any routes")
     
+    partial = deadline.partial_stages()
+    if partial:
+        print(f"[routes] Deadline reached; returned partial {', '.join(partial)}")
     return routes
 
 #resolve coordinate to a km^2 grid 
 
-def get_grid_key(lat: float, lon: float, grid_km: float = 1.0) -> str:
-    """Convert lat/lon into roughly 1 km² grid cell key."""
-    deg_per_km_lat = 1 / 111.32
-    deg_per_km_lon = 1 / (111.32 * math.cos(math.radians(lat)))
-    lat_step = deg_per_km_lat * grid_km
-    lon_step = deg_per_km_lon * grid_km
-    grid_lat = round(lat / lat_step) * lat_step
-    grid_lon = round(lon / lon_step) * lon_step
-    return f"{grid_lat:.4f},{grid_lon:.4f}"
+def get_grid_key(lat: float, lon: float, grid_km: float = 1.0) -> int:
+    """Convert lat/lon into a roughly 1 km² grid cell id (see grid.py)."""
+    return grid.cell_id(lat, lon, grid_km)
 
-def get_road_grid_key(lat: float, lon: float) -> str:
-    """Convert lat/lon into 500m x 500m grid cell key for road caching."""
-    return get_grid_key(lat, lon, grid_km=0.5)
+def get_road_grid_key(lat: float, lon: float) -> int:
+    """Convert lat/lon into 500m x 500m grid cell id for road caching."""
+    return grid.cell_id(lat, lon, grid.ROAD_CELL_KM)
 
 async def fetch_weather(lat: float, lon: float, use_grid: bool = True) -> Dict:
     """
-    Fetch fresh weather data from Open-Meteo.
-    Uses 1km grid cell center coordinates to maximize cache hits.
+    Weather for the grid cell containing a coordinate, served from the weather
+    cache (so popup lookups count towards hot-cell tracking and refresh);
+    misses are fetched from Open-Meteo at the cell center, batched with any
+    other cells requested at the same time.
     Returns format matching frontend RouteCondition.weather interface:
     { current_weather?: { temperature?, weathercode?, windspeed? }, error?: string }
     
     Parameters:
-    - lat, lon: Coordinate (will be snapped to grid center if use_grid=True)
-    - use_grid: If True, uses 1km grid cell center for API call (default: True)
+    - lat, lon: Coordinate (snapped to its grid cell)
+    - use_grid: Kept for compatibility; coordinates are always snapped to the grid
     """
     try:
-        # Snap to 1km grid cell center for better caching
-        if use_grid:
-            grid_key = get_grid_key(lat, lon, grid_km=1.0)
-            # Parse grid center coordinates from grid key
-            grid_lat, grid_lon = map(float, grid_key.split(','))
-            # Use grid center for API call
-            api_lat, api_lon = grid_lat, grid_lon
-        else:
-            api_lat, api_lon = lat, lon
-        
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.get(
-                meteo_url,
-                params={
-                    "latitude": api_lat,
-                    "longitude": api_lon,
-                    "current_weather": "true",
-                    "temperature_unit": "fahrenheit",
-                    "timezone": "America/Chicago"
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Format to match frontend expectations
-            # Frontend expects: { current_weather?: { temperature?, weathercode?, windspeed? }, error?: string }
-            if 'current_weather' in data:
-                current = data['current_weather']
-                return {
-                    "current_weather": {
-                        "temperature": current.get('temperature'),
-                        "weathercode": current.get('weathercode'),
-                        "windspeed": current.get('windspeed')
-                    }
-                }
-            else:
-                return {"error": "No current weather data available"}
+        return await weather_store.get(get_grid_key(lat, lon, grid_km=grid.WEATHER_CELL_KM))
     except Exception as e:
         return {"error": str(e)}
 
 @app.get("/routes/segment")
-async def get_route_segment_from_coord(lat: float, lon: float, polyline: str):
+async def get_route_segment_from_coord(lat: float, lon: float, encoded_polyline: str = Query(..., alias="polyline")):
     """
     Get road and weather information for a clicked coordinate on a route.
     Finds the nearest segment in the route polyline and returns its condition data.
@@ -486,27 +816,20 @@ async def get_route_segment_from_coord(lat: float, lon: float, polyline: str):
     """
     try:
         # Decode polyline to get route coordinates
-        route_coords = polyline.decode(polyline)
-        if not route_coords:
+        route = Route.from_polyline(encoded_polyline)
+        if not len(route):
             raise HTTPException(status_code=400, detail="Invalid polyline")
         
-        # Find nearest coordinate in the route
-        min_distance = float('inf')
-        nearest_idx = 0
-        
-        for idx, (route_lat, route_lon) in enumerate(route_coords):
-            distance = haversine_distance(lat, lon, route_lat, route_lon)
-            if distance < min_distance:
-                min_distance = distance
-                nearest_idx = idx
+        # Find nearest coordinate in the route (one array operation)
+        nearest_idx, min_distance = route.nearest_vertex(lat, lon)
         
         # If click is too far from route (> 100m), fall back to database lookup
         if min_distance > 0.1:  # 100 meters
             return await get_road_info(lat, lon)
         
         # Get conditions for this route
-        # Use smaller sample interval to get more accurate data for clicked point
-        conditions = await get_route_conditions(polyline, sample_interval=4)
+        # Use denser sampling to get more accurate data for clicked point
+        conditions = await get_route_conditions(route, spacing_scale=0.5)
         
         if not conditions or nearest_idx >= len(conditions):
             # Fall back to database lookup
@@ -558,6 +881,132 @@ async def get_route_segment_from_coord(lat: float, lon: float, polyline: str):
         # Fall back to regular road info lookup
         return await get_road_info(lat, lon)
 
+# Departure sweeps: at most 4 days of 15-minute slots; routes without a duration assume ~50 mph
+MAX_SWEEP_SLOTS = 384
+DEFAULT_SPEED_MPS = 22.0
+
+@app.get("/routes/sweep")
+async def sweep_departure_times(origin: Optional[str] = None, destination: Optional[str] = None, mode: str = "driving",
+                                encoded_polyline: Optional[str] = Query(None, alias="polyline"),
+                                duration: Optional[float] = None, start: Optional[float] = None,
+                                hours: float = 24, step_minutes: int = 60):
+    """
+    Risk curve for leaving at each slot of a time window ("when should I leave?").
+    
+    Takes either a polyline (with an optional duration in seconds) or an
+    origin/destination pair (first Directions route). Roads, geometry and each
+    cell's hourly forecast are fetched once; the (slot x sample point) feature
+    matrix is then scored in a single model call.
+    
+    Parameters:
+    - start: first departure (unix seconds, default now)
+    - hours, step_minutes: window length and slot spacing
+    
+    Returns: { slots: [{ departure_time, risk_mean, risk_max, high_risk_share }],
+               best_departure_time, samples, model, partial }
+    partial lists inputs cut short by the request deadline (scored without them), and
+    "forecast_horizon" when slots were dropped because the trip would run past (or start
+    before) the hourly forecast (WEATHER_FORECAST_DAYS from today's 00:00). A window that
+    lies entirely outside the forecast is a 400. Without a trained risk model (see risk.py)
+    there is nothing to rank the slots by, so the answer is a 503.
+    """
+    if risk.get_model() is None:
+        raise HTTPException(status_code=503, detail=f"Risk model unavailable ({risk.model_error()})")
+    if not encoded_polyline:
+        if not origin or not destination:
+            raise HTTPException(status_code=400, detail="Provide either polyline or origin and destination")
+        directions = await fetch_google_routes(origin, destination, mode)
+        if not directions or not directions[0].get('legs'):
+            raise HTTPException(status_code=404, detail="No route found")
+        encoded_polyline = directions[0]['overview_polyline']['points']
+        duration = sum(leg.get('duration', {}).get('value', 0) for leg in directions[0]['legs'])
+    
+    try:
+        route = Route.from_polyline(encoded_polyline)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not len(route):
+        raise HTTPException(status_code=400, detail="Empty polyline")
+    if step_minutes <= 0 or hours <= 0:
+        raise HTTPException(status_code=400, detail="hours and step_minutes must be positive")
+    n_slots = min(MAX_SWEEP_SLOTS, max(1, int(hours * 60 // step_minutes)))
+    
+    points = route.points
+    cum_dist = route.cum_dist
+    if not duration:
+        duration = route.length_m / DEFAULT_SPEED_MPS
+    sampled_indices = route.sample_indices()
+    weather_keys = route.sample_cells(grid.WEATHER_CELL_KM)
+    
+    # Clock-independent inputs, fetched once for every slot
+    if road_index_data is not None:
+        roads_task = match_nearest_roads(route, sampled_indices)
+    else:
+        roads_task = fetch_nearest_roads_for_coords(route.sample_points(), search_radius_km=0.1)
+    unique_weather_keys = np.unique(weather_keys).tolist()
+    roads, cell_weather = await asyncio.gather(
+        deadline.bounded(roads_task, "roads", [None] * len(sampled_indices)),
+        weather_store.get_many(unique_weather_keys, wait_s=deadline.optional_budget()),
+        return_exceptions=True)
+    if isinstance(roads, Exception):
+        print(f"[sweep] Error fetching roads: {roads}")
+        roads = [None] * len(sampled_indices)
+    if isinstance(cell_weather, Exception):
+        print(f"[sweep] Error fetching weather: {cell_weather}")
+        cell_weather = {}
+    if any(key not in cell_weather for key in unique_weather_keys):
+        deadline.mark_partial("weather")
+    
+    # (slots x points) arrival times and the weather code at each of them
+    first_departure = time.time() if start is None else start
+    departures = first_departure + np.arange(n_slots) * step_minutes * 60.0
+    eta = departures[:, None] + arrival_times(route, sampled_indices, duration, 0.0)[None, :]
+    
+    # Only slots whose whole trip lies inside the fetched forecast: outside it every ETA
+    # would get the current weather, and a flat fake curve could pick the best departure
+    window = weather.forecast_window(cell_weather, unique_weather_keys)
+    if window is None:
+        deadline.mark_partial("forecast_horizon")
+    else:
+        fits = (eta.min(axis=1) >= window[0]) & (eta.max(axis=1) < window[1])
+        if not fits.any():
+            raise HTTPException(status_code=400, detail="Departure window is outside the weather forecast horizon "
+                                f"({weather.FORECAST_DAYS} days from today)")
+        if not fits.all():
+            deadline.mark_partial("forecast_horizon")
+            departures, eta = departures[fits], eta[fits]
+            n_slots = len(departures)
+    weathercodes = weather.series_at_times(cell_weather, weather_keys, eta)
+    
+    # Each sample stands for the route between the midpoints to its neighbours
+    sample_dist = cum_dist[sampled_indices]
+    bounds = np.concatenate(([0.0], (sample_dist[1:] + sample_dist[:-1]) / 2, [cum_dist[-1]]))
+    weights = np.diff(bounds) / cum_dist[-1] if cum_dist[-1] > 0 else np.full(len(sampled_indices), 1 / len(sampled_indices))
+    
+    static = risk.static_features(list(roads), risk.route_geometry(points, sampled_indices))
+    X = risk.sweep_matrix(static, eta, weathercodes)
+    scores = await asyncio.to_thread(risk.score_sweep, X, weights)
+    
+    slots = [
+        {
+            "departure_time": int(departure),
+            "risk_mean": round(float(mean), 4),
+            "risk_max": round(float(peak), 4),
+            "high_risk_share": round(float(share), 4),
+        }
+        for departure, mean, peak, share in zip(departures, scores["mean"], scores["max"], scores["high_share"])
+    ]
+    print(f"[sweep] Scored {n_slots} slots x {len(sampled_indices)} samples in one batch")
+    return {
+        "slots": slots,
+        "best_departure_time": int(departures[int(np.argmin(scores["mean"]))]),
+        "duration": int(duration),
+        "samples": len(sampled_indices),
+        "model": risk.model_name(),
+        "partial": deadline.partial_stages(),
+    }
+
+
 @app.get("/roads/info")
 async def get_road_info(lat: float, lon: float):
     """
@@ -576,13 +1025,14 @@ async def get_road_info(lat: float, lon: float):
         east = lon + padding
         
         # Fetch roads in small area
-        roads_data = await fetch_road_data_db(south, west, north, east)
+        roads_data = await fetch_road_data_db(south, west, north, east, generalize=False)
         
         # Extract road info for this coordinate
         road_info = extract_road_info(roads_data, lat, lon)
         
-        # Get weather for this coordinate (uses grid center for caching)
-        weather_data = await fetch_weather(lat, lon, use_grid=True)
+        # Get weather for this coordinate (uses grid center for caching); optional under the deadline
+        weather_data = await deadline.bounded(fetch_weather(lat, lon, use_grid=True), "weather",
+                                              {"error": "timed out"})
         
         # Format weather for frontend popup
         # Frontend expects: { summary, temperature, windspeed, time }
@@ -638,14 +1088,62 @@ async def get_road_info(lat: float, lon: float):
         
         return {
             "road": road_formatted,
-            "weather": weather_formatted
+            "weather": weather_formatted,
+            "partial": deadline.partial_stages()
         }
+    except scheduler.SchedulerFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Error fetching road info: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to fetch road info: {str(e)}")
 
+@app.get("/roads/bbox")
+async def get_roads_in_bbox(south: float, west: float, north: float, east: float):
+    """
+    Roads in a map extent as a GeoJSON FeatureCollection (for the frontend roads layer).
+    Large extents are served from the zoom-band views (see zoom_bands.py).
+    """
+    if south >= north or west >= east:
+        raise HTTPException(status_code=400, detail="Expected south < north and west < east")
+    try:
+        roads = await fetch_road_data_db(south, west, north, east, limit=ROADS_BBOX_LIMIT)
+    except scheduler.SchedulerFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    features = []
+    for road in roads:
+        geometry = road.pop("geometry")
+        if len(geometry) < 2:
+            continue
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": [[lon, lat] for lat, lon in geometry]},
+            "properties": road,
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+@app.get("/metrics/db")
+async def get_db_metrics():
+    """DB scheduler state (capacity, running work, per-class queue/run times and rejections) and pool health."""
+    return {**db_scheduler.metrics(), "pools": db.metrics()}
+
+@app.get("/metrics/admission")
+async def get_admission_metrics():
+    """Admission budgets: in-flight and queued requests, rejections and the current Retry-After."""
+    return {name: budget.metrics() for name, budget in admission_budgets.items()}
+
+@app.get("/metrics/cache")
+async def get_cache_metrics():
+    """Cache tiers: weather cache counters, Redis node health and the disk tier."""
+    return {
+        "weather": weather_store.stats,
+        "road_cells_in_memory": len(road_cell_memory),
+        "redis": redis_client.metrics() if redis_client is not None else None,
+        "disk": persistent_cache.metrics() if persistent_cache is not None else None,
+    }
+
 @app.get("/weather")
 async def get_weather(lat: float, lon: float):
     """
@@ -653,28 +1151,11 @@ async def get_weather(lat: float, lon: float):
     Uses 1km grid cell center for API calls to maximize cache hits.
     """
     # Create grid key for ~1 km² area
-    grid_key = get_grid_key(lat, lon, grid_km=1.0)
-    cache_key = f"weather:{grid_key}"
+    grid_key = get_grid_key(lat, lon, grid_km=grid.WEATHER_CELL_KM)
 
-    # Check Redis for cached data
-    if(usingRedis):
-        cached = await redis_client.get(cache_key)
-    else:
-        cached = False
-
-    if cached:
-        print(f"Cache hit for weather grid {grid_key}")
-        return json.loads(cached)
-
-    # Otherwise fetch from API using grid center coordinates
-    print(f"Cache miss for weather grid {grid_key}, fetching new data...")
+    # Served from the weather cache; misses are fetched at the grid center
     try:
-        # fetch_weather will automatically use grid center coordinates
-        data = await fetch_weather(lat, lon, use_grid=True)
-        # Cache result for 1 hour
-        if(usingRedis):
-            await redis_client.set(cache_key, json.dumps(data), ex=3600)
-        return data
+        return await weather_store.get(grid_key)
     except httpx.TimeoutException:
         return {"status": "error", "message": "Weather API request timed out."}
     except httpx.RequestError as e:
@@ -684,17 +1165,20 @@ async def get_weather(lat: float, lon: float):
     except Exception as e:
         return {"status": "error", "message": f"Unexpected: {str(e)}"}
 
-def cluster_coordinates(coords: List[Tuple[float, float]], cluster_distance_km: float = 0.5) -> Dict[str, List[Tuple[float, float]]]:
+def cluster_coordinates(coords: List[Tuple[float, float]], cluster_distance_km: float = 0.5) -> Dict[int, List[Tuple[float, float]]]:
     """
     Cluster coordinates into groups based on proximity to reduce API calls.
-    Returns a dict mapping cluster keys to lists of coordinates in that cluster.
+    Returns a dict mapping cluster cell ids to lists of coordinates in that cluster.
     """
     clusters = defaultdict(list)
+    if not coords:
+        return clusters
     
-    for lat, lon in coords:
-        # Use grid key for clustering (same as weather caching)
-        cluster_key = get_grid_key(lat, lon, grid_km=cluster_distance_km)
-        clusters[cluster_key].append((lat, lon))
+    # Use grid cells for clustering (same as weather caching)
+    points = np.asarray(coords, dtype=np.float64)
+    cluster_keys = grid.cell_ids(points[:, 0], points[:, 1], cluster_distance_km).tolist()
+    for cluster_key, coord in zip(cluster_keys, coords):
+        clusters[cluster_key].append(coord)
     
     return clusters
 
@@ -710,9 +1194,13 @@ async def fetch_nearest_road_for_coord(lat: float, lon: float, search_radius_km:
     This is used as a helper function for parallel processing.
     """
     try:
+        if conn is None and db.available():
+            async with db_scheduler.slot(scheduler.INTERACTIVE):
+                road = await db.nearest_road(lat, lon, search_radius_km * 1000)
+            return road._asdict() if road else None
         if conn is None:
             engine = get_db_engine()
-            async with engine.begin() as conn:
+            async with db_scheduler.slot(scheduler.INTERACTIVE), engine.begin() as conn:
                 return await _fetch_nearest_road_query(lat, lon, search_radius_km, conn)
         else:
             return await _fetch_nearest_road_query(lat, lon, search_radius_km, conn)
@@ -724,35 +1212,14 @@ async def _fetch_nearest_road_query(lat: float, lon: float, search_radius_km: fl
     """Internal helper to execute the PostGIS query for a single coordinate."""
     radius_meters = search_radius_km * 1000
     
-    # Use geography casting for accurate distance calculations in meters
-    query = text("""
-    SELECT 
-        osm_id,
-        fclass,
-        name,
-        ref,
-        oneway,
-        maxspeed,
-        bridge,
-        tunnel,
-        ST_Distance(
-            geom::geography,
-            ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography
-        ) as distance_meters
-    FROM roads
-    WHERE ST_DWithin(
-        geom::geography,
-        ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography,
-        :radius_meters
-    )
-    ORDER BY distance_meters
-    LIMIT 1
-    """)
+    # Geography casting for accurate distances in meters; the bbox prefilter keeps it on the GiST index
+    query = text(db.FALLBACK_STATEMENTS["nearest_road"])
     
     result = await conn.execute(query, {
         "lat": lat,
         "lon": lon,
-        "radius_meters": radius_meters
+        "radius_meters": radius_meters,
+        "bbox_deg": db.bbox_degrees(lat, radius_meters)
     })
     row = result.fetchone()
     
@@ -793,44 +1260,126 @@ async def _fetch_nearest_road_query(lat: float, lon: float, search_radius_km: fl
         }
     return None
 
-async def fetch_nearest_roads_for_coords(coords: List[Tuple[float, float]], search_radius_km: float = 0.1) -> List[Dict]:
+async def match_nearest_roads(route: Route, sampled_indices: np.ndarray) -> List[Optional[Dict]]:
+    """
+    Map-match the full route against the in-memory road index and return the
+    matched road for each sampled index (None where the route left the road network).
+    Road attributes are built once per matched run, not once per sample.
+    """
+    index = road_index_data
+    points = route.points
+    runs = await asyncio.to_thread(matching.match_route, index, points, route.cum_dist)
+    records = {run.road: index.road_record(run.road) for run in runs if run.road != matching.UNMATCHED}
+
+    roads = matching.roads_at(runs, sampled_indices).tolist()
+    nearest = [records.get(road) for road in roads]
+    cells = grid.cell_ids(points[sampled_indices, 0], points[sampled_indices, 1], grid.ROAD_CELL_KM).tolist()
+    sampling.remember_road_classes(cells, [road["fclass"] if road else None for road in nearest])
+    print(f"[match_nearest_roads] {len(route)} vertices matched to {len(records)} roads in {len(runs)} runs")
+    return nearest
+
+
+# Cells per batched nearest-road statement on the asyncpg path
+NEAREST_ROAD_BATCH = int(os.getenv("NEAREST_ROAD_BATCH", "64"))
+
+# Road cell cache tiers: in-process dict, then Redis (when enabled), then the persistent disk
+# tier, which survives restarts and is warm-loaded into the dict at startup (see disk_cache.py)
+ROAD_CELL_TTL_S = float(os.getenv("ROAD_CELL_TTL_S", str(7 * 86400)))
+ROAD_CELL_MISS_TTL_S = 3600.0  # cells with no road nearby are retried sooner
+ROAD_CELL_MEMORY_MAX = int(os.getenv("ROAD_CELL_MEMORY_MAX", "200000"))
+road_cell_memory: Dict[int, Tuple[Optional[Dict], float]] = {}  # grid_key -> (road or None, expires_at)
+
+
+def remember_road_cells(cells: Dict[int, Optional[Dict]], expires_at: float):
+    """Put road cells in the in-process tier, dropping the oldest entries when it is full."""
+    for grid_key, road in cells.items():
+        road_cell_memory.pop(grid_key, None)
+        road_cell_memory[grid_key] = (road, expires_at)
+    excess = len(road_cell_memory) - ROAD_CELL_MEMORY_MAX
+    if excess > 0:
+        for grid_key in list(itertools.islice(road_cell_memory, excess + ROAD_CELL_MEMORY_MAX // 10)):
+            del road_cell_memory[grid_key]
+    sampling.remember_road_classes(
+        [grid_key for grid_key, road in cells.items() if road],
+        [road.get("fclass") for road in cells.values() if road])
+
+
+async def lookup_road_cells(grid_keys: List[int]) -> Dict[int, Optional[Dict]]:
+    """Cached road (or None for "no road here") for the grid cells found in any tier."""
+    now = time.time()
+    found: Dict[int, Optional[Dict]] = {}
+    for grid_key in grid_keys:
+        entry = road_cell_memory.get(grid_key)
+        if entry is not None and entry[1] > now:
+            found[grid_key] = entry[0]
+    remaining_keys = [grid_key for grid_key in grid_keys if grid_key not in found]
+    if remaining_keys and usingRedis:
+        values = await redis_client.mget([f"road_grid:{grid_key}" for grid_key in remaining_keys])
+        for grid_key, raw in zip(remaining_keys, values):
+            if raw:
+                found[grid_key] = json.loads(raw)  # None if cached value was None
+        remaining_keys = [grid_key for grid_key in remaining_keys if grid_key not in found]
+    if remaining_keys and persistent_cache is not None:
+        from_disk = await asyncio.to_thread(persistent_cache.get_many, "road_grid", remaining_keys)
+        # Re-read from disk at most hourly; the disk tier holds the real expiry
+        remember_road_cells(from_disk, now + ROAD_CELL_MISS_TTL_S)
+        found.update(from_disk)
+    return found
+
+
+async def store_road_cells(cells: Dict[int, Optional[Dict]]):
+    """Write freshly looked-up road cells to every tier (cells without a road get a shorter TTL)."""
+    if not cells:
+        return
+    roads = {grid_key: road for grid_key, road in cells.items() if road}
+    misses = {grid_key: None for grid_key, road in cells.items() if not road}
+    now = time.time()
+    remember_road_cells(roads, now + ROAD_CELL_TTL_S)
+    remember_road_cells(misses, now + ROAD_CELL_MISS_TTL_S)
+    if usingRedis:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for grid_key, road in cells.items():
+                pipe.set(f"road_grid:{grid_key}", json.dumps(road),
+                         ex=int(ROAD_CELL_TTL_S if road else ROAD_CELL_MISS_TTL_S))
+            await pipe.execute()
+    if persistent_cache is not None:
+        await asyncio.to_thread(persistent_cache.set_many, "road_grid", roads, ROAD_CELL_TTL_S)
+        await asyncio.to_thread(persistent_cache.set_many, "road_grid", misses, ROAD_CELL_MISS_TTL_S)
+
+async def fetch_nearest_roads_for_coords(coords: Sequence[Tuple[float, float]], search_radius_km: float = 0.1,
+                                         priority: int = scheduler.BULK) -> List[Dict]:
     """
     Efficiently find nearest road for each coordinate using PostGIS spatial queries.
     Uses grid-based caching (500m x 500m cells) and parallel database queries.
     
     Parameters:
-    - coords: List of (lat, lon) tuples
+    - coords: (lat, lon) pairs (a list of tuples or an (N, 2) array)
     - search_radius_km: Search radius in kilometers (default 100m)
+    - priority: DB scheduler class (route lookups are BULK)
     
     Returns: List of road info dicts, one per coordinate (None if no road found)
     """
-    if not coords:
+    if len(coords) == 0:
         return []
     
     try:
         # Group coordinates by 500m grid cells for caching
         grid_coords_map = defaultdict(list)  # grid_key -> [(coord_idx, lat, lon), ...]
-        coord_to_grid = {}  # coord_idx -> grid_key
+        points = np.asarray(coords, dtype=np.float64)
+        grid_keys = grid.cell_ids(points[:, 0], points[:, 1], grid.ROAD_CELL_KM).tolist()
         
-        for idx, (lat, lon) in enumerate(coords):
-            grid_key = get_road_grid_key(lat, lon)
+        for idx, ((lat, lon), grid_key) in enumerate(zip(points.tolist(), grid_keys)):
             grid_coords_map[grid_key].append((idx, lat, lon))
-            coord_to_grid[idx] = grid_key
         
-        # Check Redis cache for each grid cell
+        # Check the road cell cache tiers (memory, Redis, disk) for all grid cells at once
         cached_results = {}
         uncached_coords = []  # List of (coord_idx, lat, lon, grid_key)
+        cached_cells = await lookup_road_cells(list(grid_coords_map))
         
         for grid_key, coord_list in grid_coords_map.items():
-            cache_key = f"road_grid:{grid_key}"
-            if(usingRedis):
-                cached = await redis_client.get(cache_key)
-            else:
-                cached = False
-
-            if cached:
+            if grid_key in cached_cells:
                 # Cache hit - use cached road data for this grid cell
-                cached_road = json.loads(cached)  # Returns None if cached value was None
+                cached_road = cached_cells[grid_key]
                 for coord_idx, lat, lon in coord_list:
                     cached_results[coord_idx] = cached_road
             else:
@@ -844,47 +1393,64 @@ async def fetch_nearest_roads_for_coords(coords: List[Tuple[float, float]], sear
         if uncached_coords:
             print(f"Cache miss for {len(uncached_coords)} grid cells, querying database in parallel...")
             
-            engine = get_db_engine()
-            # Limit concurrent database connections to avoid exhausting the pool
-            # Use semaphore to limit to 8 concurrent connections (leaving room for other operations)
-            semaphore = asyncio.Semaphore(8)
-            
-            # Run queries in parallel using separate connections from the pool
-            # Since database is read-only, parallel queries are safe
-            # Use connect() instead of begin() for read-only queries (no transaction overhead)
-            async def fetch_with_connection(coord_idx, lat, lon, grid_key):
-                async with semaphore:  # Limit concurrent connections
-                    async with engine.connect() as conn:
-                        # Read-only query, no transaction needed
-                        result = await _fetch_nearest_road_query(lat, lon, search_radius_km, conn)
-                        return result
-            
-            # Create tasks for parallel execution
-            tasks = [
-                fetch_with_connection(coord_idx, lat, lon, grid_key)
-                for coord_idx, lat, lon, grid_key in uncached_coords
-            ]
-            query_results = await asyncio.gather(*tasks, return_exceptions=True)
+            if db.available():
+                # asyncpg fast path: one prepared statement per batch of cells (see db.py)
+                async def fetch_batch(batch):
+                    async with db_scheduler.slot(priority):
+                        rows = await db.nearest_roads([lat for _, lat, _, _ in batch], [lon for _, _, lon, _ in batch],
+                                                      search_radius_km * 1000)
+                    return [row._asdict() if row else None for row in rows]
+                
+                batches = [uncached_coords[i:i + NEAREST_ROAD_BATCH] for i in range(0, len(uncached_coords), NEAREST_ROAD_BATCH)]
+                batch_results = await asyncio.gather(*[fetch_batch(batch) for batch in batches], return_exceptions=True)
+                query_results = []
+                for batch, result in zip(batches, batch_results):
+                    query_results.extend([result] * len(batch) if isinstance(result, Exception) else result)
+            else:
+                engine = get_db_engine()
+                
+                # Run queries in parallel using separate connections from the pool; the shared
+                # DB scheduler caps concurrency across all requests and rejects work when saturated
+                # Use connect() instead of begin() for read-only queries (no transaction overhead)
+                async def fetch_with_connection(coord_idx, lat, lon, grid_key):
+                    async with db_scheduler.slot(priority):
+                        async with engine.connect() as conn:
+                            # Read-only query, no transaction needed
+                            result = await _fetch_nearest_road_query(lat, lon, search_radius_km, conn)
+                            return result
+                
+                # Create tasks for parallel execution
+                tasks = [
+                    fetch_with_connection(coord_idx, lat, lon, grid_key)
+                    for coord_idx, lat, lon, grid_key in uncached_coords
+                ]
+                query_results = await asyncio.gather(*tasks, return_exceptions=True)
             
             # Process results and cache by grid cell
+            fetched_cells = {}
+            rejected = sum(isinstance(result, scheduler.SchedulerFull) for result in query_results)
+            if rejected:
+                print(f"DB scheduler saturated: {rejected} road lookups rejected")
             for (coord_idx, lat, lon, grid_key), result in zip(uncached_coords, query_results):
+                if isinstance(result, scheduler.SchedulerFull):
+                    # Not cached, so the next request retries this cell
+                    continue
                 if isinstance(result, Exception):
                     print(f"Error in parallel query for ({lat}, {lon}): {result}")
                     road_data = None
                 else:
                     road_data = result
                 
-                # Cache the result for this grid cell (24 hour TTL)
-                cache_key = f"road_grid:{grid_key}"
-                if road_data and usingRedis:
-                    await redis_client.set(cache_key, json.dumps(road_data), ex=86400)
-                elif(usingRedis):
-                    # Cache None result too (shorter TTL to allow retry)
-                    await redis_client.set(cache_key, json.dumps(None), ex=3600)
+                # Cache the result for this grid cell (errors are not cached, so they are retried)
+                if not isinstance(result, Exception):
+                    fetched_cells[grid_key] = road_data
                 
                 # Assign result to all coordinates in this grid cell
                 for grid_coord_idx, grid_lat, grid_lon in grid_coords_map[grid_key]:
                     cached_results[grid_coord_idx] = road_data
+            
+            # One bulk write per tier; this also lets the sampler space later samples by road class
+            await store_road_cells(fetched_cells)
         
         # Build results list in original coordinate order
         results = [cached_results.get(idx) for idx in range(len(coords))]
@@ -904,41 +1470,34 @@ async def fetch_nearest_roads_for_coords(coords: List[Tuple[float, float]], sear
         traceback.print_exc()
         return [None] * len(coords)
 
-async def fetch_road_data_db(south: float, west: float, north: float, east: float) -> List[Dict]:
+async def fetch_road_data_db(south: float, west: float, north: float, east: float,
+                             priority: int = scheduler.INTERACTIVE, generalize: bool = True,
+                             limit: int = 1000) -> List[Dict]:
     """
     Fetch road data from local PostGIS database for a bounding box.
     Returns a list of road records with geometry and attributes.
     Consistent with schema: roads table with columns: osm_id, code, fclass, name, ref, oneway, maxspeed, layer, bridge, tunnel, geom
+    With generalize, large extents read the matching zoom-band view (fewer classes, merged and
+    simplified lines; see zoom_bands.py) instead of the full table.
+    Raises scheduler.SchedulerFull when the DB scheduler's queue for `priority` is full.
     """
+    band = zoom_bands.band_for_extent(south, west, north, east) if generalize else None
     try:
+        if db.available():
+            async with db_scheduler.slot(priority):
+                return [road._asdict() for road in await db.roads_in_bbox(south, west, north, east, limit, band)]
+        
         engine = get_db_engine()
-        async with engine.begin() as conn:
-            # Query roads within bounding box using PostGIS
-            # Using bounding box overlap operator (&&) for efficient spatial filtering
-            # Schema: roads table with geometry column 'geom' as LINESTRING, SRID 4326
-            query = text("""
-            SELECT 
-                osm_id,
-                code,
-                fclass,
-                name,
-                ref,
-                oneway,
-                maxspeed,
-                layer,
-                bridge,
-                tunnel,
-                ST_AsGeoJSON(geom)::json as geometry
-            FROM roads
-            WHERE geom && ST_MakeEnvelope(:west, :south, :east, :north, 4326)
-            LIMIT 1000
-            """)
+        async with db_scheduler.slot(priority), engine.begin() as conn:
+            # Bounding box overlap (&&) on the GiST-indexed geom column
+            query = text(db.FALLBACK_STATEMENTS["roads_in_bbox"].format(table=band.name if band else "roads"))
             
             result = await conn.execute(query, {
                 "west": west,
                 "south": south,
                 "east": east,
-                "north": north
+                "north": north,
+                "limit": limit
             })
             rows = result.fetchall()
             
@@ -1003,6 +1562,8 @@ async def fetch_road_data_db(south: float, west: float, north: float, east: floa
                 roads.append(road)
             
             return roads
+    except scheduler.SchedulerFull:
+        raise
     except Exception as e:
         print(f"Error fetching road data from database: {e}")
         import traceback
@@ -1093,117 +1654,57 @@ def extract_road_info(roads: List[Dict], target_lat: float, target_lon: float) -
         "name": name
     }
 
-async def get_route_conditions(encoded_polyline: str, sample_interval: int = 8) -> List[Dict]:
+async def get_route_conditions(route: Route, spacing_scale: float = 1.0) -> List[Dict]:
     """
-    Get weather and road conditions for each coordinate in a polyline.
-    Samples coordinates to reduce API calls (every Nth coordinate, default 8).
-    Uses a single OSM request for the entire route to minimize API calls.
+    Get weather and road conditions for each coordinate of a decoded route.
+    Samples coordinates by distance to reduce API calls (see sampling.py).
     """
-    # Decode polyline
-    coords = polyline.decode(encoded_polyline)
-    if not coords:
+    if not len(route):
         return []
     
-    # Get bounding box for entire route
-    lats = [lat for lat, lon in coords]
-    lons = [lon for lat, lon in coords]
-    south = min(lats)
-    north = max(lats)
-    west = min(lons)
-    east = max(lons)
-    
     # Note: We no longer cache all roads in bounding box
     # Instead, we use optimized PostGIS spatial queries to find nearest roads
     # for each sampled coordinate directly (much faster)
     
-    # Sample coordinates: always include first and last, then every Nth coordinate
-    num_coords = len(coords)
-    sampled_indices = set()
-    
-    # Always include first and last
-    sampled_indices.add(0)
-    sampled_indices.add(num_coords - 1)
+    # Sample coordinates by distance: always include first and last
+    num_coords = len(route)
+    sampled_indices = route.sample_indices(spacing_scale)
     
-    # Sample every Nth coordinate
-    for i in range(0, num_coords, sample_interval):
-        sampled_indices.add(i)
-    
-    # Sort indices for easier processing
-    sampled_indices = sorted(sampled_indices)
-    
-    print(f"Sampling {len(sampled_indices)} of {num_coords} coordinates (interval: {sample_interval})")
+    print(f"Sampling {len(sampled_indices)} of {num_coords} coordinates (spacing scale: {spacing_scale})")
     
     # Fetch conditions only for sampled coordinates
     sampled_conditions = {}
     weather_cache = {}
     
     # Collect all sampled coordinates for batch processing
-    sampled_coords = [(coords[idx][0], coords[idx][1]) for idx in sampled_indices]
+    sampled_coords = route.points[sampled_indices]
     
     # OPTIMIZATION: Use PostGIS spatial queries to find nearest roads for all sampled coordinates
     # This is much faster than loading all roads and computing distances in Python
-    print(f"Fetching nearest roads for {len(sampled_coords)} sampled coordinates using PostGIS spatial queries...")
-    nearest_roads = await fetch_nearest_roads_for_coords(sampled_coords, search_radius_km=0.1)
+    if road_index_data is not None:
+        print(f"Map matching {num_coords} coordinates against the road index...")
+        nearest_roads = await match_nearest_roads(route, sampled_indices)
+    else:
+        print(f"Fetching nearest roads for {len(sampled_coords)} sampled coordinates using PostGIS spatial queries...")
+        nearest_roads = await fetch_nearest_roads_for_coords(sampled_coords, search_radius_km=0.1)
     
     # Group coordinates by 1km weather grid cells for efficient caching
-    weather_grid_map = defaultdict(list)  # grid_key -> [(coord_idx, lat, lon), ...]
-    for coord_idx, idx in enumerate(sampled_indices):
-        lat, lon = coords[idx]
-        weather_key = get_grid_key(lat, lon, grid_km=1.0)  # 1km grid for weather
-        weather_grid_map[weather_key].append((coord_idx, idx, lat, lon))
-    
-    # Fetch weather for unique grid cells (parallel where possible)
-    print(f"Fetching weather for {len(weather_grid_map)} unique 1km grid cells...")
-    weather_tasks = []
-    for weather_key, coord_list in weather_grid_map.items():
-        # Check cache first
-        if(usingRedis):
-            cached_weather = await redis_client.get(f"weather:{weather_key}")
-        else:
-            cached_weather = False
-
-        if cached_weather:
-            # Cache hit - use cached data
-            weather_data = json.loads(cached_weather)
-            for coord_idx, idx, lat, lon in coord_list:
-                weather_cache[weather_key] = weather_data
-        else:
-            # Cache miss - need to fetch
-            # Parse grid center coordinates from grid key (already at grid center)
-            grid_lat, grid_lon = map(float, weather_key.split(','))
-            weather_tasks.append((weather_key, grid_lat, grid_lon, coord_list))
-    
-    # Fetch uncached weather in parallel
-    if weather_tasks:
-        async def fetch_weather_for_grid(weather_key, grid_lat, grid_lon, coord_list):
-            # Use grid center coordinates directly (no need to snap again)
-            weather_data = await fetch_weather(grid_lat, grid_lon, use_grid=False)  # Already at grid center
-            # Cache for 1 hour
-            if(usingRedis):
-                await redis_client.set(f"weather:{weather_key}", json.dumps(weather_data), ex=3600)
-            return weather_key, weather_data
-        
-        weather_fetch_tasks = [
-            fetch_weather_for_grid(weather_key, grid_lat, grid_lon, coord_list)
-            for weather_key, grid_lat, grid_lon, coord_list in weather_tasks
-        ]
-        weather_results = await asyncio.gather(*weather_fetch_tasks, return_exceptions=True)
-        
-        # Process weather results
-        for result in weather_results:
-            if isinstance(result, Exception):
-                print(f"Error fetching weather: {result}")
-                continue
-            weather_key, weather_data = result
-            weather_cache[weather_key] = weather_data
+    sampled_weather_keys = route.sample_cells(grid.WEATHER_CELL_KM, spacing_scale).tolist()
+    
+    # Fetch weather for unique grid cells (cache first, misses in batched calls)
+    unique_weather_keys = list(dict.fromkeys(sampled_weather_keys))
+    print(f"Fetching weather for {len(unique_weather_keys)} unique 1km grid cells...")
+    weather_cache = await weather_store.get_many(unique_weather_keys)
+    
+    # Current hour of each cell's forecast series (no route duration here, so every point uses now)
+    point_weather = weather.resolve_at_times(weather_cache, sampled_weather_keys, arrival_times(route, sampled_indices))
     
     # Process each sampled coordinate
-    for coord_idx, idx in enumerate(sampled_indices):
-        lat, lon = coords[idx]
+    for coord_idx, (idx, (lat, lon)) in enumerate(zip(sampled_indices.tolist(), sampled_coords.tolist())):
         
         # Get weather from cache (already fetched and cached by grid cell)
-        weather_key = get_grid_key(lat, lon, grid_km=1.0)
-        weather = weather_cache.get(weather_key, {"error": "Weather data not available"})
+        point = point_weather[coord_idx]
+        weather_data = point if point else {"error": "Weather data not available"}
         
         # Get road info from PostGIS query result (much faster than Python iteration)
         nearest_road = nearest_roads[coord_idx] if coord_idx < len(nearest_roads) else None
@@ -1245,15 +1746,24 @@ async def get_route_conditions(encoded_polyline: str, sample_interval: int = 8)
         sampled_conditions[idx] = {
             "lat": lat,
             "lon": lon,
-            "weather": weather,  # Already formatted by fetch_weather()
+            "weather": weather_data,  # Resolved from the cell's cached forecast
             "road": road_info     # Already formatted above
         }
     
     # Build results array: reuse conditions from nearest sampled point
+    return expand_sampled_conditions(route, sampled_indices, sampled_conditions)
+
+def expand_sampled_conditions(route: Route, sampled_indices: np.ndarray, sampled_conditions: Dict[int, Dict]) -> List[Dict]:
+    """Give every coordinate the condition of its nearest sampled coordinate (ties go to the earlier one)."""
+    sampled = np.asarray(sampled_indices, dtype=np.int64)
+    vertices = np.arange(len(route))
+    right = np.clip(np.searchsorted(sampled, vertices), 0, len(sampled) - 1)
+    left = np.maximum(right - 1, 0)
+    use_left = np.abs(vertices - sampled[left]) <= np.abs(sampled[right] - vertices)
+    nearest = np.where(use_left, sampled[left], sampled[right]).tolist()
+    
     results = []
-    for idx, (lat, lon) in enumerate(coords):
-        # Find nearest sampled index
-        nearest_sampled_idx = min(sampled_indices, key=lambda x: abs(x - idx))
+    for nearest_sampled_idx, (lat, lon) in zip(nearest, route.points.tolist()):
         condition = sampled_conditions[nearest_sampled_idx].copy()
         
         # Update lat/lon to match actual coordinate (for accurate display)
@@ -0,0 +1,4 @@
+"""
+Benchmarks and load tests for the AcciNet backend.
+Run modules from app/backend, e.g. `python -m benchmarks.loadtest`.
+"""
@@ -0,0 +1,71 @@
+"""
+Shared helpers for the benchmark scripts: database settings and the default
+set of benchmark routes.
+"""
+
+import getpass
+import os
+import subprocess
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Origin/destination pairs used when no recording is given on the command line.
+# Coordinates are "lat,lng" strings so the fake Directions server can synthesize
+# a route for them when no recorded payload exists.
+DEFAULT_ROUTES: List[Dict[str, str]] = [
+    {"name": "dallas-fort-worth", "origin": "32.7767,-96.7970", "destination": "32.7555,-97.3308"},
+    {"name": "houston-downtown-katy", "origin": "29.7604,-95.3698", "destination": "29.7858,-95.8245"},
+    {"name": "austin-round-rock", "origin": "30.2672,-97.7431", "destination": "30.5083,-97.6789"},
+]
+
+
+def db_settings() -> Dict[str, str]:
+    """
+    Resolve database settings from the environment, matching app.py:
+    USE_LOCAL_DB selects local Postgres or Supabase.
+    """
+    if os.getenv("USE_LOCAL_DB", "true").lower() == "true":
+        settings = {
+            "host": os.getenv("DB_HOST", "localhost"),
+            "port": os.getenv("DB_PORT", "5432"),
+            "dbname": os.getenv("DB_NAME", "accinet"),
+            "user": os.getenv("DB_USER", "postgres"),
+            "password": os.getenv("DB_PASS", ""),
+        }
+        # Peer authentication uses the system user
+        system_user = getpass.getuser()
+        if not settings["password"] and settings["user"] == "postgres" and system_user != "postgres":
+            settings["user"] = system_user
+        return settings
+
+    password = os.getenv("SUPABASE_DB_PASS", "")
+    if not password:
+        raise ValueError("Missing SUPABASE_DB_PASS in .env when using Supabase")
+    return {
+        "host": os.getenv("SUPABASE_DB_HOST", "db.supabase.co"),
+        "port": os.getenv("SUPABASE_DB_PORT", "5432"),
+        "dbname": os.getenv("SUPABASE_DB_NAME", "postgres"),
+        "user": os.getenv("SUPABASE_DB_USER", "postgres"),
+        "password": password,
+        "sslmode": "require",
+    }
+
+
+def pg_connect():
+    """Open a psycopg2 connection using db_settings()."""
+    import psycopg2
+
+    settings = {k: v for k, v in db_settings().items() if v}
+    return psycopg2.connect(**settings)
+
+
+def git_revision() -> str:
+    """Short hash of the checked-out commit, recorded with saved benchmark results."""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
@@ -0,0 +1,114 @@
+"""
+Local stand-ins for the Google Directions and Open-Meteo APIs.
+
+Start with:
+    uvicorn benchmarks.fake_providers:app --port 8900
+
+then point the backend at it:
+    GOOGLE_MAPS_BASE_URL=http://127.0.0.1:8900
+    OPEN_METEO_URL=http://127.0.0.1:8900/v1/forecast
+
+Latency is configurable per provider (milliseconds, with +/- jitter) through
+FAKE_DIRECTIONS_LATENCY_MS, FAKE_METEO_LATENCY_MS and FAKE_LATENCY_JITTER_MS.
+"""
+
+import asyncio
+import os
+import random
+import time
+import zlib
+from typing import Dict, List
+
+from fastapi import FastAPI, Request
+
+from benchmarks.fixtures import load_recordings, routes_for
+
+DIRECTIONS_LATENCY_MS = float(os.getenv("FAKE_DIRECTIONS_LATENCY_MS", "150"))
+METEO_LATENCY_MS = float(os.getenv("FAKE_METEO_LATENCY_MS", "80"))
+LATENCY_JITTER_MS = float(os.getenv("FAKE_LATENCY_JITTER_MS", "20"))
+
+app = FastAPI()
+recordings = load_recordings()
+stats = {"directions": 0, "forecast": 0, "forecast_locations": 0}
+
+
+async def simulate_latency(base_ms: float):
+    delay = max(0.0, base_ms + random.uniform(-LATENCY_JITTER_MS, LATENCY_JITTER_MS))
+    await asyncio.sleep(delay / 1000)
+
+
+def canned_current_weather(lat: float, lon: float) -> Dict:
+    """Deterministic weather for a location so repeated runs are comparable."""
+    seed = zlib.crc32(f"{lat:.4f},{lon:.4f}".encode())
+    rng = random.Random(seed)
+    return {
+        "temperature": round(rng.uniform(40, 100), 1),
+        "windspeed": round(rng.uniform(0, 25), 1),
+        "winddirection": rng.randint(0, 359),
+        "weathercode": rng.choice([0, 0, 0, 1, 2, 3, 45, 61, 63, 80, 95]),
+        "is_day": 1,
+        "time": "2025-01-01T12:00",
+    }
+
+
+def canned_hourly(lat: float, lon: float, days: int) -> Dict:
+    """Deterministic hourly series (unix hour starts from today's midnight UTC)."""
+    rng = random.Random(zlib.crc32(f"{lat:.4f},{lon:.4f}:hourly".encode()))
+    start = int(time.time()) // 86400 * 86400
+    hours = 24 * days
+    return {
+        "time": [start + 3600 * h for h in range(hours)],
+        "temperature_2m": [round(rng.uniform(40, 100), 1) for _ in range(hours)],
+        "weathercode": [rng.choice([0, 0, 0, 1, 2, 3, 45, 61, 63, 80, 95]) for _ in range(hours)],
+        "windspeed_10m": [round(rng.uniform(0, 25), 1) for _ in range(hours)],
+    }
+
+
+def forecast_for(lat: float, lon: float, hourly: bool = False, days: int = 2) -> Dict:
+    result = {
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": "America/Chicago",
+        "current_weather": canned_current_weather(lat, lon),
+    }
+    if hourly:
+        result["hourly"] = canned_hourly(lat, lon, days)
+    return result
+
+
+@app.get("/maps/api/directions/json")
+async def directions(origin: str, destination: str, mode: str = "driving"):
+    stats["directions"] += 1
+    await simulate_latency(DIRECTIONS_LATENCY_MS)
+    routes = routes_for(origin, destination, recordings)
+    if not routes:
+        return {"status": "ZERO_RESULTS", "routes": [], "geocoded_waypoints": []}
+    return {"status": "OK", "routes": routes, "geocoded_waypoints": []}
+
+
+@app.get("/v1/forecast")
+async def forecast(request: Request):
+    # Open-Meteo accepts comma-separated coordinate lists and then answers with a list
+    params = request.query_params
+    lats = [float(v) for v in params.get("latitude", "0").split(",")]
+    lons = [float(v) for v in params.get("longitude", "0").split(",")]
+    stats["forecast"] += 1
+    stats["forecast_locations"] += len(lats)
+    await simulate_latency(METEO_LATENCY_MS)
+    hourly = bool(params.get("hourly"))
+    days = int(params.get("forecast_days", "7"))
+    results: List[Dict] = [forecast_for(lat, lon, hourly, days) for lat, lon in zip(lats, lons)]
+    return results[0] if len(results) == 1 else results
+
+
+@app.get("/stats")
+async def get_stats():
+    """Upstream call counts, so a run can report calls per request."""
+    return stats
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    for key in stats:
+        stats[key] = 0
+    return stats
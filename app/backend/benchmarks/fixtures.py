@@ -0,0 +1,135 @@
+"""
+Directions payloads for the load-test harness.
+
+Recorded payloads live in benchmarks/recordings/*.json with the shape
+    {"origin": str, "destination": str, "mode": str, "routes": [...]}
+where "routes" is exactly what the Google Directions API returned. Use
+`python -m benchmarks.loadtest record ...` to capture new ones. When no
+recording matches, a deterministic route is synthesized between the two
+"lat,lng" endpoints so the harness also works fully offline.
+"""
+
+import glob
+import json
+import math
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+
+import polyline
+
+from benchmarks.common import DEFAULT_ROUTES
+
+RECORDINGS_DIR = os.getenv(
+    "BENCH_RECORDINGS_DIR",
+    os.path.join(os.path.dirname(__file__), "recordings"),
+)
+
+
+def recording_key(origin: str, destination: str) -> str:
+    return f"{origin.strip().lower()}|{destination.strip().lower()}"
+
+
+def load_recordings(directory: str = RECORDINGS_DIR) -> Dict[str, Dict]:
+    """Load all recorded payloads keyed by recording_key(origin, destination)."""
+    recordings = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        recordings[recording_key(data["origin"], data["destination"])] = data
+    return recordings
+
+
+def benchmark_routes() -> List[Dict[str, str]]:
+    """DEFAULT_ROUTES plus every recorded origin/destination pair."""
+    routes = list(DEFAULT_ROUTES)
+    for key, data in load_recordings().items():
+        name = key.replace("|", "-").replace(" ", "").replace(",", "_")
+        routes.append({"name": name, "origin": data["origin"], "destination": data["destination"]})
+    return routes
+
+
+def save_recording(name: str, origin: str, destination: str, mode: str, routes: List[Dict],
+                   directory: str = RECORDINGS_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"origin": origin, "destination": destination, "mode": mode, "routes": routes}, f)
+    return path
+
+
+def parse_latlng(value: str) -> Optional[Tuple[float, float]]:
+    try:
+        lat, lng = (float(part) for part in value.split(","))
+        return lat, lng
+    except ValueError:
+        return None
+
+
+def synthesize_path(origin: Tuple[float, float], destination: Tuple[float, float],
+                    spacing_km: float = 0.15, seed: int = 0, bend: float = 0.0) -> List[Tuple[float, float]]:
+    """
+    Build a gently curving path between two points with roughly one vertex per
+    spacing_km, similar in density to a Google overview polyline.
+    """
+    rng = random.Random(seed)
+    lat1, lon1 = origin
+    lat2, lon2 = destination
+    dist_km = math.hypot((lat2 - lat1) * 111.32, (lon2 - lon1) * 111.32 * math.cos(math.radians(lat1)))
+    n = max(2, int(dist_km / spacing_km))
+    # Perpendicular offset direction for the bend
+    perp_lat, perp_lon = -(lon2 - lon1), (lat2 - lat1)
+    coords = []
+    for i in range(n + 1):
+        t = i / n
+        offset = bend * math.sin(math.pi * t)
+        jitter = 0.0 if i in (0, n) else rng.uniform(-2e-5, 2e-5)
+        coords.append((
+            lat1 + (lat2 - lat1) * t + perp_lat * offset + jitter,
+            lon1 + (lon2 - lon1) * t + perp_lon * offset + jitter,
+        ))
+    return coords
+
+
+def synthesize_routes(origin: str, destination: str, alternatives: int = 3) -> List[Dict]:
+    """Synthesize Directions API `routes` for two "lat,lng" strings."""
+    start = parse_latlng(origin)
+    end = parse_latlng(destination)
+    if start is None or end is None:
+        return []
+
+    routes = []
+    for alt in range(alternatives):
+        coords = synthesize_path(start, end, seed=alt, bend=(0.0, 0.08, -0.08)[alt % 3])
+        dist_m = sum(
+            math.hypot((b[0] - a[0]) * 111320, (b[1] - a[1]) * 111320 * math.cos(math.radians(a[0])))
+            for a, b in zip(coords, coords[1:])
+        )
+        duration_s = dist_m / 22.0  # ~50 mph average
+        routes.append({
+            "summary": f"Synthetic Route {alt + 1}",
+            "bounds": {
+                "northeast": {"lat": max(c[0] for c in coords), "lng": max(c[1] for c in coords)},
+                "southwest": {"lat": min(c[0] for c in coords), "lng": min(c[1] for c in coords)},
+            },
+            "legs": [{
+                "distance": {"text": f"{dist_m / 1609.34:.1f} mi", "value": int(dist_m)},
+                "duration": {"text": f"{int(duration_s // 60)} mins", "value": int(duration_s)},
+                "start_location": {"lat": coords[0][0], "lng": coords[0][1]},
+                "end_location": {"lat": coords[-1][0], "lng": coords[-1][1]},
+                "steps": [],
+            }],
+            "overview_polyline": {"points": polyline.encode(coords)},
+            "warnings": [],
+            "waypoint_order": [],
+        })
+    return routes
+
+
+def routes_for(origin: str, destination: str, recordings: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """Return recorded routes for an origin/destination pair, or synthesized ones."""
+    if recordings:
+        recorded = recordings.get(recording_key(origin, destination))
+        if recorded:
+            return recorded["routes"]
+    return synthesize_routes(origin, destination)
@@ -0,0 +1,269 @@
+"""
+Load-test harness for the AcciNet backend.
+
+Starts the local provider stand-ins (benchmarks/fake_providers.py) and the
+FastAPI app pointed at them, then drives /routes, /routes/segment,
+/roads/info and /weather at a configurable concurrency and reports
+throughput plus p50/p95/p99 latency per endpoint. Results can be saved as
+JSON and compared against an earlier run to get a before/after baseline for
+performance changes.
+
+The database is whatever the usual DB_* / SUPABASE_* settings point at; with
+`--seed` the benchmark road sample is loaded into a scratch schema that the
+app reads for the run (see seed.py) and that is dropped afterwards.
+
+Usage (from app/backend):
+    python -m benchmarks.loadtest run --concurrency 16 --requests 200 --output before.json
+    python -m benchmarks.loadtest run --baseline before.json
+    python -m benchmarks.loadtest record --name dallas-fort-worth --origin "Dallas, TX" --destination "Fort Worth, TX"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import polyline
+
+from benchmarks.fixtures import benchmark_routes, load_recordings, routes_for, save_recording
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ["routes", "segment", "roads", "weather"]
+
+
+# -------------------------------
+# Process management
+# -------------------------------
+def start_server(target: str, port: int, env: Dict[str, str], workers: int = 1) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning"]
+    if workers > 1:
+        cmd += ["--workers", str(workers)]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env={**os.environ, **env})
+
+
+async def wait_until_up(url: str, timeout_s: float = 30.0):
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(timeout=2) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout_s:.0f}s")
+
+
+# -------------------------------
+# Request generation
+# -------------------------------
+def build_targets(routes: List[Dict], seed: int = 0) -> Dict[str, List[Dict]]:
+    """Build the query parameter pool for every endpoint from the benchmark routes."""
+    rng = random.Random(seed)
+    recordings = load_recordings()
+    targets = {name: [] for name in ENDPOINTS}
+    for route in routes:
+        targets["routes"].append({"origin": route["origin"], "destination": route["destination"], "mode": "driving"})
+        for payload in routes_for(route["origin"], route["destination"], recordings):
+            encoded = payload["overview_polyline"]["points"]
+            coords = polyline.decode(encoded)
+            for lat, lon in rng.sample(coords, min(20, len(coords))):
+                targets["segment"].append({"lat": lat, "lon": lon, "polyline": encoded})
+                targets["roads"].append({"lat": lat + rng.uniform(-0.002, 0.002), "lon": lon + rng.uniform(-0.002, 0.002)})
+                targets["weather"].append({"lat": lat, "lon": lon})
+    return targets
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def run_endpoint(client: httpx.AsyncClient, path: str, params_pool: List[Dict],
+                       total: int, concurrency: int) -> Dict:
+    """Fire `total` requests at `path` with `concurrency` workers and summarize latency."""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            params = params_pool[i % len(params_pool)]
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "statuses": statuses,
+    }
+
+
+# -------------------------------
+# Reporting
+# -------------------------------
+def print_report(results: Dict[str, Dict], baseline: Optional[Dict[str, Dict]] = None):
+    header = f"{'endpoint':<10} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'upstream/req':>13}  statuses"
+    print("\n" + header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<10} {r['throughput_rps']:>8.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['p99_ms']:>9.1f} {r.get('upstream_per_request', 0):>13.2f}  {r['statuses']}")
+        if baseline and name in baseline:
+            b = baseline[name]
+            deltas = []
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+                if b.get(key):
+                    deltas.append(f"{key} {100 * (r[key] - b[key]) / b[key]:+.1f}%")
+            print(f"{'':<10} vs baseline: " + ", ".join(deltas))
+
+
+async def run(args):
+    provider_url = f"http://127.0.0.1:{args.provider_port}"
+    provider = start_server("benchmarks.fake_providers:app", args.provider_port, {
+        "FAKE_DIRECTIONS_LATENCY_MS": str(args.directions_latency_ms),
+        "FAKE_METEO_LATENCY_MS": str(args.meteo_latency_ms),
+    })
+    app_proc = None
+    # Persistent caches go to a per-run scratch directory, so every run starts cold and
+    # before/after runs stay comparable
+    scratch = tempfile.TemporaryDirectory(prefix="loadtest-")
+    seeded = False
+    try:
+        await wait_until_up(f"{provider_url}/stats")
+        app_env = {}
+        if args.seed:
+            # The road sample goes into a scratch schema (dropped below) that the app reads
+            # through its search path; the real roads table is never modified
+            from benchmarks import seed as bench_seed
+            count = bench_seed.seed(benchmark_routes())
+            seeded = True
+            app_env["DB_SEARCH_PATH"] = bench_seed.search_path()
+            print(f"🌱 Seeded {count} benchmark roads into {bench_seed.SCRATCH_SCHEMA}")
+            if args.base_url:
+                print(f"   ⚠️  {args.base_url} reads them only if started with DB_SEARCH_PATH='{app_env['DB_SEARCH_PATH']}'")
+
+        base_url = args.base_url
+        if not base_url:
+            base_url = f"http://127.0.0.1:{args.app_port}"
+            app_proc = start_server("app:app", args.app_port, {
+                "GOOGLE_MAPS_BASE_URL": provider_url,
+                "GOOGLE_MAPS_API_KEY": os.getenv("GOOGLE_MAPS_API_KEY") or "AIza-benchmark-key",
+                "OPEN_METEO_URL": f"{provider_url}/v1/forecast",
+                "DISK_CACHE_PATH": os.path.join(scratch.name, "cache.sqlite3"),
+                "CACHE_SNAPSHOT_PATH": os.path.join(scratch.name, "weather_snapshot.json"),
+                **app_env,
+            }, workers=args.workers)
+        await wait_until_up(f"{base_url}/")
+
+        targets = build_targets(benchmark_routes())
+        paths = {"routes": "/routes", "segment": "/routes/segment", "roads": "/roads/info", "weather": "/weather"}
+        results = {}
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout_s,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client, \
+                httpx.AsyncClient(base_url=provider_url) as provider_client:
+            for name in args.endpoints:
+                print(f"🚗 {name}: {args.requests} requests at concurrency {args.concurrency}...")
+                if args.warmup:
+                    await run_endpoint(client, paths[name], targets[name], args.warmup, args.concurrency)
+                await provider_client.post("/stats/reset")
+                result = await run_endpoint(client, paths[name], targets[name], args.requests, args.concurrency)
+                upstream = (await provider_client.get("/stats")).json()
+                result["upstream"] = upstream
+                result["upstream_per_request"] = (upstream["directions"] + upstream["forecast"]) / args.requests
+                results[name] = result
+
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        print_report(results, baseline)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"config": {k: v for k, v in vars(args).items() if k != "func"},
+                           "results": results}, f, indent=2)
+            print(f"\n💾 Saved results to {args.output}")
+    finally:
+        for proc in (app_proc, provider):
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=10)
+        scratch.cleanup()
+        if seeded:
+            from benchmarks import seed as bench_seed
+            bench_seed.drop_scratch()
+
+
+def record(args):
+    """Capture a live Directions response so later runs replay real geometry."""
+    import googlemaps
+
+    gmaps = googlemaps.Client(key=os.getenv("GOOGLE_MAPS_API_KEY"))
+    routes = gmaps.directions(args.origin, args.destination, mode=args.mode, alternatives=True)
+    path = save_recording(args.name, args.origin, args.destination, args.mode, routes)
+    print(f"💾 Recorded {len(routes)} route(s) to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AcciNet backend load test")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the load test against local fake providers")
+    run_parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    run_parser.add_argument("--concurrency", type=int, default=8)
+    run_parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint")
+    run_parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per endpoint")
+    run_parser.add_argument("--timeout-s", type=float, default=60.0)
+    run_parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    run_parser.add_argument("--app-port", type=int, default=8901)
+    run_parser.add_argument("--provider-port", type=int, default=8900)
+    run_parser.add_argument("--base-url", help="Target an already running app instead of starting one")
+    run_parser.add_argument("--directions-latency-ms", type=float, default=150.0)
+    run_parser.add_argument("--meteo-latency-ms", type=float, default=80.0)
+    run_parser.add_argument("--seed", action="store_true", help="Seed a scratch schema with the benchmark road sample and point the app at it")
+    run_parser.add_argument("--output", help="Write results JSON here")
+    run_parser.add_argument("--baseline", help="Compare against a previously saved results JSON")
+    run_parser.set_defaults(func=lambda a: asyncio.run(run(a)))
+
+    record_parser = sub.add_parser("record", help="Record a live Google Directions payload")
+    record_parser.add_argument("--name", required=True)
+    record_parser.add_argument("--origin", required=True)
+    record_parser.add_argument("--destination", required=True)
+    record_parser.add_argument("--mode", default="driving")
+    record_parser.set_defaults(func=record)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
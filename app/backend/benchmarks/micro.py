@@ -0,0 +1,204 @@
+"""
+Micro-benchmarks for the backend's per-request pure-Python functions.
+
+Each case runs on generated routes of 100 to 20,000 vertices (and synthetic
+road sets where relevant), so the numbers reflect realistic route sizes.
+Results are written as JSON and can be compared against an earlier run;
+the command exits non-zero when any case got slower than the threshold,
+so it can gate changes the same way a test run would.
+
+Usage (from app/backend):
+    python -m benchmarks.micro --output micro-before.json
+    python -m benchmarks.micro --baseline micro-before.json --threshold 1.2
+    python -m benchmarks.micro --filter grid --sizes 1000 20000
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from statistics import median
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import polyline
+
+import app as backend
+import grid
+import matching
+import road_index
+import route
+from benchmarks.common import git_revision
+from benchmarks.fixtures import synthesize_path
+from benchmarks.seed import offset_path
+
+DEFAULT_SIZES = [100, 1000, 5000, 20000]
+ROAD_SET_SIZE = 500
+
+Case = Tuple[str, int, Callable[[], object]]
+
+
+# -------------------------------
+# Data generation
+# -------------------------------
+def generate_route(n_vertices: int, seed: int = 0) -> List[Tuple[float, float]]:
+    """A Dallas-area route with exactly n_vertices vertices and realistic spacing (~150 m)."""
+    rng = random.Random(seed)
+    start = (32.7767, -96.7970)
+    span_km = n_vertices * 0.15
+    heading = rng.uniform(0, 6.283)
+    end = (start[0] + span_km / 111.32 * 0.7 * (1 if heading < 3.14 else -1),
+           start[1] - span_km / 94.0 * 0.7)
+    coords = synthesize_path(start, end, spacing_km=span_km / max(1, n_vertices - 1), seed=seed, bend=0.05)
+    return coords[:n_vertices]
+
+
+def generate_roads(coords: List[Tuple[float, float]], n_roads: int = ROAD_SET_SIZE, seed: int = 0) -> List[Dict]:
+    """Road records shaped like fetch_road_data_db() output, scattered around a route."""
+    rng = random.Random(seed)
+    fclasses = ["motorway", "primary", "secondary", "tertiary", "residential", "track"]
+    roads = []
+    for i in range(n_roads):
+        lat, lon = coords[rng.randrange(len(coords))]
+        lat += rng.uniform(-0.005, 0.005)
+        lon += rng.uniform(-0.005, 0.005)
+        geometry = [[lat + k * 0.0004, lon + k * rng.uniform(-0.0004, 0.0004)] for k in range(rng.randint(2, 12))]
+        roads.append({
+            "osm_id": str(i), "fclass": rng.choice(fclasses), "name": f"Road {i}", "ref": None,
+            "oneway": "B", "maxspeed": 0, "bridge": "F", "tunnel": "F", "geometry": geometry,
+        })
+    return roads
+
+
+def generate_road_index(coords: List[Tuple[float, float]]) -> road_index.RoadIndex:
+    """A RoadIndex with a motorway along the route and a frontage road 35 m beside it."""
+    frontage = offset_path(coords, 35.0)
+
+    def records():
+        for i in range(0, len(coords) - 1, 20):
+            yield ({"osm_id": i, "fclass": "motorway", "ref": "I-99"}, np.asarray(coords[i:i + 21]))
+            yield ({"osm_id": -i, "fclass": "primary", "name": "Frontage Road"}, np.asarray(frontage[i:i + 21]))
+
+    return road_index.RoadIndex.build(records())
+
+
+# -------------------------------
+# Cases
+# -------------------------------
+def build_cases(sizes: List[int]) -> List[Case]:
+    cases: List[Case] = []
+    for n in sizes:
+        coords = generate_route(n, seed=n)
+        encoded = polyline.encode(coords)
+        points = np.asarray(coords, dtype=np.float64)
+        roads = generate_roads(coords, seed=n)
+        decoded = route.Route(points)
+        sampled = decoded.sample_indices()
+        sampled_conditions = {idx: {"lat": coords[idx][0], "lon": coords[idx][1], "weather": {}, "road": {}}
+                              for idx in sampled.tolist()}
+        probe = coords[len(coords) // 2]
+        index = generate_road_index(coords)
+
+        cases += [
+            ("polyline.decode", n, lambda encoded=encoded: polyline.decode(encoded)),
+            ("polyline.encode", n, lambda coords=coords: polyline.encode(coords)),
+            ("route.decode_polyline", n, lambda encoded=encoded: route.decode_polyline(encoded)),
+            ("route.encode_polyline", n, lambda points=points: route.encode_polyline(points)),
+            ("get_grid_key", n, lambda coords=coords: [backend.get_grid_key(lat, lon, grid_km=1.0) for lat, lon in coords]),
+            ("grid.cell_ids", n, lambda points=points: grid.cell_ids(points[:, 0], points[:, 1], grid.WEATHER_CELL_KM)),
+            ("get_road_grid_key", n, lambda coords=coords: [backend.get_road_grid_key(lat, lon) for lat, lon in coords]),
+            ("cluster_coordinates", n, lambda coords=coords: backend.cluster_coordinates(coords)),
+            ("haversine_distance", n, lambda coords=coords: [
+                backend.haversine_distance(a[0], a[1], b[0], b[1]) for a, b in zip(coords, coords[1:])]),
+            ("nearest_vertex_scan", n, lambda coords=coords, probe=probe: min(
+                range(len(coords)), key=lambda i: backend.haversine_distance(probe[0], probe[1], *coords[i]))),
+            ("Route.nearest_vertex", n, lambda decoded=decoded, probe=probe: decoded.nearest_vertex(*probe)),
+            ("extract_road_info", n, lambda roads=roads, coords=coords: [
+                backend.extract_road_info(roads, lat, lon) for lat, lon in coords[::max(1, n // 100)]]),
+            ("matching.match_route", n, lambda index=index, points=points: matching.match_route(index, points)),
+            ("Route.sample_indices", n, lambda points=points: route.Route(points).sample_indices()),
+            ("expand_sampled_conditions", n, lambda decoded=decoded, sampled=sampled, sc=sampled_conditions:
+                backend.expand_sampled_conditions(decoded, sampled, sc)),
+        ]
+    return cases
+
+
+# -------------------------------
+# Timing
+# -------------------------------
+def time_case(fn: Callable[[], object], min_time_s: float, repeats: int) -> Dict[str, float]:
+    """Calibrate a loop count so one repeat takes ~min_time_s, then time `repeats` repeats."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time_s or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time_s / elapsed) + 1))
+
+    per_call = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_call.append((time.perf_counter() - start) / loops)
+    return {"min_us": min(per_call) * 1e6, "median_us": median(per_call) * 1e6, "loops": loops}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for backend hot functions")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Route sizes in vertices")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this string")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Target seconds per repeat")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Compare against a previously saved results JSON")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Fail when a case is this many times slower than the baseline")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'case':<28} {'vertices':>8} {'min':>12} {'median':>12} {'per vertex':>12}")
+    for name, size, fn in build_cases(args.sizes):
+        if args.filter not in name:
+            continue
+        timing = time_case(fn, args.min_time, args.repeats)
+        results[f"{name}[{size}]"] = {"case": name, "vertices": size, **timing}
+        print(f"{name:<28} {size:>8} {timing['min_us']:>10.1f}us {timing['median_us']:>10.1f}us "
+              f"{timing['min_us'] / size * 1000:>10.1f}ns")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print(f"\nComparison against {args.baseline} (min time, threshold {args.threshold:.2f}x):")
+        for key, result in results.items():
+            if key not in baseline:
+                continue
+            ratio = result["min_us"] / baseline[key]["min_us"]
+            flag = "  ❌ REGRESSION" if ratio > args.threshold else ""
+            print(f"   {key:<40} {ratio:>6.2f}x{flag}")
+            if ratio > args.threshold:
+                regressions.append(key)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "revision": git_revision(),
+                "python": sys.version.split()[0],
+                "machine": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Saved results to {args.output}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} case(s) regressed beyond {args.threshold:.2f}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Query-plan regression checks for the hot PostGIS statements.
+
+Runs every hot statement (db.STATEMENTS for the asyncpg path, and
+db.FALLBACK_STATEMENTS for app.py's SQLAlchemy fallback) with
+EXPLAIN (ANALYZE, BUFFERS) at representative urban and rural points, and
+records the execution time, the shared buffers touched and the scans used.
+
+Statements run the way the app runs them: as prepared statements, once
+with a custom plan (the first executions of an asyncpg prepared statement)
+and once with the generic plan Postgres switches to after that, since a
+generic plan is where a bbox filter on a parameter most often falls off the
+index. Each case runs twice and the warm run is recorded.
+
+The command exits non-zero when:
+- any plan reads a road table (roads or a zoom-band view) with a Seq Scan;
+- with --baseline, a case touches more than --buffer-threshold times the
+  baseline's shared buffers (hits + reads, which unlike time is stable
+  between runs on the same data).
+
+It checks the roads table as it is by default. With --seed-roads N it
+instead builds a scratch table of N synthetic roads (benchmarks/synthetic.py)
+in its own schema, with the index from db/init_schema.sql, runs the checks
+against it and drops the schema afterwards, so the real table is never
+touched and the planner still sees a realistically sized table.
+
+Usage (from app/backend):
+    python -m benchmarks.query_plans --seed-roads 200000 --output plans-before.json
+    python -m benchmarks.query_plans --seed-roads 200000 --baseline plans-before.json --buffer-threshold 1.5
+    python -m benchmarks.query_plans --filter nearest
+"""
+
+import argparse
+import json
+import platform
+import re
+import sys
+import time
+from typing import Dict, Iterator, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+import db
+import zoom_bands
+from benchmarks import synthetic
+from benchmarks.common import git_revision, pg_connect
+
+# (name, lat, lon)
+URBAN_POINTS = [("houston", 29.7604, -95.3698), ("dallas", 32.7767, -96.7970)]
+RURAL_POINTS = [("lubbock-amarillo", 34.4000, -101.8400), ("trans-pecos", 31.0000, -104.0000)]
+NEAREST_RADIUS_M = 100.0  # fetch_nearest_roads_for_coords' default search radius
+MANY_POINTS = 64  # points per nearest_roads_many call (one route's uncached cells)
+BBOX_DEG = 0.02  # /roads/info-sized extent
+PLAN_MODES = ["custom", "generic"]
+BUFFER_SLACK = 16  # buffers a case may grow by regardless of the threshold
+SEED_PAGE = 5000
+
+
+class Case(NamedTuple):
+    name: str
+    sql: str  # positional ($1, $2, ...) parameters
+    args: Tuple
+
+
+# -------------------------------
+# Seeding
+# -------------------------------
+SCRATCH_SCHEMA = "query_plans_scratch"
+# Same table and index as db/init_schema.sql, in a scratch schema
+SCRATCH_DDL = f"""
+    DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE;
+    CREATE SCHEMA {SCRATCH_SCHEMA};
+    CREATE TABLE {SCRATCH_SCHEMA}.roads (
+        osm_id TEXT, code INTEGER, fclass TEXT, name TEXT, ref TEXT, oneway TEXT, maxspeed INTEGER,
+        layer BIGINT, bridge TEXT, tunnel TEXT, geom GEOMETRY(LINESTRING, 4326), row_hash TEXT
+    );
+"""
+
+
+def seed(conn, rows: int) -> int:
+    """Create SCRATCH_SCHEMA.roads holding a synthetic network of about `rows` ways (never touches public.roads)."""
+    from psycopg2.extras import execute_values
+
+    network = synthetic.Network(rows, seed=0)
+    written = 0
+    with conn, conn.cursor() as cur:
+        cur.execute(SCRATCH_DDL)
+        for part in network.ways():
+            columns = [part[name].tolist() for name in synthetic.ROAD_SCHEMA.names[:-1]]
+            values = list(zip(*columns, part["geometry"].to_pylist()))
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO {SCRATCH_SCHEMA}.roads (osm_id, code, fclass, name, ref, oneway, maxspeed, layer,
+                                                    bridge, tunnel, geom)
+                VALUES %s
+                """,
+                values,
+                template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, ST_GeomFromWKB(%s, 4326))",
+                page_size=SEED_PAGE,
+            )
+            written += len(values)
+        cur.execute(f"CREATE INDEX idx_roads_geom ON {SCRATCH_SCHEMA}.roads USING GIST (geom)")
+        cur.execute(f"ANALYZE {SCRATCH_SCHEMA}.roads")
+    return written
+
+
+def drop_scratch(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE")
+
+
+# -------------------------------
+# Cases
+# -------------------------------
+def positional(sql: str, params: Dict[str, object]) -> Tuple[str, Tuple]:
+    """Rewrite :name parameters (SQLAlchemy style) as $n, with the args in matching order."""
+    names: List[str] = []
+
+    def number(match):
+        if match.group(1) not in names:
+            names.append(match.group(1))
+        return f"${names.index(match.group(1)) + 1}"
+
+    return re.sub(r"(?<![:\w]):(\w+)", number, sql), tuple(params[name] for name in names)
+
+
+def built_bands(conn) -> List[zoom_bands.ZoomBand]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NOT NULL",
+                    ([band.name for band in zoom_bands.BANDS],))
+        names = {row[0] for row in cur.fetchall()}
+    return [band for band in zoom_bands.BANDS if band.name in names]
+
+
+def _around(lat: float, lon: float, n: int, spread_deg: float) -> Tuple[List[float], List[float]]:
+    """n points on a line through (lat, lon), like the sampled cells of one route."""
+    t = np.linspace(-spread_deg, spread_deg, n)
+    return (lat + t).tolist(), (lon + t * 0.7).tolist()
+
+
+def build_cases(bands: Sequence[zoom_bands.ZoomBand]) -> Iterator[Case]:
+    points = [(name, lat, lon, "urban") for name, lat, lon in URBAN_POINTS] + \
+             [(name, lat, lon, "rural") for name, lat, lon in RURAL_POINTS]
+    for name, lat, lon, kind in points:
+        bbox_deg = db.bbox_degrees(lat, NEAREST_RADIUS_M)
+        yield Case(f"nearest_road[{name}]", db.STATEMENTS["nearest_road"], (lon, lat, NEAREST_RADIUS_M, bbox_deg))
+        yield Case(f"fallback_nearest_road[{name}]", *positional(db.FALLBACK_STATEMENTS["nearest_road"], {
+            "lon": lon, "lat": lat, "radius_meters": NEAREST_RADIUS_M, "bbox_deg": bbox_deg}))
+
+        lats, lons = _around(lat, lon, MANY_POINTS, 0.05 if kind == "urban" else 0.5)
+        yield Case(f"nearest_roads_many[{name}]", db.STATEMENTS["nearest_roads_many"],
+                   (lons, lats, NEAREST_RADIUS_M, db.bbox_degrees(max(map(abs, lats)), NEAREST_RADIUS_M)))
+
+        south, west, north, east = lat - BBOX_DEG / 2, lon - BBOX_DEG / 2, lat + BBOX_DEG / 2, lon + BBOX_DEG / 2
+        yield Case(f"roads_in_bbox[{name}]", db.STATEMENTS["roads_in_bbox"], (west, south, east, north, 1000))
+        yield Case(f"fallback_roads_in_bbox[{name}]", *positional(
+            db.FALLBACK_STATEMENTS["roads_in_bbox"].format(table="roads"),
+            {"west": west, "south": south, "east": east, "north": north, "limit": 1000}))
+
+    # Zoom-band views, at an extent of each band's own zoom around the first urban point
+    _, lat, lon = URBAN_POINTS[0]
+    for band in bands:
+        half = 360.0 / 2 ** band.max_zoom / 2
+        yield Case(f"roads_in_bbox_{band.name}[{URBAN_POINTS[0][0]}]", db.STATEMENTS[f"roads_in_bbox_{band.name}"],
+                   (lon - half, lat - half, lon + half, lat + half, 5000))
+
+
+# -------------------------------
+# Explain
+# -------------------------------
+def scans(plan: Dict) -> Iterator[Dict]:
+    """Every scan node of a plan tree."""
+    if "Scan" in plan["Node Type"]:
+        yield plan
+    for child in plan.get("Plans", []):
+        yield from scans(child)
+
+
+def explain(conn, case: Case, mode: str, road_tables: set) -> Dict:
+    """Warm EXPLAIN (ANALYZE, BUFFERS) of a case as a prepared statement under a plan_cache_mode."""
+    with conn.cursor() as cur:
+        cur.execute(f"SET plan_cache_mode = force_{mode}_plan")
+        cur.execute(f"PREPARE bench_plan AS {case.sql}")
+        try:
+            placeholders = ", ".join(["%s"] * len(case.args))
+            for _ in range(2):
+                cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) EXECUTE bench_plan({placeholders})", case.args)
+                result = cur.fetchone()[0]
+        finally:
+            cur.execute("DEALLOCATE bench_plan")
+            cur.execute("RESET plan_cache_mode")
+
+    explained = (json.loads(result) if isinstance(result, str) else result)[0]
+    plan = explained["Plan"]
+    scan_nodes = [node for node in scans(plan) if node.get("Relation Name") in road_tables
+                  or node.get("Index Name") is not None]
+    return {
+        "execution_ms": explained["Execution Time"],
+        "planning_ms": explained["Planning Time"],
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+        "buffers_hit": plan.get("Shared Hit Blocks", 0),
+        "rows": plan.get("Actual Rows", 0),
+        "scans": [" ".join(filter(None, [node["Node Type"], node.get("Relation Name"), node.get("Index Name")]))
+                  for node in scan_nodes],
+        "seq_scans": [node["Relation Name"] for node in scan_nodes
+                      if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in road_tables],
+    }
+
+
+# -------------------------------
+# Entry point
+# -------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Query-plan regression checks for the hot PostGIS statements")
+    parser.add_argument("--seed-roads", type=int, default=0,
+                        help="Check a scratch table of this many synthetic roads instead of roads (0: the real table)")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this string")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Compare against a previously saved results JSON")
+    parser.add_argument("--buffer-threshold", type=float, default=1.5,
+                        help="Fail when a case touches this many times the baseline's buffers")
+    args = parser.parse_args()
+
+    conn = pg_connect()
+    try:
+        if args.seed_roads:
+            start = time.time()
+            print(f"🌱 Seeded {seed(conn, args.seed_roads):,} synthetic roads into {SCRATCH_SCHEMA}.roads "
+                  f"in {time.time() - start:.1f}s")
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            if args.seed_roads:
+                # Unqualified `roads` in the statements now resolves to the scratch table
+                cur.execute(f"SET search_path = {SCRATCH_SCHEMA}, public")
+            cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = 'roads'::regclass")
+            print(f"🗺️  roads: ~{cur.fetchone()[0]:,} rows")
+        bands = built_bands(conn)
+        road_tables = {"roads"} | {band.name for band in bands}
+
+        results = {}
+        print(f"\n{'case':<48} {'time':>10} {'buffers':>9}  scans")
+        for case in build_cases(bands):
+            if args.filter not in case.name:
+                continue
+            for mode in PLAN_MODES:
+                key = f"{case.name}/{mode}"
+                result = explain(conn, case, mode, road_tables)
+                results[key] = result
+                flag = "  ❌ SEQ SCAN" if result["seq_scans"] else ""
+                print(f"{key:<48} {result['execution_ms']:>8.2f}ms {result['buffers']:>9}  "
+                      f"{', '.join(result['scans'])}{flag}")
+    finally:
+        if args.seed_roads:
+            conn.rollback()
+            conn.autocommit = True
+            drop_scratch(conn)
+        conn.close()
+
+    failures = [f"{key}: seq scan on {', '.join(result['seq_scans'])}"
+                for key, result in results.items() if result["seq_scans"]]
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print(f"\nComparison against {args.baseline} (shared buffers, threshold {args.buffer_threshold:.2f}x):")
+        for key, result in results.items():
+            if key not in baseline:
+                continue
+            before = baseline[key]
+            ratio = result["buffers"] / max(before["buffers"], 1)
+            time_ratio = result["execution_ms"] / max(before["execution_ms"], 1e-3)
+            grew = result["buffers"] > before["buffers"] * args.buffer_threshold + BUFFER_SLACK
+            changed = result["scans"] != before["scans"]
+            flag = "  ❌ REGRESSION" if grew else ("  ⚠️  plan changed" if changed else "")
+            print(f"   {key:<48} {ratio:>6.2f}x buffers {time_ratio:>6.2f}x time{flag}")
+            if grew:
+                failures.append(f"{key}: {before['buffers']} -> {result['buffers']} buffers")
+            if changed:
+                print(f"      was: {', '.join(before['scans'])}\n      now: {', '.join(result['scans'])}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "revision": git_revision(),
+                "machine": platform.platform(),
+                "seeded_roads": args.seed_roads,
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Saved results to {args.output}")
+
+    if failures:
+        print(f"\n❌ {len(failures)} plan regression(s):")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
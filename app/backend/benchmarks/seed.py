@@ -0,0 +1,152 @@
+"""
+Seed a local PostGIS database with a road sample along the benchmark routes.
+
+For every route alternative this inserts the route itself as motorway
+segments, an offset frontage road and residential cross streets, which is
+enough for nearest-road and bbox queries to behave like the real `roads`
+table. The rows go into a `roads` table in a scratch schema (SCRATCH_SCHEMA),
+recreated on every run, so the real table is never modified; the app reads
+it when started with DB_SEARCH_PATH set to search_path() (loadtest --seed
+does this and drops the schema when the run ends).
+
+Usage (from app/backend):
+    python -m benchmarks.seed          # prints the DB_SEARCH_PATH to start the app with
+    python -m benchmarks.seed --drop
+"""
+
+import argparse
+import math
+from typing import Iterable, List, Tuple
+
+import polyline
+
+from benchmarks.common import pg_connect
+from benchmarks.fixtures import benchmark_routes, load_recordings, routes_for
+
+SCRATCH_SCHEMA = "bench_scratch"
+# Same table and index as db/init_schema.sql, in a scratch schema
+SCRATCH_DDL = f"""
+    DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE;
+    CREATE SCHEMA {SCRATCH_SCHEMA};
+    CREATE TABLE {SCRATCH_SCHEMA}.roads (
+        osm_id TEXT, code INTEGER, fclass TEXT, name TEXT, ref TEXT, oneway TEXT, maxspeed INTEGER,
+        layer BIGINT, bridge TEXT, tunnel TEXT, geom GEOMETRY(LINESTRING, 4326), row_hash TEXT
+    );
+"""
+
+Row = Tuple[str, int, str, str, str, str, int, int, str, str, str]
+
+
+def offset_path(coords: List[Tuple[float, float]], meters: float) -> List[Tuple[float, float]]:
+    """Shift a path sideways by `meters` (positive = left of travel direction)."""
+    shifted = []
+    for i, (lat, lon) in enumerate(coords):
+        a = coords[max(0, i - 1)]
+        b = coords[min(len(coords) - 1, i + 1)]
+        dy = (b[0] - a[0]) * 111320
+        dx = (b[1] - a[1]) * 111320 * math.cos(math.radians(lat))
+        norm = math.hypot(dx, dy) or 1.0
+        nx, ny = -dy / norm, dx / norm
+        shifted.append((
+            lat + ny * meters / 111320,
+            lon + nx * meters / (111320 * math.cos(math.radians(lat))),
+        ))
+    return shifted
+
+
+def wkt_linestring(coords: Iterable[Tuple[float, float]]) -> str:
+    return "LINESTRING(" + ", ".join(f"{lon:.7f} {lat:.7f}" for lat, lon in coords) + ")"
+
+
+def roads_along(name: str, coords: List[Tuple[float, float]], chunk: int = 20,
+                cross_every: int = 7) -> List[Row]:
+    """Generate motorway, frontage and cross-street rows for one route path."""
+    rows: List[Row] = []
+    frontage = offset_path(coords, 35.0)
+    for i in range(0, len(coords) - 1, chunk):
+        part = coords[i:i + chunk + 1]
+        if len(part) >= 2:
+            rows.append((f"bench-{name}-m{i}", 5111, "motorway", None, "I-99", "F", 110, 0, "F", "F",
+                         wkt_linestring(part)))
+        part = frontage[i:i + chunk + 1]
+        if len(part) >= 2:
+            rows.append((f"bench-{name}-f{i}", 5113, "primary", "I-99 Frontage Road", None, "F", 70, 0, "F", "F",
+                         wkt_linestring(part)))
+    for i in range(cross_every, len(coords) - 1, cross_every):
+        left = offset_path(coords[i - 1:i + 2], 400.0)[1]
+        right = offset_path(coords[i - 1:i + 2], -400.0)[1]
+        rows.append((f"bench-{name}-x{i}", 5122, "residential", f"Bench St {i}", None, "B", 40, 1, "T", "F",
+                     wkt_linestring([left, coords[i], right])))
+    return rows
+
+
+def seed(routes: List[dict]) -> int:
+    """Create SCRATCH_SCHEMA.roads with the road sample along `routes`; returns how many rows."""
+    from psycopg2.extras import execute_values
+
+    recordings = load_recordings()
+    rows: List[Row] = []
+    for route in routes:
+        for alt, payload in enumerate(routes_for(route["origin"], route["destination"], recordings)):
+            coords = polyline.decode(payload["overview_polyline"]["points"])
+            rows.extend(roads_along(f"{route['name']}-{alt}", coords))
+
+    conn = pg_connect()
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute(SCRATCH_DDL)
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO {SCRATCH_SCHEMA}.roads (osm_id, code, fclass, name, ref, oneway, maxspeed, layer,
+                                                    bridge, tunnel, geom)
+                VALUES %s
+                """,
+                rows,
+                template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, ST_GeomFromText(%s, 4326))",
+                page_size=1000,
+            )
+            cur.execute(f"CREATE INDEX idx_roads_geom ON {SCRATCH_SCHEMA}.roads USING GIST (geom)")
+            cur.execute(f"ANALYZE {SCRATCH_SCHEMA}.roads")
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def search_path() -> str:
+    """DB_SEARCH_PATH that makes the app read the scratch roads: the scratch schema, then the usual path."""
+    conn = pg_connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SHOW search_path")
+            current = cur.fetchone()[0]
+    finally:
+        conn.close()
+    # PostGIS stays reachable wherever it is installed (public, or e.g. extensions on Supabase)
+    return ",".join([SCRATCH_SCHEMA] + [part.strip() for part in current.split(",") if part.strip()])
+
+
+def drop_scratch():
+    conn = pg_connect()
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a scratch schema with roads along the benchmark routes")
+    parser.add_argument("--drop", action="store_true", help="Drop the scratch schema instead")
+    args = parser.parse_args()
+    if args.drop:
+        drop_scratch()
+        print(f"🧹 Dropped {SCRATCH_SCHEMA}")
+        return
+    count = seed(benchmark_routes())
+    print(f"✅ Seeded {count} benchmark roads into {SCRATCH_SCHEMA}.roads")
+    print(f"   Start the app with DB_SEARCH_PATH='{search_path()}' to read them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,510 @@
+"""
+Synthetic Texas-scale road network and crash records for scaling tests.
+
+The real inputs (the Geofabrik roads shapefile, the OSMnx edges parquet, the
+TxDOT crash CSVs) are external or in LFS, so this generates stand-ins of any
+size from 10k to 10M rows, deterministically from --seed:
+
+- roads: the `roads` schema with Geofabrik attribute conventions (fclass and
+  code, maxspeed in km/h with 0 for unknown, oneway B/F, bridge/tunnel T/F).
+  Cities (the largest Texas cities at their real positions plus random
+  towns) get a street grid, one way per block, with every 4th/8th/16th line
+  promoted to tertiary/secondary/primary; neighbouring cities are joined by
+  motorway (two one-way carriageways), trunk or primary highways. Grid ways
+  share their end vertices, so the network is connected at intersections.
+  Written as GeoParquet (load.py, road_index.load_from_parquet) or as a
+  shapefile (load.py's pyogrio path).
+- crashes: TxDOT CRIS column layout (Crash_ID, Crash_Date, Crash_Time,
+  Wthr_Cond_ID, Adt_Adj_Curnt_Amt, ...) as read by the ETL notebooks, each
+  crash placed on a generated road with attributes drawn from its class
+  (risk.ROAD_CLASS_DEFAULTS), a rush-hour-weighted time in 2022-2025, and
+  weather/light/severity codes in the CRIS coding.
+
+Everything is generated city by city and written in chunks, so memory stays
+bounded at 10M rows.
+
+Usage (from app/backend):
+    python -m benchmarks.synthetic --roads 1000000 --crashes 200000
+    python -m benchmarks.synthetic --roads 10000 --crashes 10000 --format shp --output-dir /tmp/synthetic
+    python load.py --source synthetic_data/roads.parquet --replace
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+import risk
+
+TEXAS_BBOX = (25.9, -106.6, 36.5, -93.5)  # south, west, north, east
+M_PER_DEG_LAT = 111320.0
+
+# (name, lat, lon, weight ~ population in 100k)
+CITIES = [
+    ("Houston", 29.760, -95.370, 23.0), ("San Antonio", 29.424, -98.494, 15.0), ("Dallas", 32.777, -96.797, 13.0),
+    ("Austin", 30.267, -97.743, 10.0), ("Fort Worth", 32.755, -97.331, 9.5), ("El Paso", 31.762, -106.485, 6.8),
+    ("Arlington", 32.736, -97.108, 4.0), ("Corpus Christi", 27.801, -97.396, 3.2), ("Plano", 33.020, -96.699, 2.9),
+    ("Lubbock", 33.578, -101.855, 2.6), ("Laredo", 27.531, -99.480, 2.6), ("Irving", 32.814, -96.949, 2.5),
+    ("Amarillo", 35.222, -101.831, 2.0), ("Brownsville", 25.901, -97.497, 1.9), ("Killeen", 31.117, -97.728, 1.5),
+    ("McAllen", 26.203, -98.230, 1.4), ("Waco", 31.549, -97.147, 1.4), ("Midland", 31.997, -102.078, 1.3),
+    ("Abilene", 32.449, -99.733, 1.25), ("College Station", 30.628, -96.334, 1.2), ("Beaumont", 30.080, -94.127, 1.1),
+    ("Tyler", 32.351, -95.301, 1.1), ("Odessa", 31.846, -102.368, 1.1), ("San Angelo", 31.464, -100.437, 1.0),
+    ("Wichita Falls", 33.914, -98.493, 1.0),
+]
+MAJOR_CITY_WEIGHT = 2.0  # cities at least this large are joined by motorways
+TOWN_ROWS = 5000  # one random town per this many road rows (at most MAX_TOWNS)
+MAX_TOWNS = 1500
+
+BLOCK_M = 160.0  # street grid spacing
+HIGHWAY_SHARE = 0.2  # at most this share of the rows are highway ways
+HIGHWAY_WAY_KM = 1.5  # preferred highway way length
+HIGHWAY_VERTEX_KM = 0.25
+CARRIAGEWAY_OFFSET_M = 15.0
+NEIGHBOURS = 3  # each city is joined to its nearest NEIGHBOURS cities
+
+# Geofabrik class codes and speeds (km/h)
+FCLASS_CODES = {"motorway": 5111, "trunk": 5112, "primary": 5113, "secondary": 5114, "tertiary": 5115,
+                "residential": 5122}
+FCLASS_SPEED_KMH = {"motorway": 113, "trunk": 97, "primary": 72, "secondary": 64, "tertiary": 56, "residential": 40}
+UNKNOWN_SPEED_SHARE = {"residential": 0.7, "tertiary": 0.4, "secondary": 0.3, "primary": 0.2}
+
+STREET_NAMES = ["Oak", "Elm", "Pecan", "Cedar", "Mesquite", "Live Oak", "Magnolia", "Willow", "Hackberry", "Cypress",
+                "Bluebonnet", "Lamar", "Travis", "Houston", "Austin", "Crockett", "Bowie", "Fannin", "Milam", "Navarro",
+                "Rusk", "Burnet", "Lubbock", "Guadalupe", "Brazos", "Colorado", "Trinity", "Sabine", "Nueces", "Pedernales"]
+ARTERIAL_SUFFIXES = {"primary": "Fwy", "secondary": "Blvd", "tertiary": "Pkwy", "residential": "St"}
+
+ROAD_SCHEMA = pa.schema([
+    ("osm_id", pa.string()), ("code", pa.int32()), ("fclass", pa.string()), ("name", pa.string()),
+    ("ref", pa.string()), ("oneway", pa.string()), ("maxspeed", pa.int32()), ("layer", pa.int64()),
+    ("bridge", pa.string()), ("tunnel", pa.string()), ("geometry", pa.binary()),
+])
+
+# Crash records (TxDOT CRIS export column names)
+CRASH_COLUMNS = [
+    "Crash_ID", "Crash_Date", "Crash_Time", "Day_of_Week", "Crash_Sev_ID", "Crash_Speed_Limit",
+    "Road_Constr_Zone_Fl", "At_Intrsct_Fl", "Wthr_Cond_ID", "Light_Cond_ID", "Road_Cls_ID", "Rural_Fl",
+    "Nbr_Of_Lane", "Adt_Adj_Curnt_Amt", "Pct_Single_Trk_Adt", "Latitude", "Longitude",
+]
+CRASH_YEARS = (2022, 2025)
+FIRST_CRASH_ID = 19000000
+HIGHWAY_CRASH_SHARE = 0.3
+# Relative crash frequency per class on the street grid
+GRID_CRASH_WEIGHT = {"primary": 6.0, "secondary": 4.0, "tertiary": 2.5, "residential": 1.0}
+# Crashes by hour of day (rush-hour peaks)
+HOUR_WEIGHTS = np.array([1.2, 1.0, 0.9, 0.7, 0.6, 0.9, 2.0, 3.6, 3.4, 2.6, 2.6, 2.9,
+                         3.3, 3.3, 3.6, 4.3, 4.9, 5.2, 4.2, 3.1, 2.6, 2.3, 1.9, 1.5])
+WEATHER_IDS, WEATHER_P = [1, 2, 3, 4, 5, 6], [0.70, 0.15, 0.12, 0.005, 0.005, 0.02]
+SEVERITY_IDS, SEVERITY_P = [0, 1, 2, 3, 4, 5], [0.01, 0.045, 0.14, 0.18, 0.005, 0.62]
+DAY_NAMES = np.array(["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"])
+INTERSECTION_M = 25.0
+CONSTRUCTION_ZONE_SHARE = 0.03
+CHUNK_ROWS = 500000
+
+
+# -------------------------------
+# Network model
+# -------------------------------
+class City(NamedTuple):
+    name: str
+    lat: float
+    lon: float
+    weight: float
+    lines: int  # grid lines in each direction
+    rotation: float  # grid rotation in radians
+
+    @property
+    def half_width_m(self) -> float:
+        return (self.lines - 1) * BLOCK_M / 2
+
+
+class Highway(NamedTuple):
+    fclass: str
+    ref: str
+    name: str
+    points: np.ndarray  # (N, 2) lat/lon centreline
+
+
+def _line_classes(n: int) -> np.ndarray:
+    """Class of each grid line index: every 16th primary, 8th secondary, 4th tertiary."""
+    j = np.arange(n)
+    return np.where(j % 16 == 0, "primary", np.where(j % 8 == 0, "secondary",
+                    np.where(j % 4 == 0, "tertiary", "residential")))
+
+
+def _to_latlon(city: City, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Grid metres (x east, y north, before rotation) around a city centre -> lat/lon."""
+    c, s = math.cos(city.rotation), math.sin(city.rotation)
+    east, north = x * c - y * s, x * s + y * c
+    lat = city.lat + north / M_PER_DEG_LAT
+    lon = city.lon + east / (M_PER_DEG_LAT * math.cos(math.radians(city.lat)))
+    return lat, lon
+
+
+def _distance_km(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Equirectangular distance between (..., 2) lat/lon arrays."""
+    dlat = (a[..., 0] - b[..., 0]) * M_PER_DEG_LAT
+    dlon = (a[..., 1] - b[..., 1]) * M_PER_DEG_LAT * np.cos(np.radians((a[..., 0] + b[..., 0]) / 2))
+    return np.hypot(dlat, dlon) / 1000
+
+
+class Network:
+    """Cities with street grids and the highways between them, sized for about `rows` ways."""
+
+    def __init__(self, rows: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        n_towns = min(MAX_TOWNS, rows // TOWN_ROWS)
+        south, west, north, east = TEXAS_BBOX
+        places = [(name, lat, lon, weight) for name, lat, lon, weight in CITIES]
+        for i in range(n_towns):
+            places.append((f"Town {i + 1}", float(rng.uniform(south, north)), float(rng.uniform(west, east)),
+                           float(rng.uniform(0.02, 0.3))))
+
+        self.highways = self._build_highways(places, rng)
+        carriageways = np.array([2 if h.fclass == "motorway" else 1 for h in self.highways])
+        lengths = np.array([_distance_km(h.points[1:], h.points[:-1]).sum() for h in self.highways])
+        # Longer ways on small networks, so highways stay a minor share of the rows
+        self.highway_way_km = max(HIGHWAY_WAY_KM, float((lengths * carriageways).sum()) / (HIGHWAY_SHARE * rows))
+        highway_rows = int((np.ceil(lengths / self.highway_way_km) * carriageways).sum())
+
+        # Split the remaining rows between the city grids by weight; n lines give 2n(n-1) block ways
+        weights = np.array([weight for _, _, _, weight in places])
+        grid_rows = max(0, rows - highway_rows) * weights / weights.sum()
+        lines = np.maximum(2, np.round(np.sqrt(grid_rows / 2)).astype(int) + 1)
+        rotations = rng.uniform(-0.3, 0.3, len(places))
+        self.cities = [City(name, lat, lon, weight, int(n), float(r))
+                       for (name, lat, lon, weight), n, r in zip(places, lines, rotations)]
+
+    @staticmethod
+    def _build_highways(places: List[Tuple[str, float, float, float]], rng) -> List[Highway]:
+        centres = np.array([[lat, lon] for _, lat, lon, _ in places])
+        dist = _distance_km(centres[:, None, :], centres[None, :, :])
+        np.fill_diagonal(dist, np.inf)
+        pairs = set()
+        for i in range(len(places)):
+            for j in np.argsort(dist[i])[:NEIGHBOURS]:
+                pairs.add((min(i, int(j)), max(i, int(j))))
+
+        highways = []
+        counters = {"motorway": 10, "trunk": 59, "primary": 6}
+        for i, j in sorted(pairs):
+            major = (places[i][3] >= MAJOR_CITY_WEIGHT) + (places[j][3] >= MAJOR_CITY_WEIGHT)
+            fclass = ["primary", "trunk", "motorway"][major]
+            counters[fclass] += 1
+            number = counters[fclass]
+            ref, name = {"motorway": (f"I {number}", f"Interstate {number}"),
+                         "trunk": (f"US {number}", f"US Highway {number}"),
+                         "primary": (f"SH {number}", f"State Highway {number}")}[fclass]
+
+            # Gentle sinusoidal bends around the straight line between the two centres
+            n = max(2, int(math.ceil(dist[i, j] / HIGHWAY_VERTEX_KM)) + 1)
+            t = np.linspace(0.0, 1.0, n)
+            line = centres[i] + t[:, None] * (centres[j] - centres[i])
+            normal = np.array([-(centres[j] - centres[i])[1], (centres[j] - centres[i])[0]])
+            bend = rng.uniform(0.01, 0.04) * np.sin(np.pi * t * rng.integers(1, 4))
+            highways.append(Highway(fclass, ref, name, line + bend[:, None] * normal))
+        return highways
+
+    # -------------------------------
+    # Ways
+    # -------------------------------
+    def city_ways(self, city_index: int, rng) -> Dict[str, object]:
+        """One way per block of the city's street grid (both directions)."""
+        city = self.cities[city_index]
+        n = city.lines
+        offsets = np.arange(n) * BLOCK_M - city.half_width_m
+        classes = _line_classes(n)
+
+        # Ways along x (line k at y = offsets[k], block b from offsets[b] to offsets[b + 1]), then along y
+        line, block = np.meshgrid(np.arange(n), np.arange(n - 1), indexing="ij")
+        line, block = line.ravel(), block.ravel()
+        along = np.concatenate([np.zeros(len(line), bool), np.ones(len(line), bool)])
+        line, block = np.tile(line, 2), np.tile(block, 2)
+
+        start, end = offsets[block], offsets[block + 1]
+        fixed = offsets[line]
+        mid = (start + end) / 2
+        jitter = rng.normal(0.0, 4.0, len(line))
+        xs = np.where(along[:, None], fixed[:, None] + np.column_stack([0 * start, jitter, 0 * end]),
+                      np.column_stack([start, mid, end]))
+        ys = np.where(along[:, None], np.column_stack([start, mid, end]),
+                      fixed[:, None] + np.column_stack([0 * start, jitter, 0 * end]))
+        lat, lon = _to_latlon(city, xs, ys)
+
+        fclass = classes[line]
+        names = np.array(STREET_NAMES)[line % len(STREET_NAMES)]
+        suffix = np.vectorize(ARTERIAL_SUFFIXES.get)(fclass)
+        number = np.char.add(np.char.add("", (line + 1).astype(str)),
+                             np.where(line % 10 == 0, "th", np.where(line % 10 == 1, "st",
+                                      np.where(line % 10 == 2, "nd", np.where(line % 10 == 3, "rd", "th")))))
+        # Streets along x are numbered; streets along y are named
+        name = np.where(along, np.char.add(np.char.add(names, " "), suffix),
+                        np.char.add(np.char.add(number, " "), suffix))
+        oneway = np.where((fclass == "residential") & (rng.random(len(line)) < 0.1), "F", "B")
+        return self._ways(f"c{city_index}", fclass, name.astype(object), np.full(len(line), None), oneway,
+                          np.full(len(line), "F"), lat, lon, rng)
+
+    def highway_ways(self, rng) -> Dict[str, object]:
+        """Highways cut into ways of about highway_way_km; motorways as two one-way carriageways."""
+        parts = []
+        for highway in self.highways:
+            length_km = _distance_km(highway.points[1:], highway.points[:-1]).sum()
+            n_ways = max(1, int(math.ceil(length_km / self.highway_way_km)))
+            # Way boundaries on vertex indices; neighbouring ways share their end vertex
+            bounds = np.unique(np.linspace(0, len(highway.points) - 1, n_ways + 1).round().astype(int))
+            carriageways = [(highway.points, "B")]
+            if highway.fclass == "motorway":
+                carriageways = [(self._offset(highway.points, CARRIAGEWAY_OFFSET_M), "F"),
+                                (self._offset(highway.points, -CARRIAGEWAY_OFFSET_M)[::-1], "F")]
+            for points, oneway in carriageways:
+                for a, b in zip(bounds[:-1], bounds[1:]):
+                    parts.append((highway, points[a:b + 1], oneway))
+
+        # Resample every way to the same vertex count so geometries encode as one array
+        k = max(2, max(len(points) for _, points, _ in parts))
+        resampled = np.stack([self._resample(points, k) for _, points, _ in parts])
+        n = len(parts)
+        fclass = np.array([h.fclass for h, _, _ in parts])
+        bridge = np.where(rng.random(n) < 0.03, "T", "F")
+        return self._ways("h", fclass, np.array([h.name for h, _, _ in parts], dtype=object),
+                          np.array([h.ref for h, _, _ in parts], dtype=object),
+                          np.array([o for _, _, o in parts]), bridge, resampled[..., 0], resampled[..., 1], rng)
+
+    @staticmethod
+    def _offset(points: np.ndarray, meters: float) -> np.ndarray:
+        direction = np.gradient(points, axis=0)
+        normal = np.column_stack([direction[:, 1], -direction[:, 0]])
+        normal /= np.maximum(np.hypot(normal[:, 0], normal[:, 1]), 1e-12)[:, None]
+        return points + normal * meters / M_PER_DEG_LAT
+
+    @staticmethod
+    def _resample(points: np.ndarray, k: int) -> np.ndarray:
+        t = np.linspace(0, len(points) - 1, k)
+        i = np.minimum(t.astype(int), len(points) - 2)
+        frac = (t - i)[:, None]
+        return points[i] * (1 - frac) + points[i + 1] * frac
+
+    @staticmethod
+    def _ways(prefix: str, fclass: np.ndarray, name: np.ndarray, ref: np.ndarray, oneway: np.ndarray,
+              bridge: np.ndarray, lat: np.ndarray, lon: np.ndarray, rng) -> Dict[str, object]:
+        n = len(fclass)
+        speed = np.vectorize(FCLASS_SPEED_KMH.get)(fclass)
+        unknown = rng.random(n) < np.vectorize(lambda c: UNKNOWN_SPEED_SHARE.get(c, 0.0))(fclass)
+        return {
+            "osm_id": np.char.add(f"syn-{prefix}-", np.arange(n).astype(str)).astype(object),
+            "code": np.vectorize(FCLASS_CODES.get)(fclass).astype(np.int32),
+            "fclass": fclass.astype(object),
+            "name": name,
+            "ref": ref,
+            "oneway": oneway.astype(object),
+            "maxspeed": np.where(unknown, 0, speed).astype(np.int32),
+            "layer": np.where(bridge == "T", 1, 0).astype(np.int64),
+            "bridge": bridge.astype(object),
+            "tunnel": np.full(n, "F", dtype=object),
+            "geometry": linestrings_wkb(lat, lon),
+        }
+
+    def ways(self, seed: int = 0) -> Iterator[Dict[str, object]]:
+        """All ways as column dicts: the highways first, then one dict per city grid."""
+        rng = np.random.default_rng(seed + 1)
+        if self.highways:
+            yield self.highway_ways(rng)
+        for i in range(len(self.cities)):
+            yield self.city_ways(i, rng)
+
+
+def linestrings_wkb(lat: np.ndarray, lon: np.ndarray) -> pa.Array:
+    """Little-endian WKB LineStrings from (N, K) lat/lon arrays, as an Arrow binary array."""
+    n, k = lat.shape
+    record = np.dtype([("order", "u1"), ("type", "<u4"), ("count", "<u4"), ("coords", "<f8", (k, 2))])
+    wkb = np.empty(n, dtype=record)
+    wkb["order"] = 1
+    wkb["type"] = 2
+    wkb["count"] = k
+    wkb["coords"] = np.stack([lon, lat], axis=-1)
+    fixed = pa.FixedSizeBinaryArray.from_buffers(pa.binary(record.itemsize), n, [None, pa.py_buffer(wkb.tobytes())])
+    return fixed.cast(pa.binary())
+
+
+# -------------------------------
+# Writers
+# -------------------------------
+def _geo_metadata() -> Dict[bytes, bytes]:
+    column = {"encoding": "WKB", "geometry_types": ["LineString"]}
+    try:
+        import pyproj
+        column["crs"] = pyproj.CRS.from_epsg(4326).to_json_dict()
+    except ImportError:
+        pass  # GeoParquet defaults to OGC:CRS84 (lon/lat WGS84)
+    return {b"geo": json.dumps({"version": "1.0.0", "primary_column": "geometry",
+                                "columns": {"geometry": column}}).encode()}
+
+
+def write_roads(network: Network, path: str, fmt: str, seed: int) -> int:
+    """Write every way to `path` (GeoParquet or shapefile); returns the row count."""
+    rows = 0
+    writer = None
+    for part in network.ways(seed):
+        table = pa.table(part, schema=ROAD_SCHEMA)
+        if fmt == "parquet":
+            if writer is None:
+                writer = pq.ParquetWriter(path, ROAD_SCHEMA.with_metadata(_geo_metadata()))
+            for offset in range(0, len(table), CHUNK_ROWS):
+                writer.write_table(table.slice(offset, CHUNK_ROWS))
+        else:
+            import pyogrio
+            pyogrio.write_arrow(table, path, geometry_name="geometry", geometry_type="LineString",
+                                crs="EPSG:4326", append=rows > 0)
+        rows += len(table)
+    if writer is not None:
+        writer.close()
+    return rows
+
+
+def crash_batch(network: Network, n: int, first_id: int, rng) -> pa.Table:
+    """n crash records placed on the network's roads, in TxDOT column layout."""
+    on_highway = rng.random(n) < HIGHWAY_CRASH_SHARE if network.highways else np.zeros(n, bool)
+    lat = np.empty(n)
+    lon = np.empty(n)
+    fclass = np.empty(n, dtype=object)
+    intersection = np.zeros(n, bool)
+    rural = np.zeros(n, bool)
+
+    # Highway crashes: a highway by length, then a point along it
+    idx = np.flatnonzero(on_highway)
+    if len(idx):
+        lengths = np.array([len(h.points) for h in network.highways], dtype=float)
+        chosen = rng.choice(len(network.highways), size=len(idx), p=lengths / lengths.sum())
+        position = rng.random(len(idx))
+        for h_index in np.unique(chosen):
+            sel = chosen == h_index
+            points = network.highways[h_index].points
+            t = position[sel] * (len(points) - 1)
+            i = np.minimum(t.astype(int), len(points) - 2)
+            frac = t - i
+            lat[idx[sel]] = points[i, 0] * (1 - frac) + points[i + 1, 0] * frac
+            lon[idx[sel]] = points[i, 1] * (1 - frac) + points[i + 1, 1] * frac
+            fclass[idx[sel]] = network.highways[h_index].fclass
+        centres = np.array([[c.lat, c.lon] for c in network.cities])
+        radii = np.array([c.half_width_m / 1000 for c in network.cities])
+        crash_points = np.column_stack([lat[idx], lon[idx]])
+        for start in range(0, len(idx), 10000):
+            block = crash_points[start:start + 10000]
+            inside = _distance_km(block[:, None, :], centres[None, :, :]) <= radii[None, :]
+            rural[idx[start:start + 10000]] = ~inside.any(axis=1)
+
+    # Grid crashes: a city by weight, a street line by class weight, a point along it
+    idx = np.flatnonzero(~on_highway)
+    if len(idx):
+        weights = np.array([c.weight for c in network.cities])
+        city_of = rng.choice(len(network.cities), size=len(idx), p=weights / weights.sum())
+        for c_index in np.unique(city_of):
+            sel = idx[city_of == c_index]
+            city = network.cities[c_index]
+            classes = _line_classes(city.lines)
+            line_weights = np.vectorize(GRID_CRASH_WEIGHT.get)(classes)
+            line = rng.choice(city.lines, size=len(sel), p=line_weights / line_weights.sum())
+            along = rng.random(len(sel)) < 0.5
+            fixed = line * BLOCK_M - city.half_width_m
+            position = rng.uniform(0, (city.lines - 1) * BLOCK_M, len(sel))
+            offset_in_block = position % BLOCK_M
+            position -= city.half_width_m
+            la, lo = _to_latlon(city, np.where(along, fixed, position), np.where(along, position, fixed))
+            lat[sel], lon[sel] = la, lo
+            fclass[sel] = classes[line]
+            intersection[sel] = (offset_in_block < INTERSECTION_M) | (offset_in_block > BLOCK_M - INTERSECTION_M)
+
+    # Road attributes from the class (risk.ROAD_CLASS_DEFAULTS), with per-crash spread
+    classes, class_of = np.unique(fclass.astype(str), return_inverse=True)
+    defaults = np.array([risk.ROAD_CLASS_DEFAULTS.get(c, risk.UNKNOWN_ROAD) for c in classes],
+                        dtype=float).reshape(len(classes), 5)[class_of]
+    adt = np.round(defaults[:, 3] * rng.lognormal(0.0, 0.4, n)).astype(np.int64)
+    lanes = np.maximum(1, defaults[:, 2] + rng.integers(-1, 2, n) * (defaults[:, 2] > 1)).astype(np.int64)
+
+    # Time: uniform day in CRASH_YEARS, hour by HOUR_WEIGHTS
+    first_day = np.datetime64(f"{CRASH_YEARS[0]}-01-01")
+    n_days = (np.datetime64(f"{CRASH_YEARS[1] + 1}-01-01") - first_day).astype(int)
+    days = first_day + rng.integers(0, n_days, n).astype("timedelta64[D]")
+    hours = rng.choice(24, size=n, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    minutes = rng.integers(0, 60, n)
+    hour12 = np.where(hours % 12 == 0, 12, hours % 12)
+    crash_time = np.char.add(np.char.add(np.char.zfill(hour12.astype(str), 2), ":"),
+                             np.char.add(np.char.zfill(minutes.astype(str), 2), np.where(hours < 12, " AM", " PM")))
+    weekday = (days.astype("datetime64[D]").astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+
+    yes_no = np.array(["N", "Y"])
+    columns = {
+        "Crash_ID": np.arange(first_id, first_id + n),
+        "Crash_Date": days.astype(str),
+        "Crash_Time": crash_time,
+        "Day_of_Week": DAY_NAMES[weekday],
+        "Crash_Sev_ID": rng.choice(SEVERITY_IDS, size=n, p=SEVERITY_P),
+        "Crash_Speed_Limit": defaults[:, 1].astype(np.int64),
+        "Road_Constr_Zone_Fl": yes_no[(rng.random(n) < CONSTRUCTION_ZONE_SHARE).astype(int)],
+        "At_Intrsct_Fl": yes_no[intersection.astype(int)],
+        "Wthr_Cond_ID": rng.choice(WEATHER_IDS, size=n, p=WEATHER_P),
+        "Light_Cond_ID": risk.light_condition_ids(hours),
+        "Road_Cls_ID": defaults[:, 0].astype(np.int64),
+        "Rural_Fl": yes_no[rural.astype(int)],
+        "Nbr_Of_Lane": lanes,
+        "Adt_Adj_Curnt_Amt": adt,
+        "Pct_Single_Trk_Adt": np.round(defaults[:, 4] * rng.lognormal(0.0, 0.2, n), 1),
+        "Latitude": np.round(lat, 8),
+        "Longitude": np.round(lon, 8),
+    }
+    return pa.table({name: columns[name] for name in CRASH_COLUMNS})
+
+
+def write_crashes(network: Network, path: str, n: int, seed: int) -> int:
+    rng = np.random.default_rng(seed + 2)
+    written = 0
+    writer = None
+    while written < n:
+        batch = crash_batch(network, min(CHUNK_ROWS, n - written), FIRST_CRASH_ID + written, rng)
+        if writer is None:
+            writer = pa_csv.CSVWriter(path, batch.schema)
+        writer.write_table(batch)
+        written += len(batch)
+    if writer is not None:
+        writer.close()
+    return written
+
+
+# -------------------------------
+# Entry point
+# -------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Texas road network and crash records")
+    parser.add_argument("--roads", type=int, default=100000, help="Approximate number of road ways (10k to 10M)")
+    parser.add_argument("--crashes", type=int, default=100000, help="Number of crash records (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["parquet", "shp"], default="parquet", help="Road output format")
+    parser.add_argument("--output-dir", default="synthetic_data")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.time()
+    network = Network(args.roads, seed=args.seed)
+    print(f"🗺️  {len(network.cities)} cities and towns, {len(network.highways)} highways")
+
+    roads_path = os.path.join(args.output_dir, "roads.parquet" if args.format == "parquet" else "roads.shp")
+    if os.path.exists(roads_path):
+        os.remove(roads_path)
+    rows = write_roads(network, roads_path, args.format, args.seed)
+    print(f"🛣️  {rows:,} roads -> {roads_path} ({time.time() - start:.1f}s)")
+
+    if args.crashes > 0:
+        start = time.time()
+        crashes_path = os.path.join(args.output_dir, "crashes.csv")
+        written = write_crashes(network, crashes_path, args.crashes, args.seed)
+        print(f"💥 {written:,} crashes -> {crashes_path} ({time.time() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Build the read-only serving datasets once, for all workers to share.
+
+Writes the road index (segment geometry arrays, cell bucket tables, road
+attributes and string tables) as .npy files plus a manifest. Workers started
+with ROAD_INDEX_SOURCE=<output directory> memory-map these files instead of
+building their own copy, so RAM does not grow with the number of workers.
+
+Usage (from app/backend; start.sh prod runs this automatically):
+    python build_serving_data.py --source db --output serving/road_index
+    python build_serving_data.py --source ../../data/raw/texas_edges.parquet
+    python build_serving_data.py --source db --bbox 29.5,-98.0,33.2,-95.0
+"""
+
+import argparse
+import getpass
+import os
+import time
+
+from dotenv import load_dotenv
+
+import road_index
+
+# -------------------------------
+# 1) Load environment variables
+# -------------------------------
+load_dotenv()
+
+USE_LOCAL = os.getenv("USE_LOCAL_DB", "true").lower() == "true"
+
+if USE_LOCAL:
+    DB_HOST = os.getenv("DB_HOST", "localhost")
+    DB_PORT = int(os.getenv("DB_PORT", "5432"))
+    DB_NAME = os.getenv("DB_NAME", "accinet")
+    DB_USER = os.getenv("DB_USER", "postgres")
+    DB_PASS = os.getenv("DB_PASS", "")
+    # Local connections without a password use the system user (peer authentication)
+    if not DB_PASS and DB_USER == "postgres" and getpass.getuser() != "postgres":
+        DB_USER = getpass.getuser()
+else:
+    DB_HOST = os.getenv("SUPABASE_DB_HOST", "db.supabase.co")
+    DB_PORT = int(os.getenv("SUPABASE_DB_PORT", "5432"))
+    DB_NAME = os.getenv("SUPABASE_DB_NAME", "postgres")
+    DB_USER = os.getenv("SUPABASE_DB_USER", "postgres")
+    DB_PASS = os.getenv("SUPABASE_DB_PASS", "")
+
+DEFAULT_OUTPUT = os.getenv("ROAD_INDEX_DIR", "serving/road_index")
+
+
+# -------------------------------
+# 2) Build and save
+# -------------------------------
+def build_road_index(source: str, output: str, bbox=None):
+    start = time.time()
+    if source == "db":
+        print(f"🛣️  Loading roads from {DB_NAME}@{DB_HOST}" + (f" (bbox {bbox})" if bbox else ""))
+        settings = {"host": DB_HOST, "port": DB_PORT, "dbname": DB_NAME, "user": DB_USER, "password": DB_PASS}
+        index = road_index.load_from_db(settings, bbox)
+    else:
+        print(f"🛣️  Loading roads from {source}")
+        index = road_index.load_from_parquet(source)
+    print(f"   {index.road_count:,} roads, {index.segment_count:,} segment pieces in {time.time() - start:.1f}s")
+
+    index.save(output, source=source)
+    size_mb = sum(os.path.getsize(os.path.join(output, f)) for f in os.listdir(output)) / 1e6
+    print(f"💾 Saved road index to {output} ({size_mb:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build shared serving data for multi-worker deployments")
+    parser.add_argument("--source", default=os.getenv("ROAD_INDEX_BUILD_SOURCE", "db"),
+                        help='"db" for the roads table, or a path to an edges GeoParquet')
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Directory for the .npy files and manifest")
+    parser.add_argument("--bbox", default=os.getenv("ROAD_INDEX_BBOX", ""), help="Optional south,west,north,east")
+    args = parser.parse_args()
+
+    bbox = tuple(float(v) for v in args.bbox.split(",")) if args.bbox else None
+    build_road_index(args.source, args.output, bbox)
+    print("✅ Serving data ready")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Build (or refresh) the zoom-band generalized road views.
+
+Creates one materialized view per zoom band in zoom_bands.BANDS, with a
+GiST index on geom, clustered on it and analyzed. The display endpoints
+(/roads/bbox and other map-extent queries) pick them up on the next
+startup; until then they read the full `roads` table.
+
+Rebuild after a full load; after load.py --mode sync, --refresh is enough.
+
+Usage (from app/backend):
+    python build_zoom_tables.py            # drop and recreate every band
+    python build_zoom_tables.py --refresh  # REFRESH the existing views
+"""
+
+import argparse
+import time
+
+from sqlalchemy import text
+
+import zoom_bands
+from load import TABLE_NAME, connect_engine
+
+
+def build_band(engine, band: zoom_bands.ZoomBand, refresh: bool):
+    start = time.time()
+    with engine.begin() as conn:
+        if refresh:
+            conn.execute(text(f"REFRESH MATERIALIZED VIEW {band.name};"))
+        else:
+            conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {band.name};"))
+            conn.execute(text(zoom_bands.view_sql(band, TABLE_NAME)))
+            conn.execute(text(f"CREATE INDEX idx_{band.name}_geom ON {band.name} USING GIST (geom);"))
+            conn.execute(text(f"CLUSTER {band.name} USING idx_{band.name}_geom;"))
+        conn.execute(text(f"ANALYZE {band.name};"))
+        rows, points = conn.execute(text(f"SELECT COUNT(*), SUM(ST_NPoints(geom)) FROM {band.name};")).one()
+    print(f"   {band.name}: {rows:,} lines, {points or 0:,} points "
+          f"(tolerance {band.tolerance:.5f}°) in {time.time() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build zoom-band generalized road views")
+    parser.add_argument("--refresh", action="store_true", help="REFRESH existing views instead of recreating them")
+    args = parser.parse_args()
+
+    engine = connect_engine()
+    with engine.connect() as conn:
+        rows, points = conn.execute(text(f"SELECT COUNT(*), SUM(ST_NPoints(geom)) FROM {TABLE_NAME};")).one()
+    print(f"🗺️  {TABLE_NAME}: {rows:,} lines, {points or 0:,} points")
+
+    for band in zoom_bands.BANDS:
+        build_band(engine, band, args.refresh)
+    print("✅ Zoom-band views ready")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Stale-while-revalidate cache for per-cell upstream data (weather).
+
+Entries are kept in memory (and in Redis when a client is given) with the
+time they were fetched:
+
+- younger than fresh_s: served as is;
+- older than fresh_s but younger than stale_s: served immediately, and a
+  background refresh is started for the key (at most one per key);
+- older than stale_s or missing: fetched before answering.
+
+Every lookup also bumps a per-key access score, decayed on each refresh
+round. A background task (start_refresh_loop) refreshes the hottest keys
+shortly before they turn stale, so busy corridors are refreshed without a
+user ever waiting on the upstream API. Only keys with a cached entry are
+refreshed this way (misses are fetched on demand), and a key whose last
+refresh failed is left alone for HOT_REFRESH_BACKOFF_S, so cells the
+upstream keeps failing on are not re-fetched every round.
+
+save_snapshot/load_snapshot write and read the non-stale entries (with
+their scores) as JSON, so a restarted worker starts with a warm cache and
+the same hot set.
+
+Fetch results containing an "error" key are returned to the caller but not
+stored, so a failed refresh keeps serving the previous value.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+FetchMany = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Dict]]]
+
+WEATHER_FRESH_S = float(os.getenv("WEATHER_FRESH_S", "3600"))
+WEATHER_STALE_S = float(os.getenv("WEATHER_STALE_S", "10800"))
+HOT_REFRESH_INTERVAL_S = float(os.getenv("HOT_REFRESH_INTERVAL_S", "60"))
+HOT_REFRESH_TOP_N = int(os.getenv("HOT_REFRESH_TOP_N", "500"))
+HOT_REFRESH_AHEAD_S = float(os.getenv("HOT_REFRESH_AHEAD_S", "300"))
+HOT_REFRESH_BACKOFF_S = float(os.getenv("HOT_REFRESH_BACKOFF_S", "900"))
+SCORE_DECAY = 0.9  # per refresh round, so the score tracks recent popularity
+MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "100000"))
+
+
+class SWRCache:
+    """In-memory (optionally Redis-backed) stale-while-revalidate cache."""
+
+    def __init__(self, namespace: str, fetch_many: FetchMany, fresh_s: float, stale_s: float,
+                 redis_client=None, max_entries: int = MAX_ENTRIES):
+        self.namespace = namespace
+        self.fetch_many = fetch_many
+        self.fresh_s = fresh_s
+        self.stale_s = stale_s
+        self.redis_client = redis_client
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[Dict, float]] = {}  # key -> (value, fetched_at)
+        self._scores: Dict[Hashable, float] = {}
+        self._refreshing = set()
+        self._failed_at: Dict[Hashable, float] = {}  # key -> time of its last failed refresh
+        self._tasks = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.stats = {"fresh": 0, "stale": 0, "miss": 0, "refreshed": 0, "hot_refreshed": 0,
+                      "late": 0}
+
+    # -------------------------------
+    # Lookups
+    # -------------------------------
+    async def get_many(self, keys: Iterable[Hashable], wait_s: Optional[float] = None) -> Dict[Hashable, Dict]:
+        """
+        Values for all keys; misses are fetched in one fetch_many call.
+        With wait_s, misses not fetched within wait_s are left out of the
+        result; their fetch keeps running and fills the cache for later calls.
+        """
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        result: Dict[Hashable, Dict] = {}
+        stale: List[Hashable] = []
+        missing: List[Hashable] = []
+
+        for key in keys:
+            self._scores[key] = self._scores.get(key, 0.0) + 1.0
+        entries = await self._lookup(keys)
+        for key in keys:
+            entry = entries.get(key)
+            age = now - entry[1] if entry else None
+            if entry is None or age >= self.stale_s:
+                missing.append(key)
+                continue
+            result[key] = entry[0]
+            if age >= self.fresh_s:
+                stale.append(key)
+
+        self.stats["fresh"] += len(result) - len(stale)
+        self.stats["stale"] += len(stale)
+        self.stats["miss"] += len(missing)
+
+        if stale:
+            self._spawn(self.refresh(stale))
+        if missing:
+            if wait_s is None:
+                result.update(await self._fetch_and_store(missing))
+            else:
+                task = self._spawn(self._fetch_and_store(missing))
+                done, _ = await asyncio.wait({task}, timeout=wait_s)
+                if done:
+                    result.update(task.result())
+                else:
+                    self.stats["late"] += len(missing)
+                    task.add_done_callback(self._log_late_failure)
+        return result
+
+    async def _fetch_and_store(self, keys: List[Hashable]) -> Dict[Hashable, Dict]:
+        fetched = await self.fetch_many(keys)
+        await self._store(fetched)
+        return fetched
+
+    def _log_late_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[cache:{self.namespace}] Late fetch failed: {task.exception()}")
+
+    async def get(self, key: Hashable) -> Dict:
+        return (await self.get_many([key]))[key]
+
+    async def refresh(self, keys: List[Hashable]):
+        """Re-fetch keys in the background (keys already being refreshed are skipped)."""
+        keys = [key for key in keys if key not in self._refreshing]
+        if not keys:
+            return
+        self._refreshing.update(keys)
+        failed = keys
+        try:
+            fetched = await self.fetch_many(keys)
+            await self._store(fetched)
+            failed = [key for key in keys if not self._is_value(fetched.get(key))]
+            self.stats["refreshed"] += len(keys) - len(failed)
+        except Exception as e:
+            print(f"[cache:{self.namespace}] Background refresh failed: {e}")
+        finally:
+            now = time.time()
+            for key in keys:
+                self._failed_at.pop(key, None)
+            self._failed_at.update((key, now) for key in failed)
+            self._refreshing.difference_update(keys)
+
+    # -------------------------------
+    # Hot key refresh
+    # -------------------------------
+    def hot_keys(self, n: int) -> List[Hashable]:
+        return sorted(self._scores, key=self._scores.get, reverse=True)[:n]
+
+    async def refresh_hot(self, top_n: int = HOT_REFRESH_TOP_N, ahead_s: float = HOT_REFRESH_AHEAD_S) -> int:
+        """Refresh the top_n hottest keys that turn stale within ahead_s; returns how many."""
+        now = time.time()
+        due = []
+        for key in self.hot_keys(top_n):
+            entry = self._entries.get(key)
+            # No entry: a miss, fetched when next asked for; recently failed: backing off
+            if entry is None or now - self._failed_at.get(key, -HOT_REFRESH_BACKOFF_S) < HOT_REFRESH_BACKOFF_S:
+                continue
+            if now - entry[1] >= self.fresh_s - ahead_s:
+                due.append(key)
+        if due:
+            await self.refresh(due)
+            self.stats["hot_refreshed"] += len(due)
+        # Decay scores and forget keys nobody asked for in a long while
+        self._scores = {key: score * SCORE_DECAY for key, score in self._scores.items() if score > 0.01}
+        self._failed_at = {key: at for key, at in self._failed_at.items() if now - at < HOT_REFRESH_BACKOFF_S}
+        return len(due)
+
+    def start_refresh_loop(self, interval_s: float = HOT_REFRESH_INTERVAL_S):
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(interval_s))
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self, interval_s: float):
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                refreshed = await self.refresh_hot()
+                if refreshed:
+                    print(f"[cache:{self.namespace}] Refreshed {refreshed} hot entries")
+            except Exception as e:
+                print(f"[cache:{self.namespace}] Hot refresh failed: {e}")
+
+    # -------------------------------
+    # Snapshots (warm start)
+    # -------------------------------
+    def save_snapshot(self, path: str) -> int:
+        """Write the entries that are not yet stale (with their access scores) to `path`; returns how many."""
+        now = time.time()
+        rows = [[key, value, fetched_at, self._scores.get(key, 0.0)]
+                for key, (value, fetched_at) in self._entries.items() if now - fetched_at < self.stale_s]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"namespace": self.namespace, "entries": rows}, f)
+        os.replace(tmp_path, path)
+        return len(rows)
+
+    def load_snapshot(self, path: str) -> int:
+        """Load entries saved by save_snapshot, skipping stale ones; returns how many were loaded."""
+        with open(path) as f:
+            snapshot = json.load(f)
+        if snapshot.get("namespace") != self.namespace:
+            raise ValueError(f"snapshot is for cache {snapshot.get('namespace')!r}, not {self.namespace!r}")
+        now = time.time()
+        loaded = 0
+        for key, value, fetched_at, score in snapshot["entries"]:
+            if now - fetched_at < self.stale_s and len(self._entries) < self.max_entries:
+                self._entries[key] = (value, fetched_at)
+                self._scores[key] = score
+                loaded += 1
+        return loaded
+
+    # -------------------------------
+    # Storage
+    # -------------------------------
+    async def _lookup(self, keys: List[Hashable]) -> Dict[Hashable, Tuple[Dict, float]]:
+        entries = {key: self._entries[key] for key in keys if key in self._entries}
+        absent = [key for key in keys if key not in entries]
+        if absent and self.redis_client is not None:
+            values = await self.redis_client.mget([f"{self.namespace}:{key}" for key in absent])
+            for key, raw in zip(absent, values):
+                if raw:
+                    stored = json.loads(raw)
+                    entries[key] = self._entries[key] = (stored["value"], stored["fetched_at"])
+        return entries
+
+    async def _store(self, values: Dict[Hashable, Dict]):
+        now = time.time()
+        stored = {key: value for key, value in values.items() if self._is_value(value)}
+        for key, value in stored.items():
+            self._entries[key] = (value, now)
+        if len(self._entries) > self.max_entries:
+            self._evict()
+        if stored and self.redis_client is not None:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, value in stored.items():
+                    pipe.set(f"{self.namespace}:{key}", json.dumps({"value": value, "fetched_at": now}),
+                             ex=int(self.stale_s))
+                await pipe.execute()
+
+    @staticmethod
+    def _is_value(value) -> bool:
+        """False for a missing result or an error result (which is never stored)."""
+        return value is not None and not (isinstance(value, dict) and "error" in value)
+
+    def _evict(self):
+        """Drop the coldest entries down to 90% of max_entries."""
+        keep = self.max_entries * 9 // 10
+        ranked = sorted(self._entries, key=lambda key: self._scores.get(key, 0.0), reverse=True)
+        for key in ranked[keep:]:
+            del self._entries[key]
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
@@ -0,0 +1,394 @@
+"""
+Thin asyncpg data-access layer for the hot spatial queries.
+
+The SQLAlchemy engine in app.py stays for everything else; the queries that
+run on every route and click go through a raw asyncpg pool instead:
+
+- every pooled connection prepares the statements in STATEMENTS once, when
+  it is opened (RoadsConnection.prepare_statements), so calls skip
+  parse/plan and named-parameter rewriting;
+- rows come back through asyncpg's binary protocol and are turned straight
+  into the typed tuples below (geometry as WKB, decoded with numpy);
+- nearest-road lookups for many points run as one statement (unnest +
+  LATERAL), so a route's uncached cells cost a handful of round trips.
+
+Map-extent queries can read a zoom-band generalized view instead of the
+full table (roads_in_bbox(band=...), see zoom_bands.py); those statements
+are prepared only for the views that have been built.
+
+Every statement prefilters with a bounding box on the GiST-indexed `geom`
+column before the exact geography distance, so the index is used.
+
+Reads can be spread over read replicas (init_pool(replica_dsns=...)): every
+query here is read-only and goes to the healthy replica with the fewest
+outstanding queries (least-outstanding-requests). Replicas are
+health-checked in the background; one that fails a check or a query is
+skipped (the query is retried on the primary) until it passes again, and
+with no healthy replica everything reads from the primary. read_capacity()
+follows the healthy pools, and capacity_listener is told whenever it
+changes, so the caller's scheduler never admits more queries than the
+pools serving them have connections.
+
+If asyncpg or the primary is unavailable, init_pool() leaves the pools unset
+and callers fall back to the SQLAlchemy path (see available()).
+"""
+
+import asyncio
+import math
+import os
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import zoom_bands
+from road_index import parse_wkb_linestring
+
+try:
+    import asyncpg
+except ImportError:  # optional fast path
+    asyncpg = None
+
+METERS_PER_DEG_LAT = 111320.0
+
+
+class NearestRoad(NamedTuple):
+    osm_id: Optional[str]
+    fclass: Optional[str]
+    name: Optional[str]
+    ref: Optional[str]
+    oneway: Optional[str]
+    maxspeed: Optional[int]
+    bridge: Optional[str]
+    tunnel: Optional[str]
+    distance_m: float
+
+
+class RoadGeometry(NamedTuple):
+    osm_id: Optional[str]
+    fclass: Optional[str]
+    name: Optional[str]
+    ref: Optional[str]
+    oneway: Optional[str]
+    maxspeed: Optional[int]
+    bridge: Optional[str]
+    tunnel: Optional[str]
+    geometry: List[List[float]]  # [[lat, lon], ...]
+
+
+_ROAD_COLUMNS = "r.osm_id, r.fclass, r.name, r.ref, r.oneway, r.maxspeed, r.bridge, r.tunnel"
+
+STATEMENTS: Dict[str, str] = {
+    # $1 lon, $2 lat, $3 radius (m), $4 bbox half-size (degrees)
+    "nearest_road": f"""
+        SELECT {_ROAD_COLUMNS},
+               ST_Distance(r.geom::geography, ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography) AS distance_m
+        FROM roads r
+        WHERE r.geom && ST_Expand(ST_SetSRID(ST_MakePoint($1, $2), 4326), $4)
+          AND ST_DWithin(r.geom::geography, ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography, $3)
+        ORDER BY distance_m
+        LIMIT 1
+    """,
+    # $1 lons[], $2 lats[], $3 radius (m), $4 bbox half-size (degrees); returns the point index first
+    "nearest_roads_many": f"""
+        SELECT p.i, {_ROAD_COLUMNS}, r.distance_m
+        FROM unnest($1::float8[], $2::float8[]) WITH ORDINALITY AS p(lon, lat, i)
+        CROSS JOIN LATERAL (
+            SELECT r.*,
+                   ST_Distance(r.geom::geography, ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326)::geography) AS distance_m
+            FROM roads r
+            WHERE r.geom && ST_Expand(ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326), $4)
+              AND ST_DWithin(r.geom::geography, ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326)::geography, $3)
+            ORDER BY distance_m
+            LIMIT 1
+        ) r
+    """,
+    # $1 west, $2 south, $3 east, $4 north, $5 limit
+    "roads_in_bbox": f"""
+        SELECT {_ROAD_COLUMNS}, ST_AsBinary(r.geom)
+        FROM roads r
+        WHERE r.geom && ST_MakeEnvelope($1, $2, $3, $4, 4326)
+        LIMIT $5
+    """,
+}
+# Same query against each zoom-band view (see zoom_bands.py); prepared only where the view exists
+for _band in zoom_bands.BANDS:
+    STATEMENTS[f"roads_in_bbox_{_band.name}"] = STATEMENTS["roads_in_bbox"].replace("FROM roads r", f"FROM {_band.name} r")
+
+# The same lookups for app.py's SQLAlchemy fallback (named parameters), used when asyncpg is unavailable.
+# Kept here so benchmarks/query_plans.py checks the plans of both paths.
+FALLBACK_STATEMENTS: Dict[str, str] = {
+    # :lon, :lat, :radius_meters, :bbox_deg (bbox half-size, see bbox_degrees)
+    "nearest_road": """
+        SELECT osm_id, fclass, name, ref, oneway, maxspeed, bridge, tunnel,
+               ST_Distance(geom::geography, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography) AS distance_meters
+        FROM roads
+        WHERE geom && ST_Expand(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), :bbox_deg)
+          AND ST_DWithin(geom::geography, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography, :radius_meters)
+        ORDER BY distance_meters
+        LIMIT 1
+    """,
+    # :west, :south, :east, :north, :limit; {table} is roads or a zoom-band view
+    "roads_in_bbox": """
+        SELECT osm_id, code, fclass, name, ref, oneway, maxspeed, layer, bridge, tunnel,
+               ST_AsGeoJSON(geom)::json AS geometry
+        FROM {table}
+        WHERE geom && ST_MakeEnvelope(:west, :south, :east, :north, 4326)
+        LIMIT :limit
+    """,
+}
+
+
+if asyncpg is not None:
+    class RoadsConnection(asyncpg.Connection):
+        """asyncpg connection holding its prepared hot statements."""
+
+        async def prepare_statements(self):
+            self.statements = {}
+            for name, sql in STATEMENTS.items():
+                try:
+                    self.statements[name] = await self.prepare(sql)
+                except asyncpg.UndefinedTableError:
+                    # Zoom-band view not built yet; roads_in_bbox falls back to the full table
+                    continue
+
+# -------------------------------
+# Pools: primary + read replicas
+# -------------------------------
+# Replica health is re-checked this often; a replica that fails a check or a query is
+# skipped until a later check succeeds
+HEALTH_CHECK_S = float(os.getenv("DB_HEALTH_CHECK_S", "5"))
+HEALTH_CHECK_TIMEOUT_S = float(os.getenv("DB_HEALTH_CHECK_TIMEOUT_S", "2"))
+
+_HEALTH_SQL = """
+    SELECT CASE WHEN pg_is_in_recovery()
+                THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                ELSE 0 END
+"""
+
+
+class PoolTarget:
+    """One database (the primary or a replica): its pool, health and outstanding queries."""
+
+    def __init__(self, name: str, connect_kwargs: Dict, min_size: int, max_size: int):
+        self.name = name
+        self.connect_kwargs = connect_kwargs
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+        self.healthy = False
+        self.outstanding = 0
+        self.lag_s: Optional[float] = None
+        self.stats = {"queries": 0, "errors": 0, "marked_down": 0}
+
+    async def open(self) -> bool:
+        try:
+            self.pool = await asyncpg.create_pool(
+                **self.connect_kwargs, min_size=self.min_size, max_size=self.max_size,
+                connection_class=RoadsConnection, init=lambda conn: conn.prepare_statements(),
+            )
+            self._set_healthy(True)
+        except Exception as e:
+            self.pool = None
+            self._set_healthy(False)
+            print(f"Warning: Could not open database pool for {self.name}: {e}")
+        return self.healthy
+
+    async def check(self):
+        """Health check (opens the pool first if it could not be opened before)."""
+        if self.pool is None:
+            await self.open()
+            return
+        try:
+            self.lag_s = float(await asyncio.wait_for(self.pool.fetchval(_HEALTH_SQL), HEALTH_CHECK_TIMEOUT_S))
+            if not self.healthy:
+                print(f"Database {self.name} is healthy again")
+            self._set_healthy(True)
+        except Exception as e:
+            self.mark_down(e)
+
+    def mark_down(self, error: Exception):
+        if self.healthy:
+            self.stats["marked_down"] += 1
+            print(f"Warning: Database {self.name} marked unhealthy: {error}")
+        self._set_healthy(False)
+
+    def _set_healthy(self, healthy: bool):
+        changed = healthy != self.healthy
+        self.healthy = healthy
+        if changed:
+            _capacity_changed()
+
+    async def fetch(self, names: Sequence[str], method: str, *args):
+        """Run the first prepared statement in `names` this connection has (fetch/fetchrow)."""
+        self.outstanding += 1
+        self.stats["queries"] += 1
+        try:
+            async with self.pool.acquire() as conn:
+                statement = next(conn.statements[name] for name in names if name in conn.statements)
+                return await getattr(statement, method)(*args)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.outstanding -= 1
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    def metrics(self) -> Dict:
+        return {"healthy": self.healthy, "outstanding": self.outstanding, "max_size": self.max_size,
+                "lag_s": self.lag_s, **self.stats}
+
+
+primary: Optional[PoolTarget] = None
+replicas: List[PoolTarget] = []
+_health_task: Optional[asyncio.Task] = None
+
+# Errors that mean the database (not the query) is at fault; a replica is marked down and
+# the query retried on the primary
+_CONNECTION_ERRORS = (OSError, asyncio.TimeoutError) + (
+    (asyncpg.PostgresConnectionError, asyncpg.InterfaceError, asyncpg.CannotConnectNowError)
+    if asyncpg is not None else ()
+)
+
+
+# Called with read_capacity() whenever it changes (the app resizes its DB scheduler with it)
+capacity_listener: Optional[Callable[[int], None]] = None
+
+
+def available() -> bool:
+    return primary is not None
+
+
+def read_capacity() -> int:
+    """Connections that can serve reads now: the healthy replicas' pools, else the primary's."""
+    healthy = [replica.max_size for replica in replicas if replica.healthy]
+    if healthy:
+        return sum(healthy)
+    return primary.max_size if primary is not None else 0
+
+
+def _capacity_changed():
+    if capacity_listener is not None and primary is not None:
+        capacity_listener(read_capacity())
+
+
+def _dsn_name(dsn: str) -> str:
+    """host:port/database of a DSN, without credentials."""
+    parts = urlsplit(dsn)
+    return f"{parts.hostname}:{parts.port or 5432}{parts.path}"
+
+
+async def init_pool(host: str, port: int, database: str, user: str, password: str,
+                    min_size: int = 2, max_size: int = 10, replica_dsns: Sequence[str] = (),
+                    server_settings: Optional[Dict[str, str]] = None) -> bool:
+    """
+    Open the asyncpg pools (statements are prepared per connection): the primary, and one
+    pool per read-replica DSN. Returns False if the primary is unavailable. Replicas that
+    cannot be reached now are retried by the health checks. server_settings (e.g. a
+    search_path) apply to every connection of every pool.
+    """
+    global primary, replicas, _health_task
+    if asyncpg is None:
+        print("Warning: asyncpg not installed; hot queries use SQLAlchemy")
+        return False
+    target = PoolTarget(f"{host}:{port}/{database}",
+                        {"host": host, "port": port, "database": database, "user": user,
+                         "password": password or None, "server_settings": server_settings},
+                        min_size, max_size)
+    if not await target.open():
+        return False
+    primary = target
+    replicas = [PoolTarget(_dsn_name(dsn), {"dsn": dsn, "server_settings": server_settings}, min_size, max_size)
+                for dsn in replica_dsns]
+    await asyncio.gather(*(replica.open() for replica in replicas))
+    if replicas:
+        _health_task = asyncio.create_task(_health_loop())
+    _capacity_changed()
+    healthy = sum(replica.healthy for replica in replicas)
+    print(f"asyncpg pool initialized ({min_size}-{max_size} connections, {len(STATEMENTS)} prepared statements, "
+          f"{healthy}/{len(replicas)} read replicas up)")
+    return True
+
+
+async def _health_loop():
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_S)
+        await asyncio.gather(*(replica.check() for replica in replicas))
+
+
+async def close_pool():
+    global primary, replicas, _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        _health_task = None
+    for target in ([primary] if primary else []) + replicas:
+        await target.close()
+    primary = None
+    replicas = []
+
+
+def _read_target() -> PoolTarget:
+    """Healthy replica with the fewest outstanding queries (relative to its pool), else the primary."""
+    healthy = [replica for replica in replicas if replica.healthy]
+    if not healthy:
+        return primary
+    return min(healthy, key=lambda replica: replica.outstanding / replica.max_size)
+
+
+async def _read(names: Sequence[str], method: str, *args):
+    """Run a read-only prepared statement on a replica, falling back to the primary."""
+    target = _read_target()
+    try:
+        return await target.fetch(names, method, *args)
+    except _CONNECTION_ERRORS as e:
+        if target is primary:
+            raise
+        target.mark_down(e)
+        return await primary.fetch(names, method, *args)
+
+
+def metrics() -> Dict:
+    return {target.name: {"role": role, **target.metrics()}
+            for role, target in ([("primary", primary)] if primary else []) + [("replica", r) for r in replicas]}
+
+
+def bbox_degrees(lat: float, radius_m: float) -> float:
+    """Half-size in degrees of a box that contains a radius_m circle at this latitude."""
+    return radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(abs(lat))), 0.01))
+
+
+# -------------------------------
+# Queries
+# -------------------------------
+async def nearest_road(lat: float, lon: float, radius_m: float) -> Optional[NearestRoad]:
+    row = await _read(["nearest_road"], "fetchrow", lon, lat, radius_m, bbox_degrees(lat, radius_m))
+    return NearestRoad(*row) if row else None
+
+
+async def nearest_roads(lats: Sequence[float], lons: Sequence[float], radius_m: float) -> List[Optional[NearestRoad]]:
+    """Nearest road (or None) for each point, in one statement."""
+    if len(lats) == 0:
+        return []
+    bbox = bbox_degrees(float(np.max(np.abs(lats))), radius_m)
+    rows = await _read(["nearest_roads_many"], "fetch", list(map(float, lons)), list(map(float, lats)), radius_m, bbox)
+    results: List[Optional[NearestRoad]] = [None] * len(lats)
+    for row in rows:
+        results[row[0] - 1] = NearestRoad(*row[1:])
+    return results
+
+
+async def roads_in_bbox(south: float, west: float, north: float, east: float, limit: int = 1000,
+                        band: Optional[zoom_bands.ZoomBand] = None) -> List[RoadGeometry]:
+    """Roads overlapping the box, from the zoom-band view when one is given and prepared."""
+    # The band view may not be built on every replica yet; each connection has what it prepared
+    names = ([f"roads_in_bbox_{band.name}"] if band else []) + ["roads_in_bbox"]
+    rows = await _read(names, "fetch", west, south, east, north, limit)
+    roads = []
+    for row in rows:
+        coords = parse_wkb_linestring(row[8]) if row[8] is not None else None
+        roads.append(RoadGeometry(*row[:8], coords.tolist() if coords is not None else []))
+    return roads
@@ -111,7 +111,8 @@ try:
                 layer    BIGINT,
                 bridge   TEXT,
                 tunnel   TEXT,
-                geom     GEOMETRY(LINESTRING, 4326)
+                geom     GEOMETRY(LINESTRING, 4326),
+                row_hash TEXT
             );
         """))
         conn.commit()
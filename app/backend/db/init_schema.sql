@@ -23,7 +23,8 @@ CREATE TABLE IF NOT EXISTS roads (
     layer    BIGINT,
     bridge   TEXT,
     tunnel   TEXT,
-    geom     GEOMETRY(LINESTRING, 4326)
+    geom     GEOMETRY(LINESTRING, 4326),
+    row_hash TEXT
 );
 
 -- Create spatial index (GIST) for efficient spatial queries
@@ -41,6 +42,7 @@ COMMENT ON TABLE roads IS 'OpenStreetMap road data with PostGIS geometry';
 COMMENT ON COLUMN roads.osm_id IS 'OpenStreetMap feature ID';
 COMMENT ON COLUMN roads.fclass IS 'Road classification (motorway, primary, secondary, tertiary, residential, etc.)';
 COMMENT ON COLUMN roads.geom IS 'PostGIS LineString geometry in WGS84 (SRID 4326)';
+COMMENT ON COLUMN roads.row_hash IS 'Hash of attributes and geometry, used by load.py --mode sync';
 
 -- Verify schema creation
 DO $$
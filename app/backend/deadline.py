@@ -0,0 +1,120 @@
+"""
+End-to-end request deadlines with graceful degradation.
+
+A request gets one time budget when it arrives (the admission middleware
+opens a scope for it), and every stage of the pipeline reads what is left of
+it through a context variable instead of carrying its own timeout:
+
+- required stages (the Directions call) are bounded by remaining() and fail
+  the request only when there is nothing to return without them;
+- optional stages (weather, roads, extra samples) are wrapped in bounded(),
+  which returns a fallback value when the budget runs out and records the
+  stage as partial instead of failing;
+- scope() opens a child scope with the same (or an earlier) expiry and its
+  own set of partial stages, so concurrently processed routes each report
+  what they are missing; partial stages also propagate to the parent.
+
+Responses carry the partial stages, so the frontend can show a route
+without weather icons quickly rather than a complete route late.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Awaitable, List, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+# Below this much remaining budget, optional work is cut back (e.g. coarser sampling)
+LOW_BUDGET_S = float(os.getenv("DEADLINE_LOW_BUDGET_MS", "1000")) / 1000
+# Kept back from optional stages for assembling and serializing the response
+RESPONSE_RESERVE_S = float(os.getenv("DEADLINE_RESPONSE_RESERVE_MS", "50")) / 1000
+
+
+class Deadline:
+    def __init__(self, expires_at: float, parent: Optional["Deadline"] = None):
+        self.expires_at = expires_at
+        self.parent = parent
+        self.partial: Set[str] = set()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def mark_partial(self, stage: str):
+        deadline = self
+        while deadline is not None:
+            deadline.partial.add(stage)
+            deadline = deadline.parent
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def scope(budget_s: Optional[float] = None):
+    """
+    Open a deadline scope for the enclosed block and yield its Deadline.
+    Nested scopes never outlive their parent; with no budget and no parent
+    the scope is unbounded.
+    """
+    parent = _current.get()
+    expires_at = time.monotonic() + budget_s if budget_s is not None else float("inf")
+    if parent is not None:
+        expires_at = min(expires_at, parent.expires_at)
+    deadline = Deadline(expires_at, parent)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining() -> float:
+    """Seconds left in the current scope (inf outside any scope)."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else float("inf")
+
+
+def running_low(threshold_s: float = LOW_BUDGET_S) -> bool:
+    return remaining() < threshold_s
+
+
+def mark_partial(stage: str):
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.mark_partial(stage)
+
+
+def partial_stages() -> List[str]:
+    deadline = _current.get()
+    return sorted(deadline.partial) if deadline is not None else []
+
+
+def optional_budget(reserve_s: float = RESPONSE_RESERVE_S) -> Optional[float]:
+    """Time an optional stage may take (None when unbounded)."""
+    left = remaining()
+    return None if left == float("inf") else max(0.0, left - reserve_s)
+
+
+async def bounded(aw: Awaitable[T], stage: str, fallback: T, reserve_s: float = RESPONSE_RESERVE_S) -> T:
+    """
+    Await an optional stage within the remaining budget. On timeout the stage
+    is cancelled, marked partial, and `fallback` is returned; errors propagate.
+    """
+    budget = optional_budget(reserve_s)
+    if budget is None:
+        return await aw
+    try:
+        return await asyncio.wait_for(aw, timeout=budget)
+    except asyncio.TimeoutError:
+        mark_partial(stage)
+        return fallback
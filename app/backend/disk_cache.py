@@ -0,0 +1,185 @@
+"""
+Persistent on-disk cache tier (SQLite) for long-lived namespaces.
+
+Road-cell lookups stay valid for days and directions geometry for hours,
+but the in-process caches die with the worker and Redis runs without
+persistence (redis.conf), so every deploy used to start cold and send a
+storm of PostGIS and Google requests. This tier keeps those values in one
+SQLite file that all workers on the machine share:
+
+- entries are (namespace, key) -> JSON value with an expiry time, in a
+  WITHOUT ROWID table so a lookup is one primary-key B-tree search;
+- get_many/set_many read and write many keys per statement/transaction;
+- warm(namespace, limit) returns the longest-lived unexpired entries of a
+  namespace, for loading into the in-process cache at startup;
+- the file is size-bounded: when the stored values exceed max_bytes,
+  expired entries and then the ones closest to expiry are deleted down to
+  90% of the bound.
+
+The database runs in WAL mode, so readers in other workers are not blocked
+by a writer. All methods are blocking; call them through asyncio.to_thread.
+Read and write errors are logged and treated as misses, never raised;
+delete_many (cache invalidation, invalidate_road_cells.py) does raise, so
+a failed invalidation is never mistaken for a done one.
+
+The tier is opt-in (DISK_CACHE_PATH, set by `start.sh prod`): the file
+outlives the process, so runs that must start cold (benchmarks) leave it
+unset or point it at a scratch directory.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Hashable, Iterable, Optional
+
+# Opt-in: empty disables the tier (start.sh prod enables it), so dev and benchmark runs start cold
+DISK_CACHE_PATH = os.getenv("DISK_CACHE_PATH", "")
+DISK_CACHE_MAX_MB = float(os.getenv("DISK_CACHE_MAX_MB", "512"))
+SQL_VARIABLES = 500  # keys per IN (...) lookup, below SQLite's parameter limit
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace  TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    size       INTEGER NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entries_expiry ON entries (expires_at);
+"""
+
+
+class DiskCache:
+    """SQLite-backed key/value store with per-entry expiry and a size bound."""
+
+    def __init__(self, path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+
+    def get_many(self, namespace: str, keys: Iterable[Hashable]) -> Dict[Hashable, object]:
+        """Unexpired values for the keys that are present (keys are matched by str())."""
+        by_str = {str(key): key for key in keys}
+        now = time.time()
+        found: Dict[Hashable, object] = {}
+        names = list(by_str)
+        try:
+            with self._lock:
+                for i in range(0, len(names), SQL_VARIABLES):
+                    chunk = names[i:i + SQL_VARIABLES]
+                    rows = self._conn.execute(
+                        f"SELECT key, value FROM entries WHERE namespace = ? AND expires_at > ? "
+                        f"AND key IN ({','.join('?' * len(chunk))})",
+                        [namespace, now, *chunk],
+                    ).fetchall()
+                    for key, value in rows:
+                        found[by_str[key]] = json.loads(value)
+        except sqlite3.Error as e:
+            # A cache read must never fail the request; treat it as a miss
+            print(f"[disk_cache] Read failed: {e}")
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(by_str) - len(found)
+        return found
+
+    def get(self, namespace: str, key: Hashable) -> Optional[object]:
+        return self.get_many(namespace, [key]).get(key)
+
+    def set_many(self, namespace: str, values: Dict[Hashable, object], ttl_s: float):
+        """Store values (None included) for ttl_s seconds, in one transaction."""
+        if not values:
+            return
+        expires_at = time.time() + ttl_s
+        rows = [(namespace, str(key), json.dumps(value), expires_at) for key, value in values.items()]
+        rows = [(*row, len(row[1]) + len(row[2])) for row in rows]
+        try:
+            with self._lock:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, size) VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                self._bytes += sum(row[4] for row in rows)
+                self.stats["writes"] += len(rows)
+                if self._bytes > self.max_bytes:
+                    self._evict()
+        except sqlite3.Error as e:
+            print(f"[disk_cache] Write failed: {e}")
+
+    def delete_many(self, namespace: str, keys: Optional[Iterable[Hashable]] = None) -> int:
+        """Delete the given keys of a namespace (all of it when keys is None); returns how many rows went."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                if keys is None:
+                    deleted = self._conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,)).rowcount
+                else:
+                    names = [str(key) for key in keys]
+                    deleted = 0
+                    for i in range(0, len(names), SQL_VARIABLES):
+                        chunk = names[i:i + SQL_VARIABLES]
+                        deleted += self._conn.execute(
+                            f"DELETE FROM entries WHERE namespace = ? AND key IN ({','.join('?' * len(chunk))})",
+                            [namespace, *chunk],
+                        ).rowcount
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        return deleted
+
+    def warm(self, namespace: str, limit: int) -> Dict[str, object]:
+        """Up to `limit` unexpired entries of a namespace, longest-lived first (keys as stored, str)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM entries WHERE namespace = ? AND expires_at > ? "
+                "ORDER BY expires_at DESC LIMIT ?",
+                (namespace, time.time(), limit),
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def _evict(self):
+        """Delete expired entries, then those closest to expiry, down to 90% of max_bytes (lock held)."""
+        with self._conn:
+            self._conn.execute("BEGIN")
+            deleted = self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),)).rowcount
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            excess = self._bytes - self.max_bytes * 9 // 10
+            if excess > 0:
+                # Walk entries in expiry order until enough bytes are covered
+                cutoff = None
+                covered = 0
+                for expires_at, size in self._conn.execute("SELECT expires_at, size FROM entries ORDER BY expires_at"):
+                    covered += size
+                    if covered >= excess:
+                        cutoff = expires_at
+                        break
+                if cutoff is not None:
+                    deleted += self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (cutoff,)).rowcount
+                self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.stats["evicted"] += deleted
+
+    def metrics(self) -> Dict:
+        return {"path": self.path, "bytes": self._bytes, "max_bytes": self.max_bytes, **self.stats}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_cache(path: str = DISK_CACHE_PATH, max_mb: float = DISK_CACHE_MAX_MB) -> Optional[DiskCache]:
+    """Open the cache file, or return None when disabled (empty path) or unusable."""
+    if not path:
+        return None
+    try:
+        return DiskCache(path, int(max_mb * 1e6))
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: Could not open disk cache {path}: {e}")
+        return None
@@ -0,0 +1,111 @@
+"""
+Drop the cached road cells a road sync changed.
+
+load.py --mode sync writes the road cells whose nearest road may have
+changed to serving/road_changes.json. This deletes those cells from the
+shared caches that outlive the workers:
+
+- Redis (REDIS_URLS): the `road_grid:<cell id>` keys, on whichever node
+  the shard ring places them;
+- the disk tier (DISK_CACHE_PATH, serving/cache.sqlite3 under
+  `start.sh prod`): the `road_grid` namespace entries.
+
+When the sync recommended a full refresh ("full_refresh": true, too many
+changes to list cells), the whole road_grid namespace is dropped instead.
+
+The other serving data built from `roads` is refreshed separately (the
+script prints the steps): REFRESH the zoom-band views
+(build_zoom_tables.py --refresh), rebuild the memory-mapped road index
+(build_serving_data.py), then restart the workers, which clears their
+in-process road cells and maps the new index.
+
+Usage (from app/backend):
+    python invalidate_road_cells.py
+    python invalidate_road_cells.py --changes serving/road_changes.json --dry-run
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+
+import disk_cache
+
+load_dotenv()
+
+ROAD_CELL_NAMESPACE = "road_grid"
+REDIS_DELETE_BATCH = 1000
+
+
+async def invalidate_redis(urls, cells, full_refresh: bool) -> int:
+    import redis_shards
+
+    client = redis_shards.ShardedRedis(urls)
+    try:
+        if full_refresh:
+            deleted = await client.delete_prefix(f"{ROAD_CELL_NAMESPACE}:")
+        else:
+            deleted = 0
+            for start in range(0, len(cells), REDIS_DELETE_BATCH):
+                keys = [f"{ROAD_CELL_NAMESPACE}:{cell}" for cell in cells[start:start + REDIS_DELETE_BATCH]]
+                count = await client.delete(keys)
+                if count is None:
+                    deleted = None
+                    break
+                deleted += count
+    finally:
+        await client.close()
+    if deleted is None:
+        raise SystemExit("❌ A Redis node could not be reached; its road cells were not invalidated. "
+                         "Run this again once it is back (or flush it).")
+    return deleted
+
+
+def invalidate_disk(path: str, cells, full_refresh: bool) -> int:
+    cache = disk_cache.DiskCache(path, int(disk_cache.DISK_CACHE_MAX_MB * 1024 * 1024))
+    try:
+        return cache.delete_many(ROAD_CELL_NAMESPACE, None if full_refresh else cells)
+    finally:
+        cache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drop the cached road cells changed by a road sync")
+    parser.add_argument("--changes", default=os.getenv("ROAD_CHANGES_FILE", "serving/road_changes.json"),
+                        help="Changes file written by load.py --mode sync")
+    parser.add_argument("--disk-cache", default=os.getenv("DISK_CACHE_PATH") or "serving/cache.sqlite3",
+                        help="Disk cache file (skipped when it does not exist)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be invalidated")
+    args = parser.parse_args()
+
+    with open(args.changes) as f:
+        changes = json.load(f)
+    cells = changes.get("cells") or []
+    full_refresh = bool(changes.get("full_refresh"))
+    synced = time.strftime("%Y-%m-%d %H:%M", time.localtime(changes.get("synced_at", 0)))
+    scope = "all road cells (full refresh)" if full_refresh else f"{len(cells):,} road cells"
+    print(f"🧹 Sync of {changes.get('source')} at {synced}: invalidating {scope}")
+
+    redis_urls = [url.strip() for url in os.getenv("REDIS_URLS", "").split(",") if url.strip()]
+    if not args.dry_run and (cells or full_refresh):
+        if redis_urls:
+            deleted = asyncio.run(invalidate_redis(redis_urls, cells, full_refresh))
+            print(f"   Redis: {deleted:,} keys deleted")
+        else:
+            print("   Redis: not configured (REDIS_URLS empty), skipped")
+        if os.path.exists(args.disk_cache):
+            print(f"   Disk cache: {invalidate_disk(args.disk_cache, cells, full_refresh):,} entries deleted")
+        else:
+            print(f"   Disk cache: {args.disk_cache} not found, skipped")
+
+    print("   Then refresh the rest of the serving data and restart the workers:")
+    print("     python build_zoom_tables.py --refresh")
+    print("     REBUILD_SERVING_DATA=1 ./start.sh prod")
+    print("✅ Road cell caches invalidated" if not args.dry_run else "✅ Dry run, nothing deleted")
+
+
+if __name__ == "__main__":
+    main()
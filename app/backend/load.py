@@ -1,8 +1,60 @@
+"""
+Load OSM roads into the PostGIS `roads` table.
+
+Modes (--mode):
+- copy (default): streams the shapefile or GeoParquet in fixed-size Arrow
+  batches (pyogrio with a `where` filter and column projection, or pyarrow
+  for parquet), so memory stays bounded by --chunk-size no matter how large
+  the source is. Each batch goes to Postgres through `COPY ... FROM STDIN`
+  with hex-encoded WKB geometry instead of row-by-row INSERTs. The spatial
+  index is dropped before the copy and rebuilt once at the end, followed by
+  ANALYZE.
+- sync: for refreshes from a new extract. Keys the table on osm_id, stages
+  the extract in a temp table (same streaming COPY), and diffs it against
+  the table by a per-feature hash of attributes and geometry (row_hash).
+  Only inserts, updates and deletes are applied, in short batched
+  transactions, so the table stays online. The road cells (0.5 km, as in
+  the app's road cache) within the nearest-road search radius of any
+  changed road, old or new geometry, are written to --changes-out;
+  invalidate_road_cells.py drops them from the shared caches.
+- parallel: a load split across --workers processes by contiguous source
+  ranges (row groups for GeoParquet, feature offsets otherwise), so each
+  worker reads only its own slice of the file. Each worker streams its
+  share into an UNLOGGED staging table; one transaction then merges them
+  into `roads` sorted by geohash, so nearby roads share pages, (re)builds
+  the GiST index, marks it as the CLUSTER index, and runs ANALYZE. With
+  --replace this is a full reload; otherwise the rows are appended and
+  roads whose osm_id is already loaded are skipped.
+- insert: the original path; reads the whole file into a GeoDataFrame and
+  uploads it with to_postgis.
+
+Usage (from app/backend):
+    python load.py --source /path/to/gis_osm_roads_free_1.shp
+    python load.py --source ../../data/raw/texas_edges.parquet --replace
+    python load.py --mode parallel --workers 8 --replace --source /path/to/gis_osm_roads_free_1.shp
+    python load.py --mode sync --source /path/to/new/gis_osm_roads_free_1.shp
+    python load.py --mode insert --source /path/to/gis_osm_roads_free_1.shp
+"""
+
+import argparse
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import math
 import os
-import geopandas as gpd
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 
+import grid
+
 # -------------------------------
 # 1) Load environment variables
 # -------------------------------
@@ -53,245 +105,801 @@ else:
 # -------------------------------
 # 2) Connect to your PostGIS DB
 # -------------------------------
-# For local connections without password, use Unix socket (peer authentication)
-# For connections with password or remote, use TCP/IP
-if USE_LOCAL and not DB_PASS and DB_HOST in ["localhost", "127.0.0.1"]:
-    # Use Unix socket for peer authentication (no password needed)
-    # Try common PostgreSQL socket directories
-    socket_dirs = [
-        "/var/run/postgresql",  # Most common on modern Linux
-        "/tmp",                  # Alternative location
-        f"/var/lib/postgresql/{DB_PORT}",  # Some installations
-    ]
-    socket_dir = None
-    for sd in socket_dirs:
-        if os.path.exists(sd):
-            socket_dir = sd
-            break
+def connect_engine():
+    # For local connections without password, use Unix socket (peer authentication)
+    # For connections with password or remote, use TCP/IP
+    if USE_LOCAL and not DB_PASS and DB_HOST in ["localhost", "127.0.0.1"]:
+        # Use Unix socket for peer authentication (no password needed)
+        # Try common PostgreSQL socket directories
+        socket_dirs = [
+            "/var/run/postgresql",  # Most common on modern Linux
+            "/tmp",                  # Alternative location
+            f"/var/lib/postgresql/{DB_PORT}",  # Some installations
+        ]
+        socket_dir = None
+        for sd in socket_dirs:
+            if os.path.exists(sd):
+                socket_dir = sd
+                break
     
-    DB_URI = f"postgresql+psycopg2://{DB_USER}/{DB_NAME}"
-    if socket_dir:
-        print(f"🔌 Connecting to {DB_TYPE} via Unix socket at {socket_dir} (peer authentication)...")
-        connect_args = {"host": socket_dir}
-    else:
-        print(f"🔌 Connecting to {DB_TYPE} via Unix socket (peer authentication, default location)...")
-        # Omit host to use psycopg2 default socket location
-        connect_args = {}
-elif DB_PASS:
-    # TCP/IP connection with password
-    DB_URI = (
-        f"postgresql+psycopg2://{DB_USER}:{DB_PASS}"
-        f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    )
-    print(f"🔌 Connecting to {DB_TYPE} at {DB_HOST}:{DB_PORT}...")
-    connect_args = {"sslmode": "require"} if USE_SSL else {}
-else:
-    # TCP/IP connection without password (may fail if auth required)
-    DB_URI = (
-        f"postgresql+psycopg2://{DB_USER}"
-        f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    )
-    print(f"🔌 Connecting to {DB_TYPE} at {DB_HOST}:{DB_PORT} (no password)...")
-    connect_args = {"sslmode": "require"} if USE_SSL else {}
-
-engine = create_engine(DB_URI, connect_args=connect_args)
-
-# Test connection before proceeding
-try:
-    with engine.connect() as conn:
-        # Check if PostGIS is installed
-        try:
-            postgis_version = conn.execute(text("SELECT PostGIS_version();")).scalar()
-            print(f"✅ Database connection successful!")
-            print(f"   PostGIS version: {postgis_version}")
-        except Exception:
-            # PostGIS might not be installed, but connection works
-            result = conn.execute(text("SELECT version();"))
-            version = result.scalar()
-            print(f"✅ Database connection successful!")
-            print(f"   PostgreSQL version: {version[:50]}...")
-            print(f"   ⚠️  WARNING: PostGIS extension not found. Install it with:")
-            print(f"      CREATE EXTENSION postgis;")
-except Exception as e:
-    error_str = str(e)
-    print(f"❌ Failed to connect to database:")
-    print(f"   Error: {error_str}")
-    if USE_LOCAL:
-        print(f"\n💡 Tips for local Postgres:")
-        if "role" in error_str.lower() and "does not exist" in error_str.lower():
-            import getpass
-            system_user = getpass.getuser()
-            print(f"   ⚠️  PostgreSQL role '{system_user}' doesn't exist.")
-            print(f"   Create it with:")
-            print(f"      sudo -u postgres createuser -s {system_user}")
-            print(f"   Or use password authentication by setting DB_PASS in .env")
-        print(f"   - Ensure PostgreSQL is running: sudo systemctl status postgresql")
-        print(f"   - Install PostGIS: sudo apt-get install postgresql-postgis")
-        print(f"   - Create database: createdb -U postgres your_db_name")
-        print(f"   - Enable PostGIS: psql -U postgres -d your_db_name -c 'CREATE EXTENSION postgis;'")
+        DB_URI = f"postgresql+psycopg2://{DB_USER}/{DB_NAME}"
+        if socket_dir:
+            print(f"🔌 Connecting to {DB_TYPE} via Unix socket at {socket_dir} (peer authentication)...")
+            connect_args = {"host": socket_dir}
+        else:
+            print(f"🔌 Connecting to {DB_TYPE} via Unix socket (peer authentication, default location)...")
+            # Omit host to use psycopg2 default socket location
+            connect_args = {}
+    elif DB_PASS:
+        # TCP/IP connection with password
+        DB_URI = (
+            f"postgresql+psycopg2://{DB_USER}:{DB_PASS}"
+            f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+        )
+        print(f"🔌 Connecting to {DB_TYPE} at {DB_HOST}:{DB_PORT}...")
+        connect_args = {"sslmode": "require"} if USE_SSL else {}
     else:
-        print(f"\n💡 Tips for Supabase:")
-        print(f"   - Check SUPABASE_DB_HOST in .env (format: db.<project-ref>.supabase.co)")
-        print(f"   - Verify SUPABASE_DB_PASS is correct")
-        print(f"   - Ensure your network can reach Supabase")
-    raise
+        # TCP/IP connection without password (may fail if auth required)
+        DB_URI = (
+            f"postgresql+psycopg2://{DB_USER}"
+            f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+        )
+        print(f"🔌 Connecting to {DB_TYPE} at {DB_HOST}:{DB_PORT} (no password)...")
+        connect_args = {"sslmode": "require"} if USE_SSL else {}
+
+    engine = create_engine(DB_URI, connect_args=connect_args)
+
+    # Test connection before proceeding
+    try:
+        with engine.connect() as conn:
+            # Check if PostGIS is installed
+            try:
+                postgis_version = conn.execute(text("SELECT PostGIS_version();")).scalar()
+                print(f"✅ Database connection successful!")
+                print(f"   PostGIS version: {postgis_version}")
+            except Exception:
+                # PostGIS might not be installed, but connection works
+                result = conn.execute(text("SELECT version();"))
+                version = result.scalar()
+                print(f"✅ Database connection successful!")
+                print(f"   PostgreSQL version: {version[:50]}...")
+                print(f"   ⚠️  WARNING: PostGIS extension not found. Install it with:")
+                print(f"      CREATE EXTENSION postgis;")
+    except Exception as e:
+        error_str = str(e)
+        print(f"❌ Failed to connect to database:")
+        print(f"   Error: {error_str}")
+        if USE_LOCAL:
+            print(f"\n💡 Tips for local Postgres:")
+            if "role" in error_str.lower() and "does not exist" in error_str.lower():
+                import getpass
+                system_user = getpass.getuser()
+                print(f"   ⚠️  PostgreSQL role '{system_user}' doesn't exist.")
+                print(f"   Create it with:")
+                print(f"      sudo -u postgres createuser -s {system_user}")
+                print(f"   Or use password authentication by setting DB_PASS in .env")
+            print(f"   - Ensure PostgreSQL is running: sudo systemctl status postgresql")
+            print(f"   - Install PostGIS: sudo apt-get install postgresql-postgis")
+            print(f"   - Create database: createdb -U postgres your_db_name")
+            print(f"   - Enable PostGIS: psql -U postgres -d your_db_name -c 'CREATE EXTENSION postgis;'")
+        else:
+            print(f"\n💡 Tips for Supabase:")
+            print(f"   - Check SUPABASE_DB_HOST in .env (format: db.<project-ref>.supabase.co)")
+            print(f"   - Verify SUPABASE_DB_PASS is correct")
+            print(f"   - Ensure your network can reach Supabase")
+        raise
+
+    return engine
+
 
 # -------------------------------
-# 3) Load shapefile with GeoPandas
+# 3) Ensure consistent schema
 # -------------------------------
-shapefile_path = "/home/rjg/texas_roads/gis_osm_roads_free_1.shp"
-gdf = gpd.read_file(shapefile_path)  # geometry column is usually named 'geometry'
-print(f"✅ Loaded shapefile with {len(gdf)} rows and {len(gdf.columns)} columns")
-print(f"📋 Columns: {list(gdf.columns)}")
-print(f"📍 Geometry column name: {gdf.geometry.name}")
+TABLE_NAME = "roads"
+ROAD_COLUMNS = ["osm_id", "code", "fclass", "name", "ref", "oneway", "maxspeed", "layer", "bridge", "tunnel"]
+INTEGER_COLUMNS = {"code", "maxspeed", "layer"}
+DEFAULT_SOURCE = os.getenv("ROADS_SOURCE", "/home/rjg/texas_roads/gis_osm_roads_free_1.shp")
+DRIVABLE_CLASSES = ["motorway", "primary", "secondary", "tertiary", "residential"]
+
+
+def ensure_schema(engine):
+    print(f"\n📋 Ensuring consistent schema for table '{TABLE_NAME}'...")
+
+    with engine.begin() as conn:
+        # Check if table exists
+        table_exists = conn.execute(text("""
+            SELECT EXISTS (
+                SELECT FROM information_schema.tables 
+                WHERE table_schema = 'public' 
+                AND table_name = :table_name
+            );
+        """), {"table_name": TABLE_NAME}).scalar()
+    
+        if not table_exists:
+            print("   Creating table with consistent schema...")
+            # Create table with exact schema to ensure consistency
+            conn.execute(text("""
+                CREATE TABLE roads (
+                    osm_id   TEXT,
+                    code     INTEGER,
+                    fclass   TEXT,
+                    name     TEXT,
+                    ref      TEXT,
+                    oneway   TEXT,
+                    maxspeed INTEGER,
+                    layer    BIGINT,
+                    bridge   TEXT,
+                    tunnel   TEXT,
+                    geom     GEOMETRY(LINESTRING, 4326),
+                    row_hash TEXT
+                );
+            """))
+            print("   ✅ Table created with consistent schema")
+        else:
+            print("   ✅ Table already exists")
+            # Content hash used by sync mode to detect changed features
+            conn.execute(text(f"ALTER TABLE {TABLE_NAME} ADD COLUMN IF NOT EXISTS row_hash TEXT;"))
 
-# Show a few rows locally before upload
-print("\n🔎 Local preview (first 5 rows):")
-print(gdf.head())
 
 # -------------------------------
-# 3.1) (Optional) keep only key columns
+# 4) Insert mode: whole file in memory, to_postgis
 # -------------------------------
-# Adjust this list to your needs; comment out to keep everything.
-'''
-columns_to_keep = ["osm_id", "name", "fclass", "oneway", "bridge", "tunnel", gdf.geometry.name]
-existing_columns = [c for c in columns_to_keep if c in gdf.columns]
-if existing_columns:
-    gdf = gdf[existing_columns]
-'''
+def load_insert(engine, source: str, fclasses: List[str]):
+    import geopandas as gpd
+
+    gdf = gpd.read_file(source)  # geometry column is usually named 'geometry'
+    print(f"✅ Loaded shapefile with {len(gdf)} rows and {len(gdf.columns)} columns")
+    print(f"📋 Columns: {list(gdf.columns)}")
+    print(f"📍 Geometry column name: {gdf.geometry.name}")
+
+    # Show a few rows locally before upload
+    print("\n🔎 Local preview (first 5 rows):")
+    print(gdf.head())
+
+    # -------------------------------
+    # 4.1) (Optional) keep only key columns
+    # -------------------------------
+    # Adjust this list to your needs; comment out to keep everything.
+    '''
+    columns_to_keep = ["osm_id", "name", "fclass", "oneway", "bridge", "tunnel", gdf.geometry.name]
+    existing_columns = [c for c in columns_to_keep if c in gdf.columns]
+    if existing_columns:
+        gdf = gdf[existing_columns]
+    '''
+    # -------------------------------
+    # 4.2) (Optional) filter for drivable roads
+    # -------------------------------
+    if "fclass" in gdf.columns:
+        gdf = gdf[gdf["fclass"].isin(fclasses)]
+        print(f"🚗 After filtering, {len(gdf)} rows remain")
+    else:
+        print("⚠️  No 'fclass' column found, skipping filter")
+
+    # Ensure we still have a valid GeoDataFrame with geometry
+    if not isinstance(gdf, gpd.GeoDataFrame):
+        raise ValueError("DataFrame lost geometry column during processing")
+    if gdf.geometry.isna().all():
+        raise ValueError("All geometry values are null")
+
+    # -------------------------------
+    # 4.3) Ensure geometry column is named 'geom'
+    # -------------------------------
+    # This keeps geometry semantics intact AND sets the name used in PostGIS.
+    if gdf.geometry.name != "geom":
+        gdf = gdf.rename_geometry("geom")
+        print(f"✅ Renamed geometry column to 'geom'")
+    else:
+        print(f"✅ Geometry column already named 'geom'")
+
+    # -------------------------------
+    # 4.4) Estimate data size before upload
+    # -------------------------------
+    # Rough estimation: each row with geometry typically takes 200-500 bytes
+    # This is a conservative estimate
+    estimated_size_mb = (len(gdf) * 400) / (1024 * 1024)  # 400 bytes per row average
+    print(f"\n📊 Data size estimation:")
+    print(f"   Rows: {len(gdf):,}")
+    print(f"   Estimated size: ~{estimated_size_mb:.1f} MB")
+    if not USE_LOCAL and estimated_size_mb > 500:
+        print(f"   Supabase free tier limit: 500 MB")
+        print(f"\n⚠️  WARNING: Estimated size ({estimated_size_mb:.1f} MB) exceeds free tier limit (500 MB)")
+        print(f"   Consider:")
+        print(f"   - Using local Postgres (set USE_LOCAL_DB=true in .env)")
+        print(f"   - Filtering to a smaller geographic area")
+        print(f"   - Removing unnecessary columns (uncomment section 4.1)")
+        print(f"   - Simplifying geometries (reduce vertex count)")
+        print(f"   - Using Supabase Pro tier ($25/month for 8 GB)")
+        response = input("\n   Continue anyway? (yes/no): ")
+        if response.lower() not in ['yes', 'y']:
+            print("❌ Upload cancelled.")
+            raise SystemExit(0)
+    else:
+        print(f"   ✅ Ready to upload")
+
+    print(f"\n📤 Uploading data to '{TABLE_NAME}'...")
+    gdf.to_postgis(
+        name=TABLE_NAME,
+        con=engine,
+        if_exists="append",       # Use 'append' since table is pre-created, or 'replace' to overwrite
+        index=False,              # We'll create index manually to avoid duplicates
+        chunksize=50000           # tune if needed
+    )
+    print(f"✅ Uploaded {len(gdf)} records to table '{TABLE_NAME}' in {DB_TYPE}.")
+
+
 # -------------------------------
-# 3.2) (Optional) filter for drivable roads
+# 5) Copy mode: stream Arrow batches through COPY
 # -------------------------------
-if "fclass" in gdf.columns:
-    gdf = gdf[gdf["fclass"].isin(
-        ["motorway", "primary", "secondary", "tertiary", "residential"]
-    )]
-    print(f"🚗 After filtering, {len(gdf)} rows remain")
-else:
-    print("⚠️  No 'fclass' column found, skipping filter")
+WKB_LINESTRING = 2
+SRID = 4326
+
+
+def _first(value):
+    # OSMnx edges store merged attributes as lists
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else None
+    return value
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(float(value)) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _wkb_type(wkb: bytes) -> int:
+    """Base geometry type of a WKB/EWKB value (ignores Z/M/SRID flags)."""
+    code = struct.unpack("<I" if wkb[0] == 1 else ">I", wkb[1:5])[0]
+    return (code & 0xFFFF) % 1000
+
+
+def source_units(source: str) -> int:
+    """
+    Number of independently readable units in the source: row groups of a
+    GeoParquet, features of anything else (read_batches(part=...) seeks to them).
+    """
+    if source.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(source).num_row_groups
+
+    import pyogrio
+    return pyogrio.read_info(source, force_feature_count=True)["features"]
+
+
+def _keep_rows(data: Dict[str, list], keep: List[bool]) -> Dict[str, list]:
+    return {key: [v for v, ok in zip(values, keep) if ok] for key, values in data.items()}
+
+
+def read_batches(source: str, fclasses: List[str], chunk_size: int,
+                 part: Optional[Tuple[int, int]] = None) -> Iterator[Dict[str, list]]:
+    """
+    Yield column dicts ({column: values, "geom": WKB list}) of at most
+    chunk_size filtered rows, reading only the columns the table needs.
+    part=(start, stop) reads only those units (see source_units), so parallel
+    workers each read their own slice of the file.
+    """
+    if source.endswith(".parquet"):
+        yield from _read_parquet_batches(source, fclasses, chunk_size, part)
+        return
+
+    import pyogrio
+
+    info = pyogrio.read_info(source)
+    if info.get("crs") and info["crs"] != "EPSG:4326":
+        raise ValueError(f"{source} is in {info['crs']}; reproject to EPSG:4326 before loading")
+    columns = [c for c in ROAD_COLUMNS if c in list(info["fields"])]
+    filter_classes = fclasses if fclasses and "fclass" in columns else None
+    where = "fclass IN ({})".format(", ".join(f"'{c}'" for c in filter_classes)) if filter_classes else None
+    skip, remaining = 0, None
+    if part is not None:
+        # Seek by feature index (an attribute filter would make OGR count through the skipped
+        # features), stop after the range and filter the classes here instead
+        skip, remaining, where = part[0], part[1] - part[0], None
+    with pyogrio.open_arrow(source, columns=columns, where=where, batch_size=chunk_size, skip_features=skip,
+                            use_pyarrow=True) as (meta, reader):
+        geometry_name = meta.get("geometry_name") or "wkb_geometry"
+        for batch in reader:
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                batch = batch.slice(0, remaining)
+                remaining -= batch.num_rows
+            data = batch.to_pydict()
+            data["geom"] = data.pop(geometry_name)
+            if part is not None and filter_classes:
+                data = _keep_rows(data, [fclass in filter_classes for fclass in data["fclass"]])
+            yield data
+
+
+def _read_parquet_batches(source: str, fclasses: List[str], chunk_size: int,
+                          part: Optional[Tuple[int, int]] = None) -> Iterator[Dict[str, list]]:
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(source)
+    geo = json.loads((parquet.schema_arrow.metadata or {}).get(b"geo", b"{}"))
+    geometry_name = geo.get("primary_column", "geometry")
+    crs = (geo.get("columns", {}).get(geometry_name) or {}).get("crs")
+    if isinstance(crs, dict) and crs.get("id", {}).get("code", 4326) != 4326:
+        raise ValueError(f"{source} is not in EPSG:4326; reproject before loading")
+
+    # Accept OSMnx column names (osmid, highway) as well as the table's
+    renames = {"osmid": "osm_id", "highway": "fclass"}
+    available = set(parquet.schema_arrow.names)
+    columns = [c for c in ROAD_COLUMNS if c in available]
+    columns += [src for src, dst in renames.items() if src in available and dst not in available]
+
+    row_groups = list(range(*part)) if part is not None else None
+    for batch in parquet.iter_batches(batch_size=chunk_size, row_groups=row_groups, columns=columns + [geometry_name]):
+        data = {renames.get(key, key): [_first(v) for v in values] for key, values in batch.to_pydict().items()}
+        data["geom"] = data.pop(geometry_name)
+        if fclasses and "fclass" in data:
+            data = _keep_rows(data, [fclass in fclasses for fclass in data["fclass"]])
+        yield data
+
+
+def row_hash(values: list, wkb: bytes) -> str:
+    """Content hash of a feature's attributes and geometry (stored in roads.row_hash)."""
+    digest = hashlib.md5()
+    digest.update("\x1f".join("" if v is None else str(v) for v in values).encode("utf-8"))
+    digest.update(wkb)
+    return digest.hexdigest()
+
+
+def copy_rows(cursor, data: Dict[str, list], table: str = TABLE_NAME) -> Dict[str, int]:
+    """COPY one batch into `table` (roads or a staging table); returns copied/skipped counts."""
+    columns = [c for c in ROAD_COLUMNS if c in data]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    copied = skipped = 0
+    for row in zip(*(data[c] for c in columns), data["geom"]):
+        wkb = row[-1]
+        if not wkb or _wkb_type(wkb) != WKB_LINESTRING:
+            # The column is LINESTRING; multi-part or empty geometries are skipped
+            skipped += 1
+            continue
+        values = [_to_int(v) if c in INTEGER_COLUMNS else (None if v is None else str(v))
+                  for c, v in zip(columns, row)]
+        writer.writerow(values + [f"SRID={SRID};{wkb.hex()}", row_hash(values, wkb)])
+        copied += 1
+    buffer.seek(0)
+    # CSV NULLs are unquoted empty fields; geometry parses from hex WKB with an SRID prefix
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}, geom, row_hash) FROM STDIN WITH (FORMAT csv)", buffer)
+    return {"copied": copied, "skipped": skipped}
+
+
+def load_copy(engine, source: str, fclasses: List[str], chunk_size: int, replace: bool):
+    print(f"\n📤 Streaming {source} into '{TABLE_NAME}' with COPY ({chunk_size:,} rows per batch)...")
+    start = time.time()
+    copied = skipped = 0
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if replace:
+            # TRUNCATE in the same transaction lets Postgres skip WAL for the copy (wal_level=minimal)
+            cursor.execute(f"TRUNCATE {TABLE_NAME};")
+            print(f"   🗑️  Truncated '{TABLE_NAME}'")
+        # Maintaining the GiST index row by row is the slowest part of a bulk load; rebuild it afterwards
+        cursor.execute("DROP INDEX IF EXISTS idx_roads_geom;")
+        cursor.execute(f"DROP INDEX IF EXISTS {TABLE_NAME}_geom_idx;")
+
+        for data in read_batches(source, fclasses, chunk_size):
+            counts = copy_rows(cursor, data)
+            copied += counts["copied"]
+            skipped += counts["skipped"]
+            elapsed = time.time() - start
+            print(f"   {copied:>12,} rows copied  ({copied / max(elapsed, 1e-9):,.0f} rows/s, {elapsed:.0f}s)")
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    print(f"✅ Copied {copied:,} records to table '{TABLE_NAME}' in {time.time() - start:.1f}s")
+    if skipped:
+        print(f"   ⚠️  Skipped {skipped:,} rows without a single LINESTRING geometry")
 
-# Ensure we still have a valid GeoDataFrame with geometry
-if not isinstance(gdf, gpd.GeoDataFrame):
-    raise ValueError("DataFrame lost geometry column during processing")
-if gdf.geometry.isna().all():
-    raise ValueError("All geometry values are null")
 
 # -------------------------------
-# 3.3) Ensure geometry column is named 'geom'
+# 6) Sync mode: diff against the table by osm_id
 # -------------------------------
-# This keeps geometry semantics intact AND sets the name used in PostGIS.
-if gdf.geometry.name != "geom":
-    gdf = gdf.rename_geometry("geom")
-    print(f"✅ Renamed geometry column to 'geom'")
-else:
-    print(f"✅ Geometry column already named 'geom'")
+STAGING_TABLE = "roads_incoming"
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "5000"))
+# Beyond this many changed roads, consumers should rebuild everything instead of per-cell refreshes
+SYNC_FULL_REFRESH_ROWS = int(os.getenv("SYNC_FULL_REFRESH_ROWS", "200000"))
+SEGMENTIZE_DEG = 0.002  # densify changed geometries so no 0.5 km cell between vertices is missed
+# A cached road cell holds the nearest road within the search radius of a point in the cell, so a
+# changed road can change the answer for cells it never enters. Widest radius behind a cached
+# cell: 0.5 km (fetch_roads_for_route without the road index; the other lookups use 100 m)
+SYNC_SEARCH_RADIUS_M = float(os.getenv("SYNC_SEARCH_RADIUS_M", "500"))
+
+
+def ensure_key(cursor, max_delete_share: float):
+    """
+    Make osm_id the primary key, dropping duplicate rows left by earlier appends.
+    Aborts (before deleting anything) when more than max_delete_share of the table would go:
+    a table loaded from an OSMnx edges parquet has many edges per osmid and can't be keyed.
+    """
+    cursor.execute("""
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'p'
+    """, (TABLE_NAME,))
+    if cursor.fetchone():
+        return
+    cursor.execute(f"SELECT COUNT(*), COUNT(DISTINCT osm_id) FROM {TABLE_NAME}")
+    total, distinct = cursor.fetchone()
+    redundant = total - distinct  # repeated osm_ids and NULLs
+    if total and redundant > max_delete_share * total:
+        raise SystemExit(f"❌ {TABLE_NAME}.osm_id is not unique: keying it for sync would delete {redundant:,} "
+                         f"of {total:,} rows (> {max_delete_share:.0%}). Reload the table with --replace "
+                         f"from a source with one feature per osm_id, or pass --max-delete-share")
+    print(f"   🔑 Adding primary key on {TABLE_NAME}.osm_id...")
+    cursor.execute(f"""
+        DELETE FROM {TABLE_NAME} a USING {TABLE_NAME} b
+        WHERE a.osm_id = b.osm_id AND a.ctid > b.ctid
+    """)
+    if cursor.rowcount:
+        print(f"   🧹 Removed {cursor.rowcount:,} duplicate rows")
+    cursor.execute(f"DELETE FROM {TABLE_NAME} WHERE osm_id IS NULL")
+    cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD PRIMARY KEY (osm_id)")
+
+
+def stage_source(cursor, source: str, fclasses: List[str], chunk_size: int) -> int:
+    """Stream the source into a session-local staging table keyed like roads."""
+    cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+    cursor.execute(f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE {TABLE_NAME})")
+    start = time.time()
+    staged = skipped = 0
+    for data in read_batches(source, fclasses, chunk_size):
+        counts = copy_rows(cursor, data, table=STAGING_TABLE)
+        staged += counts["copied"]
+        skipped += counts["skipped"]
+        elapsed = time.time() - start
+        print(f"   {staged:>12,} rows staged  ({staged / max(elapsed, 1e-9):,.0f} rows/s, {elapsed:.0f}s)")
+    if skipped:
+        print(f"   ⚠️  Skipped {skipped:,} rows without a single LINESTRING geometry")
+
+    cursor.execute(f"CREATE INDEX ON {STAGING_TABLE} (osm_id)")
+    cursor.execute(f"""
+        DELETE FROM {STAGING_TABLE} a USING {STAGING_TABLE} b
+        WHERE a.osm_id = b.osm_id AND a.ctid > b.ctid
+    """)
+    if cursor.rowcount:
+        print(f"   ⚠️  Dropped {cursor.rowcount:,} features with a repeated osm_id (sync keeps one feature per way)")
+        staged -= cursor.rowcount
+    cursor.execute(f"ANALYZE {STAGING_TABLE}")
+    return staged
+
+
+def plan_changes(cursor, batch_size: int) -> Dict[str, int]:
+    """Collect inserts, updates and deletes (with old and new geometry) into road_changes."""
+    cursor.execute("DROP TABLE IF EXISTS road_changes")
+    cursor.execute(f"""
+        CREATE TEMP TABLE road_changes AS
+        SELECT osm_id, op, old_geom, new_geom,
+               (row_number() OVER (ORDER BY osm_id) - 1) / %s AS batch
+        FROM (
+            SELECT COALESCE(i.osm_id, r.osm_id) AS osm_id,
+                   CASE WHEN r.osm_id IS NULL THEN 'insert'
+                        WHEN i.osm_id IS NULL THEN 'delete'
+                        ELSE 'update' END AS op,
+                   r.geom AS old_geom, i.geom AS new_geom
+            FROM {STAGING_TABLE} i
+            FULL OUTER JOIN {TABLE_NAME} r ON r.osm_id = i.osm_id
+            WHERE r.osm_id IS NULL OR i.osm_id IS NULL OR r.row_hash IS DISTINCT FROM i.row_hash
+        ) diff
+    """, (batch_size,))
+    cursor.execute("CREATE INDEX ON road_changes (batch)")
+    cursor.execute("SELECT op, COUNT(*) FROM road_changes GROUP BY op")
+    counts = {"insert": 0, "update": 0, "delete": 0}
+    counts.update(dict(cursor.fetchall()))
+    return counts
+
+
+def apply_changes(raw, n_changes: int, batch_size: int):
+    """Apply road_changes in batches, one short transaction each."""
+    columns = ROAD_COLUMNS + ["geom", "row_hash"]
+    assignments = ", ".join(f"{c} = i.{c}" for c in columns if c != "osm_id")
+    n_batches = (n_changes + batch_size - 1) // batch_size
+    cursor = raw.cursor()
+    for batch in range(n_batches):
+        cursor.execute(f"""
+            DELETE FROM {TABLE_NAME} r USING road_changes c
+            WHERE c.batch = %s AND c.op = 'delete' AND r.osm_id = c.osm_id
+        """, (batch,))
+        cursor.execute(f"""
+            UPDATE {TABLE_NAME} r SET {assignments}
+            FROM road_changes c JOIN {STAGING_TABLE} i ON i.osm_id = c.osm_id
+            WHERE c.batch = %s AND c.op = 'update' AND r.osm_id = c.osm_id
+        """, (batch,))
+        cursor.execute(f"""
+            INSERT INTO {TABLE_NAME} ({', '.join(columns)})
+            SELECT {', '.join('i.' + c for c in columns)}
+            FROM road_changes c JOIN {STAGING_TABLE} i ON i.osm_id = c.osm_id
+            WHERE c.batch = %s AND c.op = 'insert'
+        """, (batch,))
+        raw.commit()
+        if (batch + 1) % 20 == 0 or batch + 1 == n_batches:
+            print(f"   ✏️  Applied batch {batch + 1}/{n_batches}")
+
+
+def changed_cells(raw, cell_km: float = grid.ROAD_CELL_KM, radius_m: float = SYNC_SEARCH_RADIUS_M) -> Dict:
+    """
+    Road cells within radius_m of the old or new geometry of every changed road
+    (whose cached nearest road may have changed), plus their bbox.
+    """
+    cells = set()
+    bbox = None
+    # Server-side cursor: points arrive in bounded chunks
+    cursor = raw.cursor(name="changed_points")
+    cursor.itersize = 100000
+    cursor.execute(f"""
+        SELECT ST_Y(p.geom), ST_X(p.geom)
+        FROM road_changes c
+        CROSS JOIN LATERAL unnest(ARRAY[c.old_geom, c.new_geom]) AS g(geom)
+        CROSS JOIN LATERAL ST_DumpPoints(ST_Segmentize(g.geom, %s)) AS p
+        WHERE g.geom IS NOT NULL
+    """, (SEGMENTIZE_DEG,))
+    while True:
+        rows = cursor.fetchmany(100000)
+        if not rows:
+            break
+        points = np.asarray(rows, dtype=np.float64)
+        cells.update(np.unique(grid.cell_ids(points[:, 0], points[:, 1], cell_km)).tolist())
+        lo, hi = points.min(axis=0), points.max(axis=0)
+        bbox = [lo[0], lo[1], hi[0], hi[1]] if bbox is None else [min(bbox[0], lo[0]), min(bbox[1], lo[1]),
+                                                 max(bbox[2], hi[0]), max(bbox[3], hi[1])]
+    cursor.close()
+    if not cells:
+        return {"cells": [], "bbox": None}
+    # Dilate by the search radius: cells are within ~15% of nominal size (grid.py), hence the margin
+    radius_km = radius_m / 1000
+    cells = grid.dilate(list(cells), math.ceil(radius_km / (cell_km * 0.85))).tolist()
+    pad_lat = radius_km / grid.KM_PER_DEG_LAT
+    pad_lon = radius_km / (grid.KM_PER_DEG_LAT * math.cos(math.radians(max(abs(bbox[0]), abs(bbox[2])))))
+    bbox = [bbox[0] - pad_lat, bbox[1] - pad_lon, bbox[2] + pad_lat, bbox[3] + pad_lon]
+    return {"cells": cells, "bbox": [round(float(v), 6) for v in bbox]}
+
+
+def load_sync(engine, source: str, fclasses: List[str], chunk_size: int, batch_size: int,
+              changes_out: str, max_delete_share: float):
+    print(f"\n🔄 Syncing '{TABLE_NAME}' with {source}...")
+    start = time.time()
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        # Staging touches only a temp table; keying and planning run after it in the same
+        # transaction, so a failed check leaves roads untouched and the lock is held briefly
+        staged = stage_source(cursor, source, fclasses, chunk_size)
+        ensure_key(cursor, max_delete_share)
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
+        existing = cursor.fetchone()[0]
+        counts = plan_changes(cursor, batch_size)
+        n_changes = sum(counts.values())
+        print(f"   📊 {staged:,} incoming, {existing:,} existing: {counts['insert']:,} new, "
+              f"{counts['update']:,} changed, {counts['delete']:,} removed")
+
+        # A truncated extract or a wrong --fclass would otherwise delete most of the table
+        if existing and counts["delete"] > max_delete_share * existing:
+            raise SystemExit(f"❌ Sync would delete {counts['delete']:,} of {existing:,} roads "
+                             f"(> {max_delete_share:.0%}); check the source or pass --max-delete-share")
+        raw.commit()
+
+        if n_changes:
+            apply_changes(raw, n_changes, batch_size)
+            cursor.execute(f"ANALYZE {TABLE_NAME}")
+            raw.commit()
+
+        full_refresh = n_changes > SYNC_FULL_REFRESH_ROWS
+        changes = {
+            "source": source,
+            "synced_at": int(time.time()),
+            "inserted": counts["insert"],
+            "updated": counts["update"],
+            "deleted": counts["delete"],
+            "unchanged": staged - counts["insert"] - counts["update"],
+            "cell_km": grid.ROAD_CELL_KM,
+            "full_refresh": full_refresh,
+            "cells": [],
+            "bbox": None,
+        }
+        if n_changes and not full_refresh:
+            changes.update(changed_cells(raw))
+        raw.commit()
+    except BaseException:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    os.makedirs(os.path.dirname(changes_out) or ".", exist_ok=True)
+    with open(changes_out, "w") as f:
+        json.dump(changes, f)
+    detail = "full refresh recommended" if full_refresh else f"{len(changes['cells']):,} road cells"
+    print(f"✅ Sync done in {time.time() - start:.1f}s; changes written to {changes_out} ({detail})")
+
 
 # -------------------------------
-# 3.4) Estimate data size before upload
+# 7) Parallel mode: range-partitioned staging + spatially sorted merge
 # -------------------------------
-# Rough estimation: each row with geometry typically takes 200-500 bytes
-# This is a conservative estimate
-estimated_size_mb = (len(gdf) * 400) / (1024 * 1024)  # 400 bytes per row average
-print(f"\n📊 Data size estimation:")
-print(f"   Rows: {len(gdf):,}")
-print(f"   Estimated size: ~{estimated_size_mb:.1f} MB")
-if not USE_LOCAL and estimated_size_mb > 500:
-    print(f"   Supabase free tier limit: 500 MB")
-    print(f"\n⚠️  WARNING: Estimated size ({estimated_size_mb:.1f} MB) exceeds free tier limit (500 MB)")
-    print(f"   Consider:")
-    print(f"   - Using local Postgres (set USE_LOCAL_DB=true in .env)")
-    print(f"   - Filtering to a smaller geographic area")
-    print(f"   - Removing unnecessary columns (uncomment section 3.1)")
-    print(f"   - Simplifying geometries (reduce vertex count)")
-    print(f"   - Using Supabase Pro tier ($25/month for 8 GB)")
-    response = input("\n   Continue anyway? (yes/no): ")
-    if response.lower() not in ['yes', 'y']:
-        print("❌ Upload cancelled.")
-        exit(0)
-else:
-    print(f"   ✅ Ready to upload")
+PART_TABLE = "roads_part_{}"
+GEOHASH_PRECISION = 10
+
+
+def partition_ranges(units: int, n_parts: int) -> List[Tuple[int, int]]:
+    """Split source units (see source_units) into at most n_parts contiguous, non-empty (start, stop) ranges."""
+    bounds = np.linspace(0, units, min(n_parts, units) + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _load_partition(task) -> Dict[str, int]:
+    """Worker process: copy its range of the source into its UNLOGGED staging table."""
+    part, units, source, fclasses, chunk_size = task
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = connect_engine()
+    table = PART_TABLE.format(part)
+    start = time.time()
+    copied = skipped = 0
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        # UNLOGGED: no WAL for staging rows; they are rewritten by the merge anyway
+        cursor.execute(f"CREATE UNLOGGED TABLE {table} (LIKE {TABLE_NAME})")
+        for data in read_batches(source, fclasses, chunk_size, part=units):
+            counts = copy_rows(cursor, data, table=table)
+            copied += counts["copied"]
+            skipped += counts["skipped"]
+        raw.commit()
+    finally:
+        raw.close()
+        engine.dispose()
+    print(f"   [part {part}] {copied:,} rows staged in {time.time() - start:.0f}s")
+    return {"copied": copied, "skipped": skipped}
+
+
+def load_parallel(engine, source: str, fclasses: List[str], chunk_size: int, workers: int, replace: bool):
+    # Each worker reads only its own slice of the file (row groups or a feature range); the
+    # merge below puts the rows in spatial order, so the slices need not be spatial
+    ranges = partition_ranges(source_units(source), workers)
+    if len(ranges) < workers:
+        print(f"   ℹ️  {source} has only {len(ranges)} independently readable parts; using {len(ranges)} workers")
+    workers = max(1, len(ranges))
+    print(f"\n📤 Loading {source} into '{TABLE_NAME}' with {workers} workers...")
+    start = time.time()
+    tasks = [(part, units, source, fclasses, chunk_size) for part, units in enumerate(ranges)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_load_partition, tasks))
+    staged = sum(r["copied"] for r in results)
+    skipped = sum(r["skipped"] for r in results)
+    print(f"   📦 Staged {staged:,} rows in {time.time() - start:.1f}s")
+    if skipped:
+        print(f"   ⚠️  Skipped {skipped:,} rows without a single LINESTRING geometry")
+
+    # Merge in spatial order, so roads that are close on the map are close on disk and
+    # KNN / bbox queries touch few pages; one transaction, so readers never see a half-loaded table.
+    # Without --replace the rows are appended and roads whose osm_id is already loaded are kept
+    merge_start = time.time()
+    parts = " UNION ALL ".join(f"SELECT * FROM {PART_TABLE.format(part)}" for part in range(workers))
+    columns = ", ".join(ROAD_COLUMNS + ["geom", "row_hash"])
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if replace:
+            # Empty table: build the index once after the insert instead of row by row
+            cursor.execute(f"TRUNCATE {TABLE_NAME}")
+            cursor.execute("DROP INDEX IF EXISTS idx_roads_geom")
+            cursor.execute(f"DROP INDEX IF EXISTS {TABLE_NAME}_geom_idx")
+        cursor.execute(f"""
+            INSERT INTO {TABLE_NAME} ({columns})
+            SELECT {columns} FROM ({parts}) staged
+            ORDER BY ST_GeoHash(ST_Centroid(geom), {GEOHASH_PRECISION})
+            ON CONFLICT DO NOTHING
+        """)
+        merged = cursor.rowcount
+        print(f"   🧭 Merged {merged:,} rows in geohash order ({time.time() - merge_start:.1f}s)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_roads_geom ON {TABLE_NAME} USING GIST (geom)")
+        # The rows are already in spatial order; marking the index lets a later plain
+        # `CLUSTER roads` (e.g. after many syncs) restore that order without a full reload
+        cursor.execute(f"ALTER TABLE {TABLE_NAME} CLUSTER ON idx_roads_geom")
+        for part in range(workers):
+            cursor.execute(f"DROP TABLE IF EXISTS {PART_TABLE.format(part)}")
+        raw.commit()
+        cursor.execute(f"ANALYZE {TABLE_NAME}")
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    if merged < staged:
+        where = "repeated in the source" if replace else "already loaded or repeated in the source"
+        print(f"   ⚠️  {staged - merged:,} rows had an osm_id {where} and were skipped")
+    print(f"✅ Loaded {merged:,} records to table '{TABLE_NAME}' in {time.time() - start:.1f}s")
+
 
 # -------------------------------
-# 4) Ensure consistent schema before upload
+# 8) Verify upload + create indexes
 # -------------------------------
-TABLE_NAME = "roads"
-print(f"\n📋 Ensuring consistent schema for table '{TABLE_NAME}'...")
-
-with engine.begin() as conn:
-    # Check if table exists
-    table_exists = conn.execute(text("""
-        SELECT EXISTS (
-            SELECT FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_name = :table_name
-        );
-    """), {"table_name": TABLE_NAME}).scalar()
+def finalize(engine):
+    with engine.begin() as conn:
+        # Count rows
+        count = conn.execute(text(f"SELECT COUNT(*) FROM {TABLE_NAME};")).scalar()
+        print(f"🧮 Verified: {count} rows now in '{TABLE_NAME}'.")
+
+        # Check geometry type distribution
+        geom_types = conn.execute(text(
+            f"SELECT ST_GeometryType(geom), COUNT(*) FROM {TABLE_NAME} GROUP BY 1;"
+        )).fetchall()
+        print("📐 Geometry types:")
+        for gt, c in geom_types:
+            print(f"  - {gt}: {c}")
+
+        # Clean up any duplicate indexes
+        print("\n🔍 Cleaning up indexes...")
+        conn.execute(text(f"DROP INDEX IF EXISTS {TABLE_NAME}_geom_idx;"))
     
-    if not table_exists:
-        print("   Creating table with consistent schema...")
-        # Create table with exact schema to ensure consistency
-        conn.execute(text("""
-            CREATE TABLE roads (
-                osm_id   TEXT,
-                code     INTEGER,
-                fclass   TEXT,
-                name     TEXT,
-                ref      TEXT,
-                oneway   TEXT,
-                maxspeed INTEGER,
-                layer    BIGINT,
-                bridge   TEXT,
-                tunnel   TEXT,
-                geom     GEOMETRY(LINESTRING, 4326)
-            );
-        """))
-        print("   ✅ Table created with consistent schema")
-    else:
-        print("   ✅ Table already exists")
+        # Create single spatial index with consistent name
+        print("   Creating spatial index...")
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_roads_geom ON {TABLE_NAME} USING GIST (geom);"))
+        print("   ✅ Spatial index created")
+
+        # Fresh planner statistics for the new rows
+        conn.execute(text(f"ANALYZE {TABLE_NAME};"))
+
+        # Grab a few sample rows back from DB
+        sample = conn.execute(text(
+            f"SELECT osm_id, name, fclass FROM {TABLE_NAME} LIMIT 5;"
+        )).fetchall()
+
+    print("\n🔎 DB sample (first 5 rows):")
+    for row in sample:
+        print(row)
 
-# -------------------------------
-# 5) Upload to PostGIS (chunked)
-# -------------------------------
-print(f"\n📤 Uploading data to '{TABLE_NAME}'...")
-gdf.to_postgis(
-    name=TABLE_NAME,
-    con=engine,
-    if_exists="append",       # Use 'append' since table is pre-created, or 'replace' to overwrite
-    index=False,              # We'll create index manually to avoid duplicates
-    chunksize=50000           # tune if needed
-)
-print(f"✅ Uploaded {len(gdf)} records to table '{TABLE_NAME}' in {DB_TYPE}.")
 
 # -------------------------------
-# 6) Verify upload + create indexes
+# 9) Entry point
 # -------------------------------
-with engine.begin() as conn:
-    # Count rows
-    count = conn.execute(text(f"SELECT COUNT(*) FROM {TABLE_NAME};")).scalar()
-    print(f"🧮 Verified: {count} rows now in '{TABLE_NAME}'.")
-
-    # Check geometry type distribution
-    geom_types = conn.execute(text(
-        f"SELECT ST_GeometryType(geom), COUNT(*) FROM {TABLE_NAME} GROUP BY 1;"
-    )).fetchall()
-    print("📐 Geometry types:")
-    for gt, c in geom_types:
-        print(f"  - {gt}: {c}")
-
-    # Clean up any duplicate indexes
-    print("\n🔍 Cleaning up indexes...")
-    conn.execute(text(f"DROP INDEX IF EXISTS {TABLE_NAME}_geom_idx;"))
-    
-    # Create single spatial index with consistent name
-    print("   Creating spatial index...")
-    conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_roads_geom ON {TABLE_NAME} USING GIST (geom);"))
-    print("   ✅ Spatial index created")
-
-    # Grab a few sample rows back from DB
-    sample = conn.execute(text(
-        f"SELECT osm_id, name, fclass FROM {TABLE_NAME} LIMIT 5;"
-    )).fetchall()
-
-print("\n🔎 DB sample (first 5 rows):")
-for row in sample:
-    print(row)
+def main():
+    parser = argparse.ArgumentParser(description="Load OSM roads into PostGIS")
+    parser.add_argument("--mode", choices=["copy", "parallel", "sync", "insert"], default="copy",
+                        help="copy: stream batches through COPY (default); parallel: full reload split by "
+                             "source range across processes; sync: apply only changes by osm_id; "
+                             "insert: whole file via to_postgis")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Roads shapefile or edges GeoParquet")
+    parser.add_argument("--chunk-size", type=int, default=int(os.getenv("LOAD_CHUNK_SIZE", "100000")),
+                        help="Rows per streamed batch (bounds memory in copy mode)")
+    parser.add_argument("--fclass", default=",".join(DRIVABLE_CLASSES),
+                        help='Comma-separated road classes to keep ("" keeps all)')
+    parser.add_argument("--replace", action="store_true", help="Empty the table before loading")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("LOAD_WORKERS", str(min(8, os.cpu_count() or 1)))),
+                        help="Worker processes (parallel)")
+    parser.add_argument("--sync-batch", type=int, default=SYNC_BATCH_SIZE, help="Changed roads per transaction (sync)")
+    parser.add_argument("--changes-out", default=os.getenv("ROAD_CHANGES_FILE", "serving/road_changes.json"),
+                        help="Where sync writes the changed road cells")
+    parser.add_argument("--max-delete-share", type=float, default=0.2,
+                        help="Abort a sync that would delete more than this share of the table "
+                             "(by removed roads, or by duplicate osm_ids when first keying the table)")
+    args = parser.parse_args()
+
+    fclasses = [c for c in args.fclass.split(",") if c]
+    engine = connect_engine()
+    ensure_schema(engine)
+    if args.mode == "copy":
+        load_copy(engine, args.source, fclasses, args.chunk_size, args.replace)
+    elif args.mode == "parallel":
+        load_parallel(engine, args.source, fclasses, args.chunk_size, args.workers, args.replace)
+    elif args.mode == "sync":
+        load_sync(engine, args.source, fclasses, args.chunk_size, args.sync_batch, args.changes_out,
+                  args.max_delete_share)
+        return
+    else:
+        if args.replace:
+            with engine.begin() as conn:
+                conn.execute(text(f"TRUNCATE {TABLE_NAME};"))
+        load_insert(engine, args.source, fclasses)
+    finalize(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+HMM (Viterbi) map matching of route polylines against the in-memory RoadIndex.
+
+Matching each sampled point to its nearest road on its own picks frontage
+roads and overpasses at interchanges. Here the whole decoded polyline is
+matched in one pass instead:
+
+- observations are polyline vertices at least MIN_STEP_M apart;
+- candidates are the nearest piece of each road within SEARCH_RADIUS_M
+  (FALLBACK_RADIUS_M if there are none);
+- emission scores penalize distance from the road and heading mismatch;
+- transition scores penalize the difference between the straight-line step
+  and the step between projected points, plus a penalty for switching roads
+  (small for connected roads, large otherwise), so the matched road only
+  changes where the route really turns.
+
+The result is a list of runs (road, start vertex, end vertex), so callers can
+look up attributes once per matched road rather than once per sample.
+"""
+
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import sampling
+from road_index import RoadIndex
+
+SIGMA_M = 20.0
+BETA_M = 50.0
+SEARCH_RADIUS_M = 60.0
+FALLBACK_RADIUS_M = 200.0
+MAX_CANDIDATES = 6
+MIN_STEP_M = 25.0
+HEADING_WEIGHT = 3.0
+CONNECTED_SWITCH_PENALTY = 2.0
+DISCONNECTED_SWITCH_PENALTY = 8.0
+
+UNMATCHED = -1
+
+
+class MatchedRun(NamedTuple):
+    road: int  # RoadIndex road number, or UNMATCHED
+    start: int  # first polyline vertex index (inclusive)
+    end: int  # last polyline vertex index (inclusive)
+
+
+def observation_indices(cum_dist: np.ndarray) -> np.ndarray:
+    """First vertex of every MIN_STEP_M stretch of the route, plus the last vertex."""
+    _, first = np.unique(np.floor(cum_dist / MIN_STEP_M), return_index=True)
+    if first[-1] != len(cum_dist) - 1:
+        first = np.append(first, len(cum_dist) - 1)
+    return first
+
+
+def _headings(points: np.ndarray) -> np.ndarray:
+    """Travel direction (radians, local x/y) at each point from its neighbours."""
+    prev = np.vstack([points[:1], points[:-1]])
+    nxt = np.vstack([points[1:], points[-1:]])
+    dy = nxt[:, 0] - prev[:, 0]
+    dx = (nxt[:, 1] - prev[:, 1]) * np.cos(np.radians(points[:, 0]))
+    return np.arctan2(dy, dx)
+
+
+def _local_distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise metres between (A, 2) and (B, 2) lat/lon arrays (equirectangular)."""
+    kx = 111320.0 * math.cos(math.radians(float(a[0, 0])))
+    dy = (a[:, None, 0] - b[None, :, 0]) * 111320.0
+    dx = (a[:, None, 1] - b[None, :, 1]) * kx
+    return np.hypot(dx, dy)
+
+
+def match_route(index: RoadIndex, points: np.ndarray, cum_dist: Optional[np.ndarray] = None) -> List[MatchedRun]:
+    """Match an (N, 2) lat/lon polyline to runs of roads in `index` (cum_dist: precomputed, if available)."""
+    n = len(points)
+    if n == 0:
+        return []
+    if cum_dist is None:
+        cum_dist = sampling.cumulative_distances(points)
+    obs = observation_indices(cum_dist)
+    obs_points = points[obs]
+    headings = _headings(obs_points)
+
+    connected_cache: Dict[Tuple[int, int], bool] = {}
+
+    def switch_penalty(prev_roads: np.ndarray, roads: np.ndarray) -> np.ndarray:
+        penalty = np.zeros((len(prev_roads), len(roads)))
+        for i, a in enumerate(prev_roads.tolist()):
+            for j, b in enumerate(roads.tolist()):
+                if a == b:
+                    continue
+                key = (a, b)
+                if key not in connected_cache:
+                    connected_cache[key] = index.connected(a, b)
+                penalty[i, j] = CONNECTED_SWITCH_PENALTY if connected_cache[key] else DISCONNECTED_SWITCH_PENALTY
+        return penalty
+
+    matched = np.full(len(obs), UNMATCHED, dtype=np.int64)
+    # Viterbi state for the current unbroken chain of observations
+    chain_start = 0
+    chain_roads: List[np.ndarray] = []
+    chain_back: List[np.ndarray] = []
+    prev_roads = prev_proj = prev_score = None
+
+    def backtrack():
+        if not chain_roads:
+            return
+        state = int(np.argmax(prev_score))
+        for t in range(len(chain_roads) - 1, -1, -1):
+            matched[chain_start + t] = chain_roads[t][state]
+            state = int(chain_back[t][state])
+
+    for t, (lat, lon) in enumerate(obs_points.tolist()):
+        roads, segs, dist, proj = index.candidates(lat, lon, SEARCH_RADIUS_M, MAX_CANDIDATES)
+        if len(roads) == 0:
+            roads, segs, dist, proj = index.candidates(lat, lon, FALLBACK_RADIUS_M, MAX_CANDIDATES)
+        if len(roads) == 0:
+            # HMM break: finish the current chain and start a new one after this point
+            backtrack()
+            chain_start, chain_roads, chain_back = t + 1, [], []
+            prev_roads = prev_proj = prev_score = None
+            continue
+
+        seg_vec = index.seg_b[segs].astype(np.float64) - index.seg_a[segs].astype(np.float64)
+        seg_heading = np.arctan2(seg_vec[:, 0], seg_vec[:, 1] * math.cos(math.radians(lat)))
+        heading_cost = HEADING_WEIGHT * (1 - np.abs(np.cos(seg_heading - headings[t])))
+        emission = -0.5 * (dist / SIGMA_M) ** 2 - heading_cost
+
+        if prev_roads is None:
+            score = emission
+            back = np.zeros(len(roads), dtype=np.int64)
+        else:
+            step = float(cum_dist[obs[t]] - cum_dist[obs[t - 1]])
+            projected_step = _local_distance(prev_proj, proj)
+            transition = -np.abs(projected_step - step) / BETA_M - switch_penalty(prev_roads, roads)
+            total = prev_score[:, None] + transition
+            back = np.argmax(total, axis=0)
+            score = total[back, np.arange(len(roads))] + emission
+        score = score - score.max()  # keep scores bounded
+
+        chain_roads.append(roads)
+        chain_back.append(back)
+        prev_roads, prev_proj, prev_score = roads, proj, score
+
+    backtrack()
+
+    # Each observation covers the vertices up to the next observation
+    runs: List[MatchedRun] = []
+    bounds = np.append(obs[1:], n).tolist()
+    for road, start, next_start in zip(matched.tolist(), obs.tolist(), bounds):
+        end = max(start, next_start - 1)
+        if runs and runs[-1].road == road:
+            runs[-1] = MatchedRun(road, runs[-1].start, end)
+        else:
+            runs.append(MatchedRun(road, start, end))
+    return runs
+
+
+def roads_at(runs: List[MatchedRun], indices) -> np.ndarray:
+    """Matched road (or UNMATCHED) for each of the given vertex indices."""
+    if not runs:
+        return np.full(len(indices), UNMATCHED, dtype=np.int64)
+    starts = np.asarray([run.start for run in runs])
+    roads = np.asarray([run.road for run in runs])
+    pos = np.searchsorted(starts, np.asarray(indices), side="right") - 1
+    return roads[np.clip(pos, 0, len(runs) - 1)]
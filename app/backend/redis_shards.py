@@ -0,0 +1,203 @@
+"""
+Geo-aware sharding of the Redis cache across several nodes.
+
+ShardedRedis spreads keys over a set of Redis nodes with a consistent-hash
+ring (VNODES points per node), and offers the subset of the redis-py client
+the caches use: mget() and pipeline(transaction=False) with set() and
+execute(), plus delete()/delete_prefix() for cache invalidation after a
+road sync (invalidate_road_cells.py).
+
+Keys are placed by a shard key rather than by the key itself. For the grid
+cell namespaces ("weather:<cell id>", "road_grid:<cell id>") the shard key
+is the cell's parent cell at SHARD_PARENT_KM (grid.parent_cell), so every
+cell in one ~32 km area, of either namespace, lives on the same node: the
+cells a route touches fall on a handful of nodes, and each node's share of
+an mget or pipeline is one round trip (nodes are queried concurrently).
+Other keys are placed by the whole key.
+
+Node loss: a node whose command fails (connection error or timeout) is
+taken off the ring for REDIS_RETRY_S, so its keys move to the next node on
+the ring (only that node's keys move) and the failed reads count as misses;
+it is tried again after that. Adding nodes scales capacity and throughput,
+and moves only ~1/N of the keys.
+
+The parent-cell shard key uses the app's own fixed grid (grid.py); it plays
+the role an H3 parent would, without a new dependency.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import grid
+
+VNODES = 128
+SHARD_PARENT_KM = float(os.getenv("REDIS_SHARD_PARENT_KM", "32"))
+REDIS_TIMEOUT_S = float(os.getenv("REDIS_TIMEOUT_S", "0.25"))
+REDIS_RETRY_S = float(os.getenv("REDIS_RETRY_S", "10"))
+
+# Namespaces whose keys are grid cell ids, with their cell size
+CELL_NAMESPACES = {"weather": grid.WEATHER_CELL_KM, "road_grid": grid.ROAD_CELL_KM}
+
+
+def shard_key(key: str) -> str:
+    """Parent cell for grid cell keys ("cell:<parent id>"), otherwise the key itself."""
+    namespace, _, rest = key.partition(":")
+    cell_km = CELL_NAMESPACES.get(namespace)
+    if cell_km is not None and rest.isdigit():
+        return f"cell:{grid.parent_cell(int(rest), cell_km, SHARD_PARENT_KM)}"
+    return key
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class RedisNode:
+    def __init__(self, url: str, client):
+        self.url = url
+        self.client = client
+        self.down_until = 0.0
+        self.stats = {"commands": 0, "errors": 0, "marked_down": 0}
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self, error: Exception):
+        if self.available():
+            self.stats["marked_down"] += 1
+            print(f"Warning: Redis node {self.url} unavailable for {REDIS_RETRY_S:.0f}s: {error}")
+        self.down_until = time.monotonic() + REDIS_RETRY_S
+
+
+class ShardedRedis:
+    """Consistent-hash sharded Redis client (mget and non-transactional pipelines)."""
+
+    def __init__(self, urls: Sequence[str], timeout_s: float = REDIS_TIMEOUT_S):
+        import redis.asyncio as redis
+        self._errors = (redis.ConnectionError, redis.TimeoutError, OSError, asyncio.TimeoutError)
+        self.nodes = [RedisNode(url, redis.from_url(url, decode_responses=True, socket_timeout=timeout_s,
+                                                    socket_connect_timeout=timeout_s))
+                      for url in urls]
+        ring = sorted((_hash(f"{node.url}#{i}"), n) for n, node in enumerate(self.nodes) for i in range(VNODES))
+        self._ring_hashes = [h for h, _ in ring]
+        self._ring_nodes = [n for _, n in ring]
+
+    def node_for(self, key: str) -> Optional[RedisNode]:
+        """First available node clockwise from the key's shard key (None if every node is down)."""
+        start = bisect.bisect(self._ring_hashes, _hash(shard_key(key)))
+        seen = set()
+        for i in range(len(self._ring_nodes)):
+            n = self._ring_nodes[(start + i) % len(self._ring_nodes)]
+            if n in seen:
+                continue
+            if self.nodes[n].available():
+                return self.nodes[n]
+            seen.add(n)
+            if len(seen) == len(self.nodes):
+                break
+        return None
+
+    def _group(self, keys: Sequence[str]) -> Dict[RedisNode, List[int]]:
+        groups: Dict[RedisNode, List[int]] = {}
+        for i, key in enumerate(keys):
+            node = self.node_for(key)
+            if node is not None:
+                groups.setdefault(node, []).append(i)
+        return groups
+
+    async def _run(self, node: RedisNode, command, fallback):
+        node.stats["commands"] += 1
+        try:
+            return await command
+        except self._errors as e:
+            node.stats["errors"] += 1
+            node.mark_down(e)
+            return fallback
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[str]]:
+        """Values in key order (None for misses and for keys on failed nodes); one MGET per node."""
+        keys = list(keys)
+        values: List[Optional[str]] = [None] * len(keys)
+        groups = self._group(keys)
+        results = await asyncio.gather(*(
+            self._run(node, node.client.mget([keys[i] for i in indices]), [None] * len(indices))
+            for node, indices in groups.items()
+        ))
+        for indices, node_values in zip(groups.values(), results):
+            for i, value in zip(indices, node_values):
+                values[i] = value
+        return values
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await self.mget([key]))[0]
+
+    async def delete(self, keys: Sequence[str]) -> Optional[int]:
+        """Delete keys (one DEL per node); returns how many existed, or None if a node could not be reached."""
+        keys = list(keys)
+        groups = self._group(keys)
+        if sum(len(indices) for indices in groups.values()) < len(keys):
+            return None
+        results = await asyncio.gather(*(
+            self._run(node, node.client.delete(*[keys[i] for i in indices]), None)
+            for node, indices in groups.items()
+        ))
+        return None if None in results else sum(results)
+
+    async def delete_prefix(self, prefix: str, batch: int = 1000) -> Optional[int]:
+        """Delete every key starting with prefix on every node; returns how many, or None if a node failed."""
+        deleted = 0
+        for node in self.nodes:
+            try:
+                names = []
+                async for name in node.client.scan_iter(match=f"{prefix}*", count=batch):
+                    names.append(name)
+                    if len(names) >= batch:
+                        deleted += await node.client.delete(*names)
+                        names = []
+                if names:
+                    deleted += await node.client.delete(*names)
+            except self._errors as e:
+                node.mark_down(e)
+                return None
+        return deleted
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False):
+        yield ShardedPipeline(self)
+
+    def metrics(self) -> Dict:
+        return {node.url: {"available": node.available(), **node.stats} for node in self.nodes}
+
+    async def close(self):
+        for node in self.nodes:
+            await node.client.aclose()
+
+
+class ShardedPipeline:
+    """Buffers SET commands and runs one pipeline per node on execute()."""
+
+    def __init__(self, sharded: ShardedRedis):
+        self.sharded = sharded
+        self._commands: List[Tuple[str, str, Optional[int]]] = []
+
+    def set(self, key: str, value: str, ex: Optional[int] = None):
+        self._commands.append((key, value, ex))
+        return self
+
+    async def execute(self):
+        groups = self.sharded._group([key for key, _, _ in self._commands])
+
+        async def run(node: RedisNode, indices: List[int]):
+            async with node.client.pipeline(transaction=False) as pipe:
+                for i in indices:
+                    key, value, ex = self._commands[i]
+                    pipe.set(key, value, ex=ex)
+                return await pipe.execute()
+
+        await asyncio.gather(*(self.sharded._run(node, run(node, indices), None) for node, indices in groups.items()))
+        self._commands = []
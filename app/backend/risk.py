@@ -0,0 +1,237 @@
+"""
+Vectorized crash-risk scoring for departure-time sweeps.
+
+A sweep scores one route for many departure slots. Everything that does not
+depend on the clock (road class, speed limit, lanes, traffic, geometry) is
+computed once per sampled point; the time-dependent features (month, day of
+week, time of day, light, weather at the point's ETA) are built as
+(slots x points) arrays. The full (slots * points, features) matrix is then
+scored with a single predict_proba call.
+
+Features follow the column order of the trained models in models/ (TxDOT
+crash attributes, binary-encoded categoricals, engineered road features).
+Values the backend has no live source for (crash history, roadbed
+details) are filled with neutral defaults per road class.
+
+The model is loaded from RISK_MODEL_PATH (a pickled sklearn classifier; the
+scikit-learn pinned in requirements.txt is the version that trained it). It
+must carry feature_names_in_ matching FEATURE_NAMES. If it is missing, cannot
+be unpickled or fails that check, there is no model: get_model() returns
+None, model_error() says why, /routes/sweep answers 503 and /health/ready
+reports the risk_model component as degraded.
+"""
+
+import math
+import os
+import pickle
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+LOCAL_TZ = ZoneInfo("America/Chicago")
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "models",
+                                  "gradient_boosting", "gradient_boosting_model.pkl")
+RISK_MODEL_PATH = os.getenv("RISK_MODEL_PATH", DEFAULT_MODEL_PATH)
+HIGH_RISK_THRESHOLD = float(os.getenv("HIGH_RISK_THRESHOLD", "0.5"))
+
+FEATURE_NAMES = [
+    "Adjusted Average Daily Traffic Amount", "At Intersection Flag", "Construction Zone Flag", "Crash Month",
+    "Day of Week_0", "Day of Week_1", "Day of Week_2",
+    "Light Condition_0", "Light Condition_1", "Light Condition_2",
+    "Percentage of Single Unit Truck Average Daily Traffic",
+    "Road Class_0", "Road Class_1", "Road Class_2",
+    "Rural Flag", "Speed Limit",
+    "Weather Condition_0", "Weather Condition_1", "Weather Condition_2", "Weather Condition_3",
+    "road_curvature", "bearing", "lane_count", "AADT_log", "dist_to_road", "dist_to_intersection",
+    "road_density_1km",
+    "time_bin_0_3", "time_bin_4_7", "time_bin_8_11", "time_bin_12_15", "time_bin_16_19", "time_bin_20_23",
+    "crash_count_7d", "crash_count_30d", "cell_id",
+]
+_COL = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# OSM class -> (TxDOT Road_Cls_ID, default speed mph, lanes, AADT, % single unit trucks)
+ROAD_CLASS_DEFAULTS: Dict[str, tuple] = {
+    "motorway": (1, 70, 3, 90000, 6.0),
+    "motorway_link": (1, 45, 1, 15000, 6.0),
+    "trunk": (2, 65, 2, 40000, 5.0),
+    "trunk_link": (2, 45, 1, 10000, 5.0),
+    "primary": (2, 55, 2, 25000, 4.0),
+    "primary_link": (2, 40, 1, 8000, 4.0),
+    "secondary": (3, 50, 2, 10000, 3.5),
+    "secondary_link": (3, 35, 1, 4000, 3.5),
+    "tertiary": (4, 45, 2, 5000, 3.0),
+    "tertiary_link": (4, 30, 1, 2000, 3.0),
+    "residential": (5, 30, 1, 1500, 1.5),
+    "living_street": (5, 20, 1, 500, 1.0),
+    "unclassified": (7, 35, 1, 1500, 2.0),
+    "service": (7, 20, 1, 500, 1.0),
+}
+UNKNOWN_ROAD = (7, 35, 1, 2000, 2.0)
+DEFAULT_DIST_TO_INTERSECTION_M = 300.0
+DEFAULT_ROAD_DENSITY_1KM = 10.0
+
+
+# -------------------------------
+# Model loading
+# -------------------------------
+_model = None
+_model_error: Optional[str] = None
+
+
+def get_model():
+    """Trained model from RISK_MODEL_PATH, or None if it could not be loaded (tried once)."""
+    global _model, _model_error
+    if _model is None and _model_error is None:
+        try:
+            with open(RISK_MODEL_PATH, "rb") as f:
+                model = pickle.load(f)
+            # Scoring builds columns by position, so the order must be verifiable, not assumed
+            expected = getattr(model, "feature_names_in_", None)
+            if expected is None:
+                raise ValueError("model has no feature_names_in_, so its feature order cannot be checked")
+            if list(expected) != FEATURE_NAMES:
+                raise ValueError(f"model expects features {list(expected)}")
+            model.name = os.path.basename(RISK_MODEL_PATH)
+            _model = model
+            print(f"Risk model loaded from {RISK_MODEL_PATH}")
+        except Exception as e:
+            _model_error = f"{type(e).__name__}: {e}"
+            print(f"Warning: Could not load risk model from {RISK_MODEL_PATH} ({_model_error}); "
+                  f"departure sweeps are unavailable")
+    return _model
+
+
+def model_error() -> Optional[str]:
+    """Why the model could not be loaded (None when it loaded or was not tried yet)."""
+    return _model_error
+
+
+# -------------------------------
+# Encodings
+# -------------------------------
+def binary_bits(codes: np.ndarray, n_bits: int) -> np.ndarray:
+    """Binary encoding of integer codes, most significant bit first -> (..., n_bits)."""
+    codes = np.asarray(codes, dtype=np.int64)
+    shifts = np.arange(n_bits - 1, -1, -1)
+    return (codes[..., None] >> shifts) & 1
+
+
+def weather_condition_ids(weathercodes: np.ndarray) -> np.ndarray:
+    """WMO weather codes -> TxDOT Wthr_Cond_ID (1 clear, 2 cloudy, 3 rain, 4 sleet/hail, 5 snow, 6 fog)."""
+    wmo = np.nan_to_num(weathercodes, nan=0).astype(np.int64)
+    ids = np.ones(wmo.shape, dtype=np.int64)
+    ids[(wmo >= 2) & (wmo <= 3)] = 2
+    ids[(wmo >= 45) & (wmo <= 48)] = 6
+    ids[((wmo >= 51) & (wmo <= 67)) | ((wmo >= 80) & (wmo <= 82)) | (wmo == 95)] = 3
+    ids[(wmo == 56) | (wmo == 57) | (wmo == 66) | (wmo == 67) | (wmo == 96) | (wmo == 99)] = 4
+    ids[((wmo >= 71) & (wmo <= 77)) | (wmo == 85) | (wmo == 86)] = 5
+    return ids
+
+
+def light_condition_ids(hours: np.ndarray) -> np.ndarray:
+    """Local hour -> TxDOT Light_Cond_ID (1 daylight, 3 dark lighted, 5 dawn, 6 dusk)."""
+    ids = np.full(hours.shape, 3, dtype=np.int64)
+    ids[(hours >= 7) & (hours < 19)] = 1
+    ids[hours == 6] = 5
+    ids[hours == 19] = 6
+    return ids
+
+
+def route_geometry(points: np.ndarray, sampled_indices: Sequence[int]) -> Dict[str, np.ndarray]:
+    """Bearing (degrees) and curvature (radians turned per 100 m) at each sampled vertex."""
+    idx = np.asarray(sampled_indices, dtype=np.int64)
+    prev = points[np.maximum(idx - 1, 0)]
+    nxt = points[np.minimum(idx + 1, len(points) - 1)]
+    coslat = np.cos(np.radians(points[idx, 0]))
+    dy = nxt[:, 0] - prev[:, 0]
+    dx = (nxt[:, 1] - prev[:, 1]) * coslat
+    bearing = (np.degrees(np.arctan2(dx, dy)) + 360) % 360
+
+    here = points[idx]
+    in_y, in_x = here[:, 0] - prev[:, 0], (here[:, 1] - prev[:, 1]) * coslat
+    out_y, out_x = nxt[:, 0] - here[:, 0], (nxt[:, 1] - here[:, 1]) * coslat
+    turn = np.abs(np.angle(np.exp(1j * (np.arctan2(out_x, out_y) - np.arctan2(in_x, in_y)))))
+    length_m = (np.hypot(in_x, in_y) + np.hypot(out_x, out_y)) * 111320.0
+    curvature = np.where(length_m > 1, turn / np.maximum(length_m, 1) * 100, 0.0)
+    return {"bearing": bearing, "curvature": curvature}
+
+
+# -------------------------------
+# Feature matrix and scoring
+# -------------------------------
+def static_features(roads: List[Optional[Dict]], geometry: Dict[str, np.ndarray]) -> np.ndarray:
+    """(points, features) matrix with the clock-independent columns filled in."""
+    n = len(roads)
+    X = np.zeros((n, len(FEATURE_NAMES)))
+    road_cls = np.empty(n, dtype=np.int64)
+    for i, road in enumerate(roads):
+        fclass = (road or {}).get("fclass")
+        cls_id, speed, lanes, aadt, trucks = ROAD_CLASS_DEFAULTS.get(fclass, UNKNOWN_ROAD)
+        maxspeed = (road or {}).get("maxspeed")
+        if maxspeed:
+            speed = round(float(maxspeed) / 1.609 / 5) * 5  # OSM km/h -> posted mph
+        road_cls[i] = cls_id
+        X[i, _COL["Speed Limit"]] = speed
+        X[i, _COL["lane_count"]] = lanes
+        X[i, _COL["Adjusted Average Daily Traffic Amount"]] = aadt
+        X[i, _COL["AADT_log"]] = math.log1p(aadt)
+        X[i, _COL["Percentage of Single Unit Truck Average Daily Traffic"]] = trucks
+    X[:, [_COL["Road Class_0"], _COL["Road Class_1"], _COL["Road Class_2"]]] = binary_bits(road_cls, 3)
+    X[:, _COL["bearing"]] = geometry["bearing"]
+    X[:, _COL["road_curvature"]] = geometry["curvature"]
+    X[:, _COL["dist_to_intersection"]] = DEFAULT_DIST_TO_INTERSECTION_M
+    X[:, _COL["road_density_1km"]] = DEFAULT_ROAD_DENSITY_1KM
+    return X
+
+
+def sweep_matrix(static: np.ndarray, eta: np.ndarray, weathercodes: np.ndarray) -> np.ndarray:
+    """
+    (slots, points, features) matrix from the static features and the
+    (slots, points) arrival times (unix s) and weather codes at those times.
+    """
+    slots = eta.shape[0]
+    X = np.repeat(static[None, :, :], slots, axis=0)
+
+    # Local clock per slot: the UTC offset of each slot's departure is used for the whole trip
+    offsets = np.array([datetime.fromtimestamp(t, LOCAL_TZ).utcoffset().total_seconds() for t in eta[:, 0]])
+    local = eta + offsets[:, None]
+    hours = (local // 3600 % 24).astype(np.int64)
+    days = (local // 86400).astype(np.int64)
+    weekday = (days + 3) % 7  # 1970-01-01 was a Thursday; 0 = Monday
+    months = np.array([datetime.fromtimestamp(t, timezone.utc).month for t in local[:, 0]])
+
+    X[:, :, _COL["Crash Month"]] = months[:, None]
+    X[:, :, [_COL["Day of Week_0"], _COL["Day of Week_1"], _COL["Day of Week_2"]]] = binary_bits(weekday + 1, 3)
+    X[:, :, [_COL["Light Condition_0"], _COL["Light Condition_1"], _COL["Light Condition_2"]]] = \
+        binary_bits(light_condition_ids(hours), 3)
+    X[:, :, [_COL["Weather Condition_0"], _COL["Weather Condition_1"], _COL["Weather Condition_2"],
+             _COL["Weather Condition_3"]]] = binary_bits(weather_condition_ids(weathercodes), 4)
+    time_bins = [_COL[f"time_bin_{h}_{h + 3}"] for h in range(0, 24, 4)]
+    X[:, :, time_bins] = np.eye(6)[hours // 4]
+    return X
+
+
+def score_sweep(X: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Score a (slots, points, features) matrix in one model call.
+    weights are each point's share of the route length.
+    Returns per-slot mean (length-weighted), max and high-risk share, plus the (slots, points) risk.
+    """
+    slots, points, n_features = X.shape
+    model = get_model()
+    if model is None:
+        raise RuntimeError(f"risk model unavailable ({model_error()})")
+    risk = model.predict_proba(X.reshape(slots * points, n_features))[:, 1].reshape(slots, points)
+    return {
+        "risk": risk,
+        "mean": risk @ weights,
+        "max": risk.max(axis=1),
+        "high_share": (risk >= HIGH_RISK_THRESHOLD) @ weights,
+    }
+
+
+def model_name() -> Optional[str]:
+    model = get_model()
+    return None if model is None else getattr(model, "name", type(model).__name__)
@@ -0,0 +1,447 @@
+"""
+In-memory index of the drivable road network.
+
+Roads are split into straight segments (long segments are subdivided so no
+piece is longer than MAX_PIECE_M) and bucketed by the road grid cell of their
+midpoint. A radius query then only has to scan the 3x3 block of cells around
+a point, which is exact for radii up to SEARCH_RADIUS_LIMIT_M.
+
+Everything is stored in flat NumPy arrays (strings in a single UTF-8 blob),
+so the index is cheap to build once and keep for the lifetime of the app.
+save() writes the arrays as .npy files; load() memory-maps them read-only, so
+several workers attached to the same directory share one copy in the page
+cache instead of each holding its own (see build_serving_data.py).
+
+Sources:
+- the PostGIS `roads` table (load_from_db)
+- an OSMnx-style edges GeoParquet such as data/raw/texas_edges.parquet
+  (load_from_parquet)
+"""
+
+import json
+import math
+import os
+import struct
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import grid
+
+BUCKET_KM = grid.ROAD_CELL_KM
+MAX_PIECE_M = 300.0
+# A point in the middle cell is at least one cell width away from the edge of
+# the 3x3 block (cells narrow to ~90% of nominal width in north Texas), and a
+# piece's midpoint is at most MAX_PIECE_M / 2 from any of its points
+SEARCH_RADIUS_LIMIT_M = BUCKET_KM * 1000 * 0.9 - MAX_PIECE_M / 2
+
+# OSM shapefile oneway codes: both directions, forward along the line, backward
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+ONEWAY_CODES = ["B", "F", "T"]
+
+# Road classes in the order of their int8 codes; unknown classes map to the last entry
+FCLASSES = [
+    "motorway", "motorway_link", "trunk", "trunk_link", "primary", "primary_link",
+    "secondary", "secondary_link", "tertiary", "tertiary_link", "residential",
+    "living_street", "unclassified", "service", "track", "path", "footway", "cycleway", "unknown",
+]
+_FCLASS_CODE = {name: code for code, name in enumerate(FCLASSES)}
+
+
+class StringTable:
+    """A list of optional strings stored as one UTF-8 blob plus offsets."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, values: Iterable[Optional[str]]) -> "StringTable":
+        encoded = [(v or "").encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(blob, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get(self, i: int) -> Optional[str]:
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.blob[start:end].tobytes().decode("utf-8") if end > start else None
+
+
+class RoadIndex:
+    """
+    Flat-array road network index.
+
+    Per road (R): osm_id (int64), fclass (int8 code into FCLASSES), maxspeed
+    (int16), oneway (int8 code into ONEWAY_CODES), bridge/tunnel (bool),
+    start/end node keys (int64), and name/ref string tables.
+    Per segment piece (S, sorted by bucket): endpoints a/b (float32 lat/lon)
+    and road (int32). Buckets: sorted unique cell ids plus start offsets.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.osm_id = arrays["osm_id"]
+        self.fclass = arrays["fclass"]
+        self.maxspeed = arrays["maxspeed"]
+        self.oneway = arrays["oneway"]
+        self.bridge = arrays["bridge"]
+        self.tunnel = arrays["tunnel"]
+        self.start_node = arrays["start_node"]
+        self.end_node = arrays["end_node"]
+        self.names = StringTable(arrays["name_blob"], arrays["name_offsets"])
+        self.refs = StringTable(arrays["ref_blob"], arrays["ref_offsets"])
+        self.seg_a = arrays["seg_a"]
+        self.seg_b = arrays["seg_b"]
+        self.seg_road = arrays["seg_road"]
+        self.bucket_cells = arrays["bucket_cells"]
+        self.bucket_start = arrays["bucket_start"]
+
+    @property
+    def road_count(self) -> int:
+        return len(self.osm_id)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self.seg_road)
+
+    # -------------------------------
+    # Persistence (shared read-only serving data)
+    # -------------------------------
+    def save(self, directory: str, source: str = ""):
+        """Write every array to <directory>/<name>.npy plus a manifest.json, atomically per file."""
+        os.makedirs(directory, exist_ok=True)
+        for name, array in self.arrays.items():
+            path = os.path.join(directory, f"{name}.npy")
+            np.save(path + ".tmp.npy", np.ascontiguousarray(array))
+            os.replace(path + ".tmp.npy", path)
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "arrays": sorted(self.arrays),
+            "roads": self.road_count,
+            "segments": self.segment_count,
+            "bucket_km": BUCKET_KM,
+            "source": source,
+            "built_at": int(time.time()),
+        }
+        with open(os.path.join(directory, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "RoadIndex":
+        """Attach to arrays written by save(); with mmap the pages are shared between processes."""
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION or manifest.get("bucket_km") != BUCKET_KM:
+            raise ValueError(f"{directory} was built with an incompatible road index format; rebuild it")
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                  for name in manifest["arrays"]}
+        return cls(arrays)
+
+    @staticmethod
+    def is_saved(directory: str) -> bool:
+        return os.path.isfile(os.path.join(directory, MANIFEST_NAME))
+
+    # -------------------------------
+    # Building
+    # -------------------------------
+    @classmethod
+    def build(cls, records: Iterable[Tuple[Dict, np.ndarray]]) -> "RoadIndex":
+        """
+        Build from (attributes, coords) pairs, where coords is an (K, 2) lat/lon
+        array and attributes uses the `roads` table column names.
+        """
+        osm_ids, fclasses, maxspeeds, oneways, bridges, tunnels = [], [], [], [], [], []
+        names, refs, starts, ends = [], [], [], []
+        seg_a_parts, seg_b_parts, seg_road_parts = [], [], []
+
+        for attrs, coords in records:
+            if coords is None or len(coords) < 2:
+                continue
+            road = len(osm_ids)
+            osm_ids.append(_to_int(attrs.get("osm_id")))
+            fclasses.append(_FCLASS_CODE.get(attrs.get("fclass") or "unknown", len(FCLASSES) - 1))
+            maxspeeds.append(_to_int(attrs.get("maxspeed")))
+            oneways.append(_oneway_code(attrs.get("oneway")))
+            bridges.append(_is_true(attrs.get("bridge")))
+            tunnels.append(_is_true(attrs.get("tunnel")))
+            names.append(attrs.get("name"))
+            refs.append(attrs.get("ref"))
+            starts.append(_node_key(coords[0]))
+            ends.append(_node_key(coords[-1]))
+
+            a, b = _split_segments(np.asarray(coords, dtype=np.float64))
+            seg_a_parts.append(a)
+            seg_b_parts.append(b)
+            seg_road_parts.append(np.full(len(a), road, dtype=np.int32))
+
+        if seg_a_parts:
+            seg_a = np.concatenate(seg_a_parts)
+            seg_b = np.concatenate(seg_b_parts)
+            seg_road = np.concatenate(seg_road_parts)
+        else:
+            seg_a = seg_b = np.zeros((0, 2))
+            seg_road = np.zeros(0, dtype=np.int32)
+
+        # Bucket pieces by the road cell of their midpoint
+        mid = (seg_a + seg_b) / 2
+        cells = grid.cell_ids(mid[:, 0], mid[:, 1], BUCKET_KM)
+        order = np.argsort(cells, kind="stable")
+        cells = cells[order]
+        bucket_cells, bucket_first = np.unique(cells, return_index=True)
+        bucket_start = np.append(bucket_first, len(cells)).astype(np.int64)
+
+        name_table = StringTable.build(names)
+        ref_table = StringTable.build(refs)
+        return cls({
+            "osm_id": np.asarray(osm_ids, dtype=np.int64),
+            "fclass": np.asarray(fclasses, dtype=np.int8),
+            "maxspeed": np.asarray(maxspeeds, dtype=np.int16),
+            "oneway": np.asarray(oneways, dtype=np.int8),
+            "bridge": np.asarray(bridges, dtype=bool),
+            "tunnel": np.asarray(tunnels, dtype=bool),
+            "start_node": np.asarray(starts, dtype=np.int64),
+            "end_node": np.asarray(ends, dtype=np.int64),
+            "name_blob": name_table.blob,
+            "name_offsets": name_table.offsets,
+            "ref_blob": ref_table.blob,
+            "ref_offsets": ref_table.offsets,
+            "seg_a": seg_a[order].astype(np.float32),
+            "seg_b": seg_b[order].astype(np.float32),
+            "seg_road": seg_road[order],
+            "bucket_cells": bucket_cells,
+            "bucket_start": bucket_start,
+        })
+
+    # -------------------------------
+    # Queries
+    # -------------------------------
+    def segments_near(self, lat: float, lon: float) -> np.ndarray:
+        """Indices of all segment pieces bucketed in the 3x3 cells around a point."""
+        center = grid.cell_id(lat, lon, BUCKET_KM)
+        cells = [center + (dr << 32) + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+        pos = np.searchsorted(self.bucket_cells, cells).tolist()
+        ranges = []
+        for p, cell in zip(pos, cells):
+            if p < len(self.bucket_cells) and self.bucket_cells[p] == cell:
+                ranges.append(np.arange(self.bucket_start[p], self.bucket_start[p + 1]))
+        return np.concatenate(ranges) if ranges else np.zeros(0, dtype=np.int64)
+
+    def candidates(self, lat: float, lon: float, radius_m: float, max_candidates: int = 8
+                   ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Closest segment piece per road within radius_m of a point, nearest first.
+        Returns (roads, segments, distances_m, projected (K, 2) lat/lon points).
+        """
+        radius_m = min(radius_m, SEARCH_RADIUS_LIMIT_M)
+        segs = self.segments_near(lat, lon)
+        if len(segs) == 0:
+            empty = np.zeros(0)
+            return empty.astype(np.int32), empty.astype(np.int64), empty, np.zeros((0, 2))
+        dist, proj = point_segment_distance(lat, lon, self.seg_a[segs], self.seg_b[segs])
+        within = dist <= radius_m
+        segs, dist, proj = segs[within], dist[within], proj[within]
+        roads = self.seg_road[segs]
+        # Keep the best piece per road
+        order = np.lexsort((dist, roads))
+        roads, segs, dist, proj = roads[order], segs[order], dist[order], proj[order]
+        first = np.ones(len(roads), dtype=bool)
+        first[1:] = roads[1:] != roads[:-1]
+        roads, segs, dist, proj = roads[first], segs[first], dist[first], proj[first]
+        best = np.argsort(dist, kind="stable")[:max_candidates]
+        return roads[best], segs[best], dist[best], proj[best]
+
+    def road_record(self, road: int) -> Dict:
+        """Road attributes in the same shape as _fetch_nearest_road_query() rows."""
+        maxspeed = int(self.maxspeed[road])
+        return {
+            "osm_id": str(int(self.osm_id[road])),
+            "fclass": FCLASSES[int(self.fclass[road])],
+            "name": self.names.get(road),
+            "ref": self.refs.get(road),
+            "oneway": ONEWAY_CODES[int(self.oneway[road])],
+            "maxspeed": maxspeed or None,
+            "bridge": "T" if self.bridge[road] else "F",
+            "tunnel": "T" if self.tunnel[road] else "F",
+        }
+
+    def connected(self, road_a: int, road_b: int) -> bool:
+        """Whether two roads share an endpoint or are parts of the same named road."""
+        ends_a = (self.start_node[road_a], self.end_node[road_a])
+        if self.start_node[road_b] in ends_a or self.end_node[road_b] in ends_a:
+            return True
+        ref_a = self.refs.get(road_a)
+        if ref_a and ref_a == self.refs.get(road_b):
+            return True
+        name_a = self.names.get(road_a)
+        return bool(name_a) and name_a == self.names.get(road_b)
+
+
+# -------------------------------
+# Geometry helpers
+# -------------------------------
+def point_segment_distance(lat: float, lon: float, seg_a: np.ndarray, seg_b: np.ndarray
+                           ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distance in metres from a point to each segment, and the projected point,
+    using a local equirectangular projection around the point.
+    """
+    kx = 111320.0 * math.cos(math.radians(lat))
+    ky = 111320.0
+    ax = (seg_a[:, 1] - lon) * kx
+    ay = (seg_a[:, 0] - lat) * ky
+    bx = (seg_b[:, 1] - lon) * kx
+    by = (seg_b[:, 0] - lat) * ky
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    t = np.where(length_sq > 0, -(ax * dx + ay * dy) / np.where(length_sq > 0, length_sq, 1), 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    px, py = ax + t * dx, ay + t * dy
+    dist = np.hypot(px, py)
+    proj = np.stack([lat + py / ky, lon + px / kx], axis=1)
+    return dist, proj
+
+
+def _split_segments(coords: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Consecutive vertex pairs, with long segments subdivided into <= MAX_PIECE_M pieces."""
+    a, b = coords[:-1], coords[1:]
+    kx = 111320.0 * np.cos(np.radians(a[:, 0]))
+    length = np.hypot((b[:, 0] - a[:, 0]) * 111320.0, (b[:, 1] - a[:, 1]) * kx)
+    pieces = np.maximum(1, np.ceil(length / MAX_PIECE_M)).astype(np.int64)
+    if (pieces == 1).all():
+        return a, b
+    seg = np.repeat(np.arange(len(a)), pieces)
+    k = np.arange(len(seg)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    t0 = (k / pieces[seg])[:, None]
+    t1 = ((k + 1) / pieces[seg])[:, None]
+    delta = b[seg] - a[seg]
+    return a[seg] + t0 * delta, a[seg] + t1 * delta
+
+
+def _node_key(coord: Sequence[float]) -> int:
+    """Endpoint key: coordinates rounded to ~1 m, packed into one int64."""
+    return (int(round(coord[0] * 1e5)) + (1 << 24)) << 32 | (int(round(coord[1] * 1e5)) + (1 << 31))
+
+
+def _to_int(value) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _is_true(value) -> bool:
+    return value is not None and str(value).strip().upper() in ("T", "TRUE", "YES", "1")
+
+
+def _oneway_code(value) -> int:
+    """Shapefile codes (B/F/T) as-is; OSMnx booleans and yes/no mean forward or both."""
+    text = str(value).strip().upper() if value is not None else "B"
+    if text in ONEWAY_CODES:
+        return ONEWAY_CODES.index(text)
+    return 1 if text in ("TRUE", "YES", "1") else 0
+
+
+def parse_wkb_linestring(wkb: bytes) -> Optional[np.ndarray]:
+    """Parse a 2D (Multi)LineString WKB into an (K, 2) lat/lon array."""
+    wkb = bytes(wkb)
+    endian = "<" if wkb[0] == 1 else ">"
+    geom_type = struct.unpack_from(endian + "I", wkb, 1)[0] & 0xFFFF
+    if geom_type == 2:
+        count = struct.unpack_from(endian + "I", wkb, 5)[0]
+        xy = np.frombuffer(wkb, dtype=endian + "f8", count=2 * count, offset=9).reshape(-1, 2)
+        return xy[:, ::-1].astype(np.float64)
+    if geom_type == 5:
+        parts: List[np.ndarray] = []
+        offset = 9
+        for _ in range(struct.unpack_from(endian + "I", wkb, 5)[0]):
+            part_endian = "<" if wkb[offset] == 1 else ">"
+            count = struct.unpack_from(part_endian + "I", wkb, offset + 5)[0]
+            xy = np.frombuffer(wkb, dtype=part_endian + "f8", count=2 * count, offset=offset + 9).reshape(-1, 2)
+            parts.append(xy[:, ::-1])
+            offset += 9 + 16 * count
+        return np.concatenate(parts).astype(np.float64) if parts else None
+    return None
+
+
+# -------------------------------
+# Loaders
+# -------------------------------
+def load_from_db(dsn_settings: Dict[str, str], bbox: Optional[Tuple[float, float, float, float]] = None,
+                 batch_size: int = 50000) -> RoadIndex:
+    """
+    Load the `roads` table (optionally only a south, west, north, east bbox)
+    with a server-side cursor, so memory stays bounded while streaming.
+    """
+    import psycopg2
+
+    query = """
+        SELECT osm_id, fclass, name, ref, oneway, maxspeed, bridge, tunnel, ST_AsBinary(geom)
+        FROM roads
+    """
+    params: Tuple = ()
+    if bbox:
+        query += " WHERE geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)"
+        south, west, north, east = bbox
+        params = (west, south, east, north)
+
+    conn = psycopg2.connect(**{k: v for k, v in dsn_settings.items() if v})
+    try:
+        with conn.cursor(name="road_index_load") as cur:
+            cur.itersize = batch_size
+            cur.execute(query, params)
+            columns = ("osm_id", "fclass", "name", "ref", "oneway", "maxspeed", "bridge", "tunnel")
+            records = ((dict(zip(columns, row[:8])), parse_wkb_linestring(row[8])) for row in cur)
+            return RoadIndex.build(records)
+    finally:
+        conn.close()
+
+
+def load_from_parquet(path: str) -> RoadIndex:
+    """
+    Load an edges GeoParquet. Accepts either the `roads` column names or
+    OSMnx names (osmid, highway).
+    """
+    import geopandas as gpd
+
+    gdf = gpd.read_parquet(path)
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(4326)
+
+    def first(value):
+        # OSMnx stores merged edges' attributes as lists
+        if isinstance(value, (list, tuple, np.ndarray)):
+            return value[0] if len(value) else None
+        return value
+
+    def records():
+        osm_col = "osm_id" if "osm_id" in gdf.columns else "osmid"
+        class_col = "fclass" if "fclass" in gdf.columns else "highway"
+        for row in gdf.itertuples(index=False):
+            geom = row.geometry
+            if geom is None or geom.is_empty:
+                continue
+            lines = getattr(geom, "geoms", [geom])
+            coords = np.concatenate([np.asarray(line.coords)[:, :2] for line in lines])[:, ::-1]
+            attrs = {
+                "osm_id": first(getattr(row, osm_col, None)),
+                "fclass": first(getattr(row, class_col, None)),
+                "name": first(getattr(row, "name", None)),
+                "ref": first(getattr(row, "ref", None)),
+                "oneway": first(getattr(row, "oneway", None)),
+                "maxspeed": first(getattr(row, "maxspeed", None)),
+                "bridge": first(getattr(row, "bridge", None)),
+                "tunnel": first(getattr(row, "tunnel", None)),
+            }
+            for key in ("name", "ref"):
+                if attrs[key] is not None and not isinstance(attrs[key], str):
+                    attrs[key] = None
+            yield attrs, coords
+
+    return RoadIndex.build(records())
@@ -0,0 +1,132 @@
+"""
+Decode-once route representation and a vectorized polyline codec.
+
+A Directions polyline is decoded once into a float64 (N, 2) lat/lon array
+(Route.points) and the Route is passed to every stage of the pipeline.
+Everything derived from the geometry is computed on first use and cached
+on the Route: cumulative distances, sample indices per spacing scale, grid
+cell ids of the samples and the encoded string itself.
+
+decode_polyline/encode_polyline implement Google's Encoded Polyline
+Algorithm with array operations instead of a per-character loop, and give
+the same results as the `polyline` package (including its round-half-away-
+from-zero quantization).
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import grid
+import sampling
+
+POLYLINE_FACTOR = 1e5  # Google uses 5 decimal places
+
+
+# -------------------------------
+# Polyline codec
+# -------------------------------
+def decode_polyline(encoded: str, factor: float = POLYLINE_FACTOR) -> np.ndarray:
+    """Decode an encoded polyline into a float64 (N, 2) lat/lon array."""
+    if not encoded:
+        return np.zeros((0, 2), dtype=np.float64)
+    chunks = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    if chunks.min() < 0 or chunks.max() > 0x3f:
+        raise ValueError("Invalid polyline: character out of range")
+
+    # A value ends at every chunk without the continuation bit (0x20)
+    ends = np.flatnonzero((chunks & 0x20) == 0)
+    if len(ends) == 0 or ends[-1] != len(chunks) - 1 or len(ends) % 2:
+        raise ValueError("Invalid polyline: truncated value")
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shift = 5 * (np.arange(len(chunks)) - np.repeat(starts, ends - starts + 1))
+    values = np.add.reduceat((chunks & 0x1f) << shift, starts)
+
+    # Zigzag-decoded deltas, accumulated per axis
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / factor
+
+
+def encode_polyline(points: np.ndarray, factor: float = POLYLINE_FACTOR) -> str:
+    """Encode an (N, 2) lat/lon array as a polyline."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        return ""
+    scaled = points * factor
+    quantized = (np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)).astype(np.int64)
+    deltas = np.diff(quantized, axis=0, prepend=0).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    # 5-bit chunks per value, least significant first; all but the last get 0x20
+    n_chunks = 1 + sum((values >= 1 << (5 * k)).astype(np.int64) for k in range(1, 7))
+    owner = np.repeat(np.arange(len(values)), n_chunks)
+    position = np.arange(len(owner)) - np.repeat(np.cumsum(n_chunks) - n_chunks, n_chunks)
+    chunks = (values[owner] >> (5 * position)) & 0x1f
+    chunks |= np.where(position < n_chunks[owner] - 1, 0x20, 0)
+    return (chunks + 63).astype(np.uint8).tobytes().decode("ascii")
+
+
+# -------------------------------
+# Route
+# -------------------------------
+class Route:
+    """A decoded route geometry with lazily cached derived arrays."""
+
+    def __init__(self, points: np.ndarray, encoded: Optional[str] = None):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.points.flags.writeable = False
+        self._encoded = encoded
+        self._cum_dist: Optional[np.ndarray] = None
+        self._samples: Dict[float, np.ndarray] = {}
+        self._cells: Dict[Tuple[float, float], np.ndarray] = {}
+
+    @classmethod
+    def from_polyline(cls, encoded: str) -> "Route":
+        return cls(decode_polyline(encoded), encoded)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    @property
+    def encoded(self) -> str:
+        if self._encoded is None:
+            self._encoded = encode_polyline(self.points)
+        return self._encoded
+
+    @property
+    def cum_dist(self) -> np.ndarray:
+        """Cumulative distance in metres at each vertex."""
+        if self._cum_dist is None:
+            self._cum_dist = sampling.cumulative_distances(self.points)
+        return self._cum_dist
+
+    @property
+    def length_m(self) -> float:
+        return float(self.cum_dist[-1]) if len(self) else 0.0
+
+    def sample_indices(self, spacing_scale: float = 1.0) -> np.ndarray:
+        """Sorted sample vertex indices (see sampling.sample_route), cached per spacing scale."""
+        if spacing_scale not in self._samples:
+            self._samples[spacing_scale] = sampling.sample_route(self.points, spacing_scale=spacing_scale,
+                                                                 cum_dist=self.cum_dist)
+        return self._samples[spacing_scale]
+
+    def sample_points(self, spacing_scale: float = 1.0) -> np.ndarray:
+        return self.points[self.sample_indices(spacing_scale)]
+
+    def sample_cells(self, cell_km: float, spacing_scale: float = 1.0) -> np.ndarray:
+        """Grid cell id of each sample, cached per (cell size, spacing scale)."""
+        key = (cell_km, spacing_scale)
+        if key not in self._cells:
+            samples = self.sample_points(spacing_scale)
+            self._cells[key] = grid.cell_ids(samples[:, 0], samples[:, 1], cell_km)
+        return self._cells[key]
+
+    def nearest_vertex(self, lat: float, lon: float) -> Tuple[int, float]:
+        """Index of the vertex closest to (lat, lon) and its distance in km."""
+        lat1, lon1 = np.radians(lat), np.radians(lon)
+        lat2, lon2 = np.radians(self.points[:, 0]), np.radians(self.points[:, 1])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distances = 2 * sampling.EARTH_RADIUS_M / 1000 * np.arcsin(np.sqrt(a))
+        idx = int(np.argmin(distances))
+        return idx, float(distances[idx])
@@ -0,0 +1,126 @@
+"""
+Distance-based sampling of route polylines.
+
+Google places polyline vertices densely on curves and sparsely on straight
+interstates, so sampling every Nth vertex makes the lookup count depend on
+geometry rather than on distance. Here samples are taken by cumulative
+distance instead:
+
+- the spacing after a sample depends on the road class at that sample, when
+  it is known from an earlier lookup (see remember_road_classes), so long
+  motorway stretches get few samples and residential streets get more;
+- spacing never drops below 1000 / MAX_SAMPLES_PER_KM metres, which bounds
+  the lookup budget per kilometre;
+- samples that fall into a road cell that already has a sample are dropped.
+
+The first and last vertex are always sampled.
+"""
+
+import os
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+import grid
+
+EARTH_RADIUS_M = 6371000.0
+
+DEFAULT_SPACING_M = float(os.getenv("SAMPLE_SPACING_M", "800"))
+MAX_SAMPLES_PER_KM = float(os.getenv("MAX_SAMPLES_PER_KM", "4"))
+
+# Sample spacing in metres after a sample on a road of this OSM class
+ROAD_CLASS_SPACING_M: Dict[str, float] = {
+    "motorway": 2000,
+    "trunk": 1500,
+    "motorway_link": 400,
+    "trunk_link": 400,
+    "primary": 800,
+    "primary_link": 400,
+    "secondary": 600,
+    "secondary_link": 400,
+    "tertiary": 400,
+    "tertiary_link": 300,
+    "unclassified": 400,
+    "residential": 250,
+    "living_street": 250,
+    "service": 250,
+}
+
+# Road class per road grid cell, learned from nearest-road lookups
+MAX_KNOWN_CELLS = 200_000
+_known_cell_class: Dict[int, str] = {}
+
+
+def remember_road_classes(cells: Iterable[int], fclasses: Iterable[Optional[str]]):
+    """Record the road class found for road grid cells, for later spacing decisions."""
+    for cell, fclass in zip(cells, fclasses):
+        if not fclass:
+            continue
+        _known_cell_class.pop(cell, None)
+        _known_cell_class[cell] = fclass
+    # Drop the oldest entries once the table is full (dicts keep insertion order)
+    while len(_known_cell_class) > MAX_KNOWN_CELLS:
+        del _known_cell_class[next(iter(_known_cell_class))]
+
+
+def cumulative_distances(points: np.ndarray) -> np.ndarray:
+    """Cumulative haversine distance in metres along an (N, 2) lat/lon array."""
+    if len(points) < 2:
+        return np.zeros(len(points))
+    lat = np.radians(points[:, 0])
+    lon = np.radians(points[:, 1])
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    seg = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+    return np.concatenate(([0.0], np.cumsum(seg)))
+
+
+def spacing_at(cell: int, spacing_m: float) -> float:
+    """Sample spacing after a sample in this road cell, from its known road class."""
+    fclass = _known_cell_class.get(cell)
+    spacing = ROAD_CLASS_SPACING_M.get(fclass, spacing_m) if fclass else spacing_m
+    return max(spacing, 1000.0 / MAX_SAMPLES_PER_KM)
+
+
+def sample_route(points: np.ndarray, spacing_m: float = DEFAULT_SPACING_M, spacing_scale: float = 1.0,
+                 cum_dist: Optional[np.ndarray] = None, road_cells: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Choose sample vertex indices for an (N, 2) lat/lon array.
+
+    Parameters:
+    - spacing_m: spacing where the road class is not known
+    - spacing_scale: multiplier for every spacing (e.g. 0.5 for denser on-demand lookups)
+    - cum_dist, road_cells: precomputed cumulative distances / road cell ids, if available
+
+    Returns a sorted int array of vertex indices.
+    """
+    n = len(points)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if n == 1:
+        return np.zeros(1, dtype=np.int64)
+    if cum_dist is None:
+        cum_dist = cumulative_distances(points)
+    if road_cells is None:
+        road_cells = grid.cell_ids(points[:, 0], points[:, 1], grid.ROAD_CELL_KM)
+    cells = road_cells.tolist()
+
+    # Walk the route sample by sample; each step is a binary search, so the
+    # cost grows with the number of samples rather than the number of vertices
+    indices = [0]
+    idx = 0
+    while True:
+        idx = int(np.searchsorted(cum_dist, cum_dist[idx] + spacing_at(cells[idx], spacing_m) * spacing_scale, side="left"))
+        if idx >= n - 1:
+            break
+        indices.append(idx)
+    indices.append(n - 1)
+    indices = np.asarray(indices, dtype=np.int64)
+
+    # Drop samples whose road cell already has an earlier sample
+    _, first = np.unique(road_cells[indices], return_index=True)
+    keep = np.zeros(len(indices), dtype=bool)
+    keep[first] = True
+    keep[0] = keep[-1] = True
+    return indices[keep]
@@ -0,0 +1,169 @@
+"""
+Process-wide, prioritized scheduler for database work.
+
+All database queries go through one DBScheduler, so the total number of
+queries in flight never exceeds the connection pools, no matter how many
+requests are running:
+
+- capacity is the connections of the pools serving the queries; the app
+  updates it as read replicas go down and come back (db.capacity_listener),
+  and the interactive reserve is re-derived whenever it changes;
+- INTERACTIVE work (map clicks) may use every slot, BULK work (route
+  lookups) leaves `reserved_interactive` slots free, and waiting
+  interactive work is always admitted before waiting bulk work, so a click
+  never queues behind a long route;
+- each priority class has a bounded queue; when it is full, acquire()
+  raises SchedulerFull immediately instead of letting latency pile up.
+
+Queue time, rejections and completions are tracked per class (metrics()).
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Tuple
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+WAIT_SAMPLES = 1000  # recent queue times kept per class for percentiles
+
+
+class SchedulerFull(Exception):
+    """The priority class's queue is full; the caller should fail fast (e.g. 503)."""
+
+
+class DBScheduler:
+    def __init__(self, capacity: int, reserved_interactive: int = 2, max_queued: Dict[int, int] = None):
+        self._reserved_wanted = reserved_interactive
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []  # heap of (priority, seq, future)
+        self._active = 0
+        self.capacity = capacity
+        self.max_queued = max_queued or {INTERACTIVE: 200, BULK: 2000}
+        self._seq = itertools.count()
+        self._queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self._stats = {
+            priority: {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0,
+                       "waits": deque(maxlen=WAIT_SAMPLES), "runs": deque(maxlen=WAIT_SAMPLES)}
+            for priority in PRIORITY_NAMES
+        }
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, capacity: int):
+        """Resize (e.g. when pools come and go); the interactive reserve is re-derived from it."""
+        self._capacity = capacity
+        self.reserved_interactive = max(0, min(self._reserved_wanted, capacity - 1))
+        # Slots running above a reduced capacity drain naturally; a larger one admits waiters now
+        self._wake()
+
+    def _limit(self, priority: int) -> int:
+        return self.capacity if priority == INTERACTIVE else self.capacity - self.reserved_interactive
+
+    def _has_waiters_at_or_above(self, priority: int) -> bool:
+        return any(self._queued[p] for p in PRIORITY_NAMES if p <= priority)
+
+    # -------------------------------
+    # Slots
+    # -------------------------------
+    async def acquire(self, priority: int = BULK):
+        """Wait for a slot (raises SchedulerFull when this class's queue is full)."""
+        stats = self._stats[priority]
+        stats["submitted"] += 1
+        if self._active < self._limit(priority) and not self._has_waiters_at_or_above(priority):
+            self._active += 1
+            return
+        if self._queued[priority] >= self.max_queued[priority]:
+            stats["rejected"] += 1
+            raise SchedulerFull(f"{PRIORITY_NAMES[priority]} database queue is full "
+                                f"({self._queued[priority]} waiting, {self._active} running)")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._queued[priority] += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Cancelled right after being granted a slot: hand it on
+                self.release()
+            else:
+                self._queued[priority] -= 1
+                future.cancel()
+            raise
+
+    def release(self):
+        self._active -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            # The heap head is the most urgent waiter; if it can't run, nothing can
+            if self._active >= self._limit(priority):
+                break
+            heapq.heappop(self._waiters)
+            self._queued[priority] -= 1
+            self._active += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = BULK):
+        """Hold one database slot for the duration of the block."""
+        queued_at = time.perf_counter()
+        await self.acquire(priority)
+        started_at = time.perf_counter()
+        stats = self._stats[priority]
+        stats["waits"].append(started_at - queued_at)
+        try:
+            yield
+            stats["completed"] += 1
+        except BaseException:
+            stats["failed"] += 1
+            raise
+        finally:
+            stats["runs"].append(time.perf_counter() - started_at)
+            self.release()
+
+    async def run(self, priority: int, fn, *args, **kwargs):
+        """Run `await fn(*args, **kwargs)` in a slot."""
+        async with self.slot(priority):
+            return await fn(*args, **kwargs)
+
+    # -------------------------------
+    # Metrics
+    # -------------------------------
+    def metrics(self) -> Dict:
+        def percentiles(samples) -> Dict[str, float]:
+            if not samples:
+                return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+            ordered = sorted(samples)
+            pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+            return {"p50_ms": round(pick(0.50), 2), "p95_ms": round(pick(0.95), 2),
+                    "p99_ms": round(pick(0.99), 2), "max_ms": round(ordered[-1] * 1000, 2)}
+
+        classes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            stats = self._stats[priority]
+            classes[name] = {
+                "submitted": stats["submitted"],
+                "rejected": stats["rejected"],
+                "completed": stats["completed"],
+                "failed": stats["failed"],
+                "queued": self._queued[priority],
+                "max_queued": self.max_queued[priority],
+                "queue_time": percentiles(stats["waits"]),
+                "run_time": percentiles(stats["runs"]),
+            }
+        return {"capacity": self.capacity, "reserved_interactive": self.reserved_interactive,
+                "active": self._active, "classes": classes}
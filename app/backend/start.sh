@@ -1,4 +1,24 @@
 #!/bin/bash
+# Usage:
+#   ./start.sh        development server with auto-reload (single process)
+#   ./start.sh prod   build the shared serving data once, then run WORKERS processes
+#                     (default: one per core) that memory-map it instead of each
+#                     building their own copy
 cd "$(dirname "$0")"
 source venv/bin/activate
+
+if [ "$1" = "prod" ]; then
+    export ROAD_INDEX_DIR="${ROAD_INDEX_DIR:-serving/road_index}"
+    if [ ! -f "$ROAD_INDEX_DIR/manifest.json" ] || [ "$REBUILD_SERVING_DATA" = "1" ]; then
+        python build_serving_data.py --output "$ROAD_INDEX_DIR" || exit 1
+    fi
+    export ROAD_INDEX_SOURCE="$ROAD_INDEX_DIR"
+    # Workers save the weather cache on shutdown and restarted workers load it (see cache.py)
+    export CACHE_SNAPSHOT_PATH="${CACHE_SNAPSHOT_PATH:-serving/weather_snapshot.json}"
+    # Road cells and directions persist across restarts in a shared SQLite file (see disk_cache.py)
+    export DISK_CACHE_PATH="${DISK_CACHE_PATH:-serving/cache.sqlite3}"
+    exec uvicorn app:app --host "${HOST:-0.0.0.0}" --port "${PORT:-8000}" \
+        --workers "${WORKERS:-$(nproc 2>/dev/null || sysctl -n hw.ncpu)}"
+fi
+
 uvicorn app:app --reload
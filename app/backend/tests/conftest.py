@@ -0,0 +1,5 @@
+# The backend modules are flat scripts imported by name (import load, import grid)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,156 @@
+"""
+Behavior tests for load.py --mode sync against a real PostGIS.
+
+Each test seeds a `roads` table in a scratch schema (the session's
+search_path puts it in front of public, so the real table is never
+touched), syncs a small GeoParquet fixture over it and checks the result.
+
+Skipped unless LOAD_TEST_DATABASE_URL points at a database with PostGIS,
+e.g. postgresql+psycopg2://postgres@localhost/accinet_test
+
+Usage (from app/backend):
+    LOAD_TEST_DATABASE_URL=... python -m pytest tests/test_load_sync.py -q
+"""
+
+import json
+import os
+import struct
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import load
+
+DATABASE_URL = os.getenv("LOAD_TEST_DATABASE_URL", "")
+SCRATCH_SCHEMA = "load_sync_test"
+
+SCHEMA = pa.schema([("osm_id", pa.string()), ("fclass", pa.string()), ("name", pa.string()),
+                    ("maxspeed", pa.int32()), ("geometry", pa.binary())])
+
+
+def way(osm_id: str, name: str, lon: float, lat: float = 30.27, fclass: str = "residential"):
+    wkb = struct.pack("<BII4d", 1, 2, 2, lon, lat, lon + 0.001, lat + 0.001)
+    return {"osm_id": osm_id, "fclass": fclass, "name": name, "maxspeed": 30, "geometry": wkb}
+
+
+BASE = [way("1", "First St", -97.740), way("2", "Second St", -97.738), way("3", "Third St", -97.736),
+        way("4", "Fourth St", -97.734), way("5", "Fifth St", -97.732)]
+
+
+def write_source(path, ways) -> str:
+    table = pa.Table.from_pylist(ways, schema=SCHEMA)
+    geo = {"version": "1.0.0", "primary_column": "geometry",
+           "columns": {"geometry": {"encoding": "WKB", "geometry_types": ["LineString"]}}}
+    pq.write_table(table.replace_schema_metadata({"geo": json.dumps(geo)}), str(path))
+    return str(path)
+
+
+@pytest.fixture
+def engine():
+    if not DATABASE_URL:
+        pytest.skip("LOAD_TEST_DATABASE_URL is not set")
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+
+    engine = create_engine(DATABASE_URL, connect_args={"options": f"-csearch_path={SCRATCH_SCHEMA},public"})
+    try:
+        with engine.begin() as conn:
+            if conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).first() is None:
+                pytest.skip("PostGIS is not installed in the test database")
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCRATCH_SCHEMA}"))
+            conn.execute(text(f"""
+                CREATE TABLE {SCRATCH_SCHEMA}.{load.TABLE_NAME} (
+                    osm_id TEXT, code INTEGER, fclass TEXT, name TEXT, ref TEXT, oneway TEXT,
+                    maxspeed INTEGER, layer BIGINT, bridge TEXT, tunnel TEXT,
+                    geom GEOMETRY(LINESTRING, 4326), row_hash TEXT
+                )
+            """))
+    except OperationalError as e:
+        pytest.skip(f"Test database unreachable: {e}")
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE"))
+    engine.dispose()
+
+
+def seed(engine, path):
+    raw = engine.raw_connection()
+    try:
+        for data in load.read_batches(path, [], 1000):
+            load.copy_rows(raw.cursor(), data)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def table_rows(engine):
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"SELECT osm_id, name, ST_AsText(geom), row_hash FROM {load.TABLE_NAME} ORDER BY osm_id")
+        return {osm_id: (name, geom, row_hash) for osm_id, name, geom, row_hash in cursor.fetchall()}
+    finally:
+        raw.close()
+
+
+def sync(engine, path, changes_out, max_delete_share=0.5):
+    load.load_sync(engine, path, [], chunk_size=1000, batch_size=2, changes_out=str(changes_out),
+                   max_delete_share=max_delete_share)
+    with open(changes_out) as f:
+        return json.load(f)
+
+
+def test_sync_applies_inserts_updates_and_deletes(engine, tmp_path):
+    seed(engine, write_source(tmp_path / "base.parquet", BASE))
+    before = table_rows(engine)
+
+    incoming = [BASE[0],                                # unchanged
+                way("2", "Second Avenue", -97.738),     # renamed
+                way("3", "Third St", -97.736, 30.28),   # moved
+                BASE[4],                                # unchanged; 4 is gone
+                way("6", "Sixth St", -97.730)]          # new
+    changes = sync(engine, write_source(tmp_path / "new.parquet", incoming), tmp_path / "changes.json")
+
+    assert (changes["inserted"], changes["updated"], changes["deleted"], changes["unchanged"]) == (1, 2, 1, 2)
+    after = table_rows(engine)
+    assert sorted(after) == ["1", "2", "3", "5", "6"]
+    assert after["1"] == before["1"] and after["5"] == before["5"]
+    assert after["2"][0] == "Second Avenue" and after["2"][2] != before["2"][2]
+    assert after["3"][1] != before["3"][1] and after["3"][2] != before["3"][2]
+    assert changes["cells"] and changes["bbox"]
+
+    # Syncing the same source again changes nothing
+    again = sync(engine, write_source(tmp_path / "new.parquet", incoming), tmp_path / "changes.json")
+    assert (again["inserted"], again["updated"], again["deleted"]) == (0, 0, 0)
+    assert table_rows(engine) == after
+
+
+def test_sync_aborts_above_max_delete_share(engine, tmp_path):
+    seed(engine, write_source(tmp_path / "base.parquet", BASE))
+    before = table_rows(engine)
+
+    # A truncated extract: 3 of 5 roads would be deleted
+    with pytest.raises(SystemExit):
+        sync(engine, write_source(tmp_path / "truncated.parquet", BASE[:2]), tmp_path / "changes.json",
+             max_delete_share=0.2)
+    assert table_rows(engine) == before
+    assert not (tmp_path / "changes.json").exists()
+
+
+def test_keying_aborts_above_max_delete_share(engine, tmp_path):
+    # Three rows per osm_id (as in an edges table): keying would delete two thirds of the table
+    seed(engine, write_source(tmp_path / "base.parquet", BASE[:2] * 3))
+    before_count = len(BASE[:2]) * 3
+
+    with pytest.raises(SystemExit):
+        sync(engine, write_source(tmp_path / "new.parquet", BASE[:2]), tmp_path / "changes.json",
+             max_delete_share=0.2)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {load.TABLE_NAME}")
+        assert cursor.fetchone()[0] == before_count
+    finally:
+        raw.close()
@@ -0,0 +1,271 @@
+"""
+Open-Meteo weather provider with a shared connection pool and request batching.
+
+Open-Meteo accepts comma-separated latitude/longitude lists and answers with
+one result per location, so instead of one request (and one TCP+TLS
+handshake) per weather cell:
+
+- one httpx.AsyncClient is kept for the app's lifetime (see close());
+- cells requested within BATCH_WINDOW_S of each other, by one route or by
+  concurrent requests, are collected and fetched together in calls of up to
+  MAX_LOCATIONS_PER_CALL locations;
+- a cell that is already queued or in flight is not requested twice;
+- at most MAX_CONCURRENT_CALLS calls run at the same time.
+
+Each cell's result keeps the format of the old per-cell fetch and adds the
+cell's hourly forecast series (unix hour starts, FORECAST_DAYS days), so one
+fetch answers for any arrival time that day:
+    { current_weather?: { temperature?, weathercode?, windspeed? },
+      hourly?: { time: [...], temperature: [...], weathercode: [...], windspeed: [...] },
+      error?: string }
+resolve_at_times() picks the forecast hour for each point's arrival time;
+series_at_times() does the same for a whole (slots x points) time matrix,
+and forecast_window() gives the time range the fetched series cover.
+"""
+
+import asyncio
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+import grid
+
+MAX_LOCATIONS_PER_CALL = int(os.getenv("WEATHER_BATCH_SIZE", "100"))
+BATCH_WINDOW_S = float(os.getenv("WEATHER_BATCH_WINDOW_MS", "15")) / 1000
+MAX_CONCURRENT_CALLS = int(os.getenv("WEATHER_MAX_CONCURRENT_CALLS", "8"))
+REQUEST_TIMEOUT_S = 10.0
+FORECAST_DAYS = int(os.getenv("WEATHER_FORECAST_DAYS", "2"))
+HOUR_S = 3600
+
+# Open-Meteo hourly variable -> key in our hourly series / current_weather
+HOURLY_VARIABLES = {
+    "temperature_2m": "temperature",
+    "weathercode": "weathercode",
+    "windspeed_10m": "windspeed",
+}
+
+
+def format_weather(data: Dict) -> Dict:
+    """Reduce one Open-Meteo location result to the frontend's weather format plus the hourly series."""
+    if "current_weather" not in data:
+        return {"error": "No current weather data available"}
+    current = data["current_weather"]
+    result = {
+        "current_weather": {
+            "temperature": current.get("temperature"),
+            "weathercode": current.get("weathercode"),
+            "windspeed": current.get("windspeed"),
+        }
+    }
+    hourly = data.get("hourly") or {}
+    if hourly.get("time"):
+        result["hourly"] = {"time": hourly["time"]}
+        for variable, key in HOURLY_VARIABLES.items():
+            result["hourly"][key] = hourly.get(variable) or [None] * len(hourly["time"])
+    return result
+
+
+def resolve_at_times(cell_weather: Dict[int, Dict], cells: Sequence[int], times: Sequence[float]) -> List[Dict]:
+    """
+    Weather for each point at its arrival time, from its cell's cached series.
+
+    cells and times are per point (weather cell id, unix seconds). Points whose
+    time falls inside the cell's hourly series get that hour's values in
+    current_weather plus "forecast_time" (the hour start); otherwise the
+    cell's current weather is used. Points in cells without data get {}.
+    """
+    cells = np.asarray(cells, dtype=np.int64)
+    times = np.asarray(times, dtype=np.float64)
+    results: List[Dict] = [{}] * len(cells)
+    unique_cells, inverse = np.unique(cells, return_inverse=True)
+    for cell_pos, cell in enumerate(unique_cells.tolist()):
+        entry = cell_weather.get(cell)
+        if not entry:
+            continue
+        points = np.flatnonzero(inverse == cell_pos)
+        hourly = entry.get("hourly")
+        if not hourly:
+            for point in points.tolist():
+                results[point] = entry
+            continue
+        hours = np.asarray(hourly["time"], dtype=np.float64)
+        slots = np.searchsorted(hours, times[points], side="right") - 1
+        inside = (slots >= 0) & (times[points] < hours[-1] + HOUR_S)
+        for point, slot, ok in zip(points.tolist(), slots.tolist(), inside.tolist()):
+            if not ok:
+                results[point] = {k: v for k, v in entry.items() if k != "hourly"}
+                continue
+            results[point] = {
+                "current_weather": {key: hourly[key][slot] for key in HOURLY_VARIABLES.values()},
+                "forecast_time": int(hours[slot]),
+            }
+    return results
+
+
+class WeatherProvider:
+    """Batched, pooled Open-Meteo client keyed by weather grid cell."""
+
+    def __init__(self, url: str, cell_km: float = grid.WEATHER_CELL_KM):
+        self.url = url
+        self.cell_km = cell_km
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: Dict[int, asyncio.Future] = {}  # queued for the next batch
+        self._in_flight: Dict[int, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()  # keep references to running batch calls
+        self.stats = {"calls": 0, "locations": 0, "errors": 0}
+
+    # -------------------------------
+    # Lifetime
+    # -------------------------------
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=REQUEST_TIMEOUT_S,
+                limits=httpx.Limits(max_connections=MAX_CONCURRENT_CALLS,
+                                    max_keepalive_connections=MAX_CONCURRENT_CALLS),
+            )
+            self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+        return self._client
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+    async def fetch_cells(self, cells: Iterable[int]) -> Dict[int, Dict]:
+        """Weather for each weather cell id (fetched at the cell center)."""
+        cells = list(dict.fromkeys(cells))
+        if not cells:
+            return {}
+        futures = [self._future_for(cell) for cell in cells]
+        if len(self._pending) >= MAX_LOCATIONS_PER_CALL:
+            self._flush()
+        elif self._pending and self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(BATCH_WINDOW_S, self._flush)
+        # Futures are shared with other requests; shield them from this caller's cancellation
+        results = await asyncio.gather(*[asyncio.shield(future) for future in futures])
+        return dict(zip(cells, results))
+
+    async def fetch_point(self, lat: float, lon: float) -> Dict:
+        """Weather for the cell containing (lat, lon)."""
+        cell = grid.cell_id(lat, lon, self.cell_km)
+        return (await self.fetch_cells([cell]))[cell]
+
+    # -------------------------------
+    # Batching
+    # -------------------------------
+    def _future_for(self, cell: int) -> asyncio.Future:
+        future = self._pending.get(cell) or self._in_flight.get(cell)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[cell] = future
+        return future
+
+    def _flush(self):
+        self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        self._in_flight.update(batch)
+        cells = list(batch)
+        for start in range(0, len(cells), MAX_LOCATIONS_PER_CALL):
+            chunk = cells[start:start + MAX_LOCATIONS_PER_CALL]
+            task = asyncio.ensure_future(self._fetch_chunk(chunk, [batch[cell] for cell in chunk]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch_chunk(self, cells: List[int], futures: List[asyncio.Future]):
+        try:
+            results = await self._call(cells)
+        except Exception as e:
+            self.stats["errors"] += 1
+            results = [{"error": str(e)}] * len(cells)
+        for cell, future, result in zip(cells, futures, results):
+            self._in_flight.pop(cell, None)
+            if not future.done():
+                future.set_result(result)
+
+    async def _call(self, cells: List[int]) -> List[Dict]:
+        """One multi-location Open-Meteo call; returns results in `cells` order."""
+        client = self.client()
+        lats, lons = grid.cell_centers(cells, self.cell_km)
+        async with self._semaphore:
+            self.stats["calls"] += 1
+            self.stats["locations"] += len(cells)
+            response = await client.get(
+                self.url,
+                params={
+                    "latitude": ",".join(f"{lat:.5f}" for lat in lats.tolist()),
+                    "longitude": ",".join(f"{lon:.5f}" for lon in lons.tolist()),
+                    "current_weather": "true",
+                    "hourly": ",".join(HOURLY_VARIABLES),
+                    "forecast_days": FORECAST_DAYS,
+                    "timeformat": "unixtime",
+                    "temperature_unit": "fahrenheit",
+                    "timezone": "America/Chicago",
+                },
+            )
+        response.raise_for_status()
+        data = response.json()
+        # A single location comes back as an object, several as a list
+        locations = data if isinstance(data, list) else [data]
+        if len(locations) != len(cells):
+            raise ValueError(f"Open-Meteo returned {len(locations)} results for {len(cells)} locations")
+        return [format_weather(location) for location in locations]
+
+
+def forecast_window(cell_weather: Dict[int, Dict], cells: Iterable[int]) -> Optional[Tuple[float, float]]:
+    """
+    (start, end) unix seconds covered by the hourly series of every listed
+    cell that has one, or None when none has a series. Arrival times outside
+    it would fall back to current weather in series_at_times().
+    """
+    start, end = -np.inf, np.inf
+    found = False
+    for cell in cells:
+        hours = ((cell_weather.get(cell) or {}).get("hourly") or {}).get("time")
+        if not hours:
+            continue
+        found = True
+        start = max(start, float(hours[0]))
+        end = min(end, float(hours[-1]) + HOUR_S)
+    return (start, end) if found else None
+
+
+def series_at_times(cell_weather: Dict[int, Dict], cells: Sequence[int], times: np.ndarray,
+                    key: str = "weathercode") -> np.ndarray:
+    """
+    One hourly variable for a (..., points) matrix of arrival times, e.g. one
+    row per departure slot. cells gives each column's weather cell. Times
+    outside a cell's series use its current value; cells without data give NaN.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.full(times.shape, np.nan)
+    cells = np.asarray(cells, dtype=np.int64)
+    unique_cells, inverse = np.unique(cells, return_inverse=True)
+    for cell_pos, cell in enumerate(unique_cells.tolist()):
+        entry = cell_weather.get(cell)
+        if not entry or "error" in entry:
+            continue
+        columns = np.flatnonzero(inverse == cell_pos)
+        current = entry.get("current_weather", {}).get(key)
+        cell_times = times[..., columns]
+        hourly = entry.get("hourly")
+        if not hourly:
+            values[..., columns] = np.nan if current is None else current
+            continue
+        hours = np.asarray(hourly["time"], dtype=np.float64)
+        series = np.asarray([np.nan if v is None else v for v in hourly[key]], dtype=np.float64)
+        slots = np.searchsorted(hours, cell_times, side="right") - 1
+        inside = (slots >= 0) & (cell_times < hours[-1] + HOUR_S)
+        resolved = series[np.clip(slots, 0, len(series) - 1)]
+        values[..., columns] = np.where(inside, resolved, np.nan if current is None else current)
+    return values
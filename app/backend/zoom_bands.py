@@ -0,0 +1,92 @@
+"""
+Zoom-band generalized road tables for map-extent (display) queries.
+
+A map-extent query at state-wide zoom does not need every residential
+street at full resolution: the roads it returns are drawn a few pixels
+wide. Each ZoomBand is a materialized view over `roads` holding only the
+classes drawn at that zoom, with segments merged by (fclass, name, ref)
+and simplified with ST_SimplifyPreserveTopology to half a pixel at the
+band's deepest zoom:
+
+    view       zooms     classes                                   tolerance
+    roads_z7   < 8       motorway, trunk                           ~0.0027 deg
+    roads_z9   8 - 9     + primary                                 ~0.0007 deg
+    roads_z11  10 - 11   + secondary, tertiary                     ~0.0002 deg
+    roads      >= 12     everything, full resolution
+
+Merging groups segments per coarse tile (TILE_DEG) as well, so a long
+highway becomes one line per tile instead of thousands of OSM ways, while
+each ST_Collect stays small. The views keep the columns of `roads` (osm_id
+is the smallest id in the merged group; per-way columns like oneway are
+NULL) so the display queries read them unchanged.
+
+The views are built by build_zoom_tables.py and picked by band_for_extent();
+bands that are not built are skipped (see set_built), so the display
+endpoints fall back to the full table until the build has run.
+"""
+
+import math
+from typing import Iterable, List, NamedTuple, Optional, Set
+
+TILE_PX = 256
+# Tile size (degrees) that merged lines are grouped by
+TILE_DEG = 0.5
+
+
+class ZoomBand(NamedTuple):
+    name: str
+    max_zoom: int  # used for extents whose zoom is below max_zoom + 1
+    fclasses: List[str]
+
+    @property
+    def tolerance(self) -> float:
+        """Half a pixel (in degrees) at the band's deepest zoom."""
+        return 360.0 / (TILE_PX * 2 ** (self.max_zoom + 1)) / 2
+
+
+BANDS: List[ZoomBand] = [
+    ZoomBand("roads_z7", 7, ["motorway", "trunk"]),
+    ZoomBand("roads_z9", 9, ["motorway", "trunk", "primary"]),
+    ZoomBand("roads_z11", 11, ["motorway", "trunk", "primary", "secondary", "tertiary"]),
+]
+
+_built: Set[str] = set()
+
+
+def set_built(names: Iterable[str]):
+    """Record which band views exist in the database (checked at startup)."""
+    _built.clear()
+    _built.update(name for name in names if name in {band.name for band in BANDS})
+
+
+def extent_zoom(south: float, west: float, north: float, east: float) -> float:
+    """Web map zoom at which the extent fills about one 256px tile."""
+    span = max(abs(east - west), abs(north - south), 1e-9)
+    return math.log2(360.0 / span)
+
+
+def band_for_extent(south: float, west: float, north: float, east: float) -> Optional[ZoomBand]:
+    """Coarsest built band that covers the extent's zoom, or None for the full table."""
+    zoom = extent_zoom(south, west, north, east)
+    for band in BANDS:
+        if zoom < band.max_zoom + 1 and band.name in _built:
+            return band
+    return None
+
+
+def view_sql(band: ZoomBand, source: str = "roads") -> str:
+    """CREATE MATERIALIZED VIEW statement for a band."""
+    classes = ", ".join(f"'{fclass}'" for fclass in band.fclasses)
+    return f"""
+        CREATE MATERIALIZED VIEW {band.name} AS
+        SELECT min(osm_id) AS osm_id, min(code) AS code, fclass, name, ref,
+               NULL::text AS oneway, max(maxspeed) AS maxspeed, NULL::bigint AS layer,
+               NULL::text AS bridge, NULL::text AS tunnel,
+               ST_SimplifyPreserveTopology((ST_Dump(ST_LineMerge(ST_Collect(geom)))).geom,
+                                           {band.tolerance!r})::geometry(LINESTRING, 4326) AS geom
+        FROM {source}
+        WHERE fclass IN ({classes})
+        GROUP BY fclass, name, ref,
+                 floor(ST_X(ST_StartPoint(geom)) / {TILE_DEG}),
+                 floor(ST_Y(ST_StartPoint(geom)) / {TILE_DEG})
+    """